@@ -5,92 +5,231 @@
 #   This function parses through the DegenGeom csv file and places the degenerate geometry components in a dictionary.
 #   This is an independent function that supports any arbitrary number of components, which do not necessarily need to be rotor blades.
 
-#%%
+#   The file is memory-mapped and only the header row of each degenerate geometry type is located when it is first
+#   analyzed, along with the byte offsets of the block of rows that follows it. A block is parsed into a contiguous
+#   float64 array the first time that it is indexed, the comment rows containing the column labels are skipped.
+#   Components and degenerate geometries that are never referenced are therefore never parsed. Each component along
+#   with its degenerate geometry information can be accessed by:
+#   dataSorted['"Component Name(numbered sequentially by default)"']['"Degenerate Geometry Name"']
 
-def AnalyzeDegenGeom(dataFileName):
+#   If a cache directory is provided, the index of the file and each parsed block are stored in (and on subsequent runs
+#   loaded from) a binary cache, see DegenGeomCache.py.
 
 #%% imports necessary modules
-    import os
-    import csv
-    import numpy as np
+import os
+import re
+import mmap
+import numpy as np
+from collections.abc import Mapping
+
 #%%
-    data = {}
-    n = 0
-    # Opens and reads csv data
-    with open(os.path.abspath(os.path.join(os.getcwd(),dataFileName)), 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        # Detects and deletes empty rows
-        for row in csvreader:
-            if len(row) != 0:
-                data[n] = row
-                n = n + 1
-
-    # %%
-    # Initializes a list for each degenerate geometry type
+#   Version of the parser, this must be incremented whenever the layout of the returned data changes so that stale
+#   cache entries are not reused.
+parserVersion = 2
+
+# Names of the degenerate geometries
+DegenGeom = ["SURFACE_NODE", "SURFACE_FACE", "PLATE", "STICK_NODE", "STICK_FACE", "POINT"]
+
+#%%
+def AnalyzeDegenGeom(dataFileName, cacheDir=None, cacheSize=500):
+
+    filePath = os.path.abspath(os.path.join(os.getcwd(), dataFileName))
+
+    #   Returns the cached index if this file has already been analyzed
+    if cacheDir is not None:
+        from DegenGeomCache import cacheKey, cacheLoad, cacheSave
+        cacheDir = os.path.abspath(os.path.join(os.getcwd(), cacheDir))
+        key = cacheKey(filePath)
+        cached = cacheLoad(key, cacheDir)
+        if cached is not None:
+            index, indHeader = cached
+            return DegenGeomData(filePath, index, (cacheDir, key, cacheSize)), indHeader
+
+    index, indHeader = indexDegenGeom(filePath)
+
+    if cacheDir is not None:
+        cacheSave(key, cacheDir, index, indHeader, cacheSize)
+        return DegenGeomData(filePath, index, (cacheDir, key, cacheSize)), indHeader
+
+    return DegenGeomData(filePath, index), indHeader
+
+
+def indexDegenGeom(filePath):
+    '''
+    This function scans through the memory-mapped DegenGeom file and locates the header row of each degenerate
+    geometry type along with the byte offsets of the block of rows that follows it.
+    :param filePath: path to the DegenGeom csv file
+    :return:
+    :param index: nested dictionary, of each component and degenerate geometry, containing the starting and ending byte
+    offsets of the block and the range of rows that comprise the degenerate geometry: [start, end, rowStart, rowEnd]
+    :param indHeader: list of the header row of each degenerate geometry type along with its row index (empty rows
+    excluded)
+    '''
+    index = {}
     indHeader = []
-    # Names of the degenerate geometries
-    DegenGeom = ["SURFACE_NODE", "SURFACE_FACE", "PLATE", "STICK_NODE", "STICK_FACE", "POINT"]
-
-    #   Iterates through the data and locates the indices corresponding to the header of each degenerate geometry type
-    for i, n in enumerate(data.items()):
-        if any(x == n[1][0] for x in DegenGeom):
-            indHeader.append(n)
-
-    # %%
-    #   This function extracts and returns a segment of data between two specified indices
-    #   dataset: the data set
-    #   startInd: starting index
-    #   endInd: ending index
-
-    def dictExtractasArray(dataset, startInd, endInd):
-        temp = {}
-        for i in range(startInd, endInd):
-            temp[i] = dataset[i]
-        temp = np.array(list(temp.values()))
-        return temp
-
-    # %%
-    #   This section of the code extracts the degenerate geometries corresponding to each component, ...
-    #   converts the degenerate geometries parameters into a numpy array, which are then organized ...
-    #   in a nested dictionary. Each component has its own dictionary, which can be accessed by: ...
-    #   dataSorted['"Component Name(numbered sequentially by default)"']['"Degenerate Geometry Name"']
-
-    #   Number if components
-    nComponents = int(data[2][0])
-    #   Initializes two empty dictionaries, dataSorted is the dictionary that contains the final sorted data...
-    #   dataTemp is a temporary dictionary used to store the degenerate geometry data of each individual component.
-    dataTemp = {}
-    dataSorted = {}
-
-    for ii in range(nComponents):
-        for i, n in enumerate(indHeader[0 + len(DegenGeom) * ii:len(DegenGeom) + len(DegenGeom) * ii]):
-
-            if n[1][0] == DegenGeom[1]:
-                dataTemp = {**dataTemp, **{
-                    n[1][0]: dictExtractasArray(data, n[0] + 1, indHeader[i + len(DegenGeom) * ii + 1][0] - 1)}}
-
-            elif n[1][0] == DegenGeom[2]:
-                dataTemp = {**dataTemp, **{"PLATE_NORM": dictExtractasArray(data, n[0] + 1, n[0] + int(n[1][1]) + 2)}}
-                dataTemp = {**dataTemp, **{"PLATE_NODE": dictExtractasArray(data, n[0] + int(n[1][1]) + 2,
-                                                                            indHeader[i + len(DegenGeom) * ii + 1][
-                                                                                0] - 1)}}
-
-            elif n[1][0] == DegenGeom[3]:
-                data[n[0] + 1] = data[n[0] + 1][0:-1]
-                dataTemp = {**dataTemp, **{
-                    n[1][0]: dictExtractasArray(data, n[0] + 1, indHeader[i + len(DegenGeom) * ii + 1][0] - 1)}}
-
-            elif n[1][0] == DegenGeom[4]:
-                dataTemp = {**dataTemp, **{
-                    n[1][0]: dictExtractasArray(data, n[0] + 1, indHeader[i + len(DegenGeom) * ii + 1][0] - 1)}}
-
-            elif n[1][0] == DegenGeom[5]:
-                dataTemp = {**dataTemp, **{n[1][0]: dictExtractasArray(data, n[0] + 1, n[0] + 3)}}
-
-            else:
-                dataTemp = {**dataTemp,
-                            **{n[1][0]: dictExtractasArray(data, n[0] + 1, indHeader[i + len(DegenGeom) * ii + 1][0])}}
-
-        dataSorted = {**dataSorted, **{'Component ' + str(ii + 1): dataTemp}}
-
-    return dataSorted, indHeader
+    component = None
+    header = None
+    start = 0
+    prev = 0
+    n = 0
+
+    def closeBlock(header, start, end, component):
+        #   The PLATE block is comprised of the plate normals (one per cross section) followed by the plate nodes,
+        #   which are split into two separate arrays.
+        if header[0] == DegenGeom[2]:
+            component["PLATE_NORM"] = [start, end, 0, int(header[1])]
+            component["PLATE_NODE"] = [start, end, int(header[1]), None]
+        else:
+            component[header[0]] = [start, end, 0, None]
+
+    with open(filePath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return index, indHeader
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            #   Header rows and component rows (e.g. LIFTING_SURFACE, BODY) are the only ones starting with a letter
+            starts = [match.end() for match in re.finditer(rb'\n(?=[A-Z])', mm)]
+            if mm[:1].isupper():
+                starts.insert(0, 0)
+            for rowStart in starts:
+                rowEnd = mm.find(b'\n', rowStart)
+                if rowEnd == -1:
+                    rowEnd = len(mm)
+
+                #   Counts the non-empty rows preceding the header
+                seg = mm[prev:rowStart]
+                n = n + seg.count(b'\n') - len(re.findall(rb'\n(?=[ \t\r]*\n)', seg)) - (seg[:1] == b'\n')
+                prev = rowStart
+
+                if header is not None:
+                    closeBlock(header, start, rowStart, component)
+                    header = None
+                rowSplit = mm[rowStart:rowEnd].decode('ascii').rstrip().split(',')
+
+                if rowSplit[0] in DegenGeom:
+                    indHeader.append((n, rowSplit))
+                    header = rowSplit
+                    start = rowEnd
+                    if component is None:
+                        component = {}
+                        index['Component ' + str(len(index) + 1)] = component
+                else:
+                    #   Rows that do not belong to a degenerate geometry type mark the start of the next component
+                    component = {}
+                    index['Component ' + str(len(index) + 1)] = component
+
+            if header is not None:
+                closeBlock(header, start, len(mm), component)
+
+    return index, indHeader
+
+
+def parseBlock(buffer, start, end, rowStart, rowEnd):
+    '''
+    This function parses a block of comma-delimited rows into a float64 array.
+    :param buffer: memory-mapped DegenGeom file
+    :param start: starting byte offset of the block
+    :param end: ending byte offset of the block
+    :param rowStart: index of the first numeric row of the block to include
+    :param rowEnd: index of the last numeric row (exclusive) of the block to include, None to include all the rows
+    :return:
+    :param data: float64 array of the degenerate geometry
+    '''
+    rows = [row for row in buffer[start:end].decode('ascii').splitlines() if row.strip() and row.lstrip()[0] != '#']
+    rows = rows[rowStart:rowEnd]
+    if len(rows) == 0:
+        return np.zeros((0, 0))
+    return np.fromstring(','.join(rows), dtype=np.float64, sep=',').reshape(len(rows), rows[0].count(',') + 1)
+
+
+#%%
+class DegenGeomData(Mapping):
+    '''
+    Lazily evaluated nested dictionary of the components of a DegenGeom file. It behaves as a read-only dictionary
+    (dataSorted['Component 1']['SURFACE_NODE']), but each degenerate geometry is only parsed from the memory-mapped
+    file the first time that it is indexed.
+    '''
+
+    def __init__(self, filePath, index, cache=None):
+        self.filePath = filePath
+        self.cache = cache
+        self.buffer = None
+        self.components = {name: DegenGeomComponent(self, name, blocks) for name, blocks in index.items()}
+
+    def __getitem__(self, key):
+        return self.components[key]
+
+    def __iter__(self):
+        return iter(self.components)
+
+    def __len__(self):
+        return len(self.components)
+
+    def __repr__(self):
+        return 'DegenGeomData(' + repr(self.filePath) + ', ' + repr(list(self.components)) + ')'
+
+    def __getstate__(self):
+        #   the memory map is reopened after unpickling (e.g. when passed to a worker process)
+        state = self.__dict__.copy()
+        state['buffer'] = None
+        return state
+
+    def close(self):
+        '''
+        This function closes the memory map of the DegenGeom file, along with its file descriptor. The blocks that have
+        already been parsed remain available, while any other block reopens the file when it is indexed.
+        '''
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def readBlock(self, component, block, location):
+        '''
+        This function returns the array of a degenerate geometry, from the cache if it is available, otherwise it is
+        parsed from the DegenGeom file.
+        '''
+        if self.cache is not None:
+            from DegenGeomCache import cacheLoadBlock, cacheSaveBlock
+            data = cacheLoadBlock(self.cache[0], self.cache[1], component, block)
+            if data is not None:
+                return data
+
+        if self.buffer is None:
+            with open(self.filePath, 'rb') as f:
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = parseBlock(self.buffer, *location)
+
+        if self.cache is not None:
+            cacheSaveBlock(self.cache[0], self.cache[1], component, block, data, self.cache[2])
+        return data
+
+
+class DegenGeomComponent(Mapping):
+    '''
+    Lazily evaluated dictionary of the degenerate geometries of a single component.
+    '''
+
+    def __init__(self, source, name, blocks):
+        self.source = source
+        self.name = name
+        self.blocks = blocks
+        self.data = {}
+
+    def __getitem__(self, key):
+        if key not in self.data:
+            self.data[key] = self.source.readBlock(self.name, key, self.blocks[key])
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __repr__(self):
+        return 'DegenGeomComponent(' + repr(self.name) + ', ' + repr(list(self.blocks)) + ')'
@@ -0,0 +1,73 @@
+#       VSP2WOPWOP Asynchronous File Writer
+
+#   This module overlaps the writing of the output files of each case with the trim of the next one. The write functions
+#   of each case are submitted to a small pool of writer threads, which serialize the computed results to disk while
+#   the calling thread proceeds. The number of cases that have been submitted but not yet written is bounded, once the
+#   bound is reached a submission blocks until a pending write completes, so that the computed results can not
+#   accumulate in memory faster than they are written. An exception raised by a write is propagated to the caller on
+#   its next submission, or at the latest when the writer is closed, which waits for all the pending writes.
+
+#%% imports necessary modules
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+#%%
+class AsyncWriter:
+    '''
+    This class writes the output files of the cases in a pool of background threads.
+    :param nThreads: number of writer threads, the files are written by the calling thread if this is equal to zero
+    :param maxPending: maximum number of submitted writes that have not yet completed
+    '''
+    def __init__(self, nThreads, maxPending):
+        self.executor = None
+        if nThreads > 0:
+            self.executor = ThreadPoolExecutor(max_workers=nThreads, thread_name_prefix='AsyncWriter')
+        self.slots = threading.BoundedSemaphore(max(1, maxPending))
+        self.futures = []
+
+    def submit(self, func, *args):
+        '''
+        This function submits a write, after raising the exception of any write that has failed.
+        :param func: write function
+        :param args: arguments of the write function
+        '''
+        self.raiseFailed()
+        if self.executor is None:
+            func(*args)
+            return
+        #   backpressure: blocks until fewer than maxPending writes are in progress
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self.slots.release())
+        self.futures.append(future)
+
+    def raiseFailed(self):
+        #   the completed writes are discarded, the exception of the first one that failed is raised
+        done = [future for future in self.futures if future.done()]
+        self.futures = [future for future in self.futures if not future.done()]
+        for future in done:
+            future.result()
+
+    def close(self):
+        '''
+        This function waits for all the pending writes to complete and raises the exception of any that failed.
+        '''
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.raiseFailed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        #   the exception of the calling thread takes precedence over that of a write
+        if excType is not None:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            self.futures = []
+            return False
+        self.close()
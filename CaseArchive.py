@@ -0,0 +1,172 @@
+#       VSP2WOPWOP Case Archive
+
+#   This module bundles the case directories of an analysis mode operating condition sweep into a small number of
+#   uncompressed tar archives, rather than writing each file of each case to the output directory, which is limited by
+#   the metadata performance and file count quotas of parallel filesystems. The files of each case are written to a
+#   scratch directory in the local temporary directory (TMPDIR), appended to the archive, and then deleted. Each chain
+#   of cases that is solved by a single worker is written to its own archive ('cases.000.tar', 'cases.001.tar', etc.)
+#   and the location of every file within the archives is recorded in the index ('cases.json'). Files that are hard
+#   linked to one another, such as the geometry patch file (UserIn['linkGeom'] = 1), are only stored once. The geometry
+#   patch file is copied into each scratch directory if TMPDIR is on a different filesystem from the output directory,
+#   since a symbolic link would be archived as an empty member, see OutputStore.py. The case directories are
+#   materialized by extractArchive, e.g. on the node on which PSU-WOPWOP is run, either all of them or only the selected
+#   cases:
+
+#       python CaseArchive.py <geometry output directory> <extraction directory> [case folder names]
+
+#   Each archive is also a standard tar file, which may be extracted with 'tar -xf'.
+
+#%% imports necessary modules
+import os
+import re
+import sys
+import json
+import shutil
+import tarfile
+import threading
+from glob import glob
+from OutputStore import linkFile
+
+#%%
+indexFileName = 'cases.json'
+
+
+class CaseArchive:
+    '''
+    This class appends the case directories of a chain of cases to an archive. The cases may be added concurrently by
+    the writer threads.
+    :param dirArchive: output directory of the geometry, in which the archive is created
+    :param part: number of the archive
+    '''
+    def __init__(self, dirArchive, part):
+        self.dirArchive = dirArchive
+        self.fileName = 'cases.' + '{:03d}'.format(part) + '.tar'
+        self.tar = tarfile.open(os.path.join(dirArchive, self.fileName), 'w', format=tarfile.PAX_FORMAT)
+        self.lock = threading.Lock()
+        self.members = {}
+        self.cases = {}
+
+    def addCase(self, caseName, dirCaseFile):
+        '''
+        This function appends all the files of a case directory to the archive.
+        :param caseName: case folder name, under which the files are archived
+        :param dirCaseFile: directory containing the files of the case
+        '''
+        with self.lock:
+            files = {}
+            for file in sorted(os.listdir(dirCaseFile)):
+                arcName = caseName + '/' + file
+                self.tar.add(os.path.join(dirCaseFile, file), arcname=arcName, recursive=False)
+                tarInfo = self.tar.members[-1]
+                if tarInfo.islnk():
+                    self.members[arcName] = self.members[tarInfo.linkname]
+                else:
+                    #   the data of the member ends at the current position, padded to a whole number of blocks
+                    nBlocks = -(-tarInfo.size // tarfile.BLOCKSIZE)
+                    self.members[arcName] = [self.fileName, self.tar.offset - nBlocks * tarfile.BLOCKSIZE,
+                                             tarInfo.size]
+                files[file] = self.members[arcName]
+            self.cases[caseName] = files
+
+    def close(self):
+        '''
+        This function closes the archive and writes the locations of its files to its partial index, which is merged
+        into the index of the geometry by writeIndex.
+        '''
+        self.tar.close()
+        with open(os.path.join(self.dirArchive, self.fileName[:-4] + '.json'), 'w') as f:
+            json.dump(self.cases, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def clearArchive(dirArchive):
+    '''
+    This function deletes the archives, partial indices, and index within the output directory of a geometry.
+    :param dirArchive: output directory of the geometry
+    '''
+    for file in glob(os.path.join(dirArchive, 'cases.[0-9][0-9][0-9].*')) + [os.path.join(dirArchive, indexFileName)]:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def writeIndex(dirArchive, caseNames):
+    '''
+    This function merges the partial indices of the archives into the index of the geometry.
+    :param dirArchive: output directory of the geometry
+    :param caseNames: list of the case folder names in the order of the sweep
+    '''
+    cases = {}
+    for file in sorted(glob(os.path.join(dirArchive, 'cases.[0-9][0-9][0-9].json'))):
+        with open(file, 'r') as f:
+            cases.update(json.load(f))
+        os.remove(file)
+    with open(os.path.join(dirArchive, indexFileName), 'w') as f:
+        json.dump({'cases': {caseName: cases[caseName] for caseName in caseNames}}, f, indent=1)
+
+
+def extractArchive(dirArchive, dirExtract, caseNames=None):
+    '''
+    This function materializes the case directories that are stored in the archives of a geometry, along with a case
+    file (cases.nam) that only lists the extracted cases. A file that is stored once for several cases is only written
+    once and then linked into the other case directories.
+    :param dirArchive: output directory of the geometry, containing the archives and their index
+    :param dirExtract: directory to which the cases are extracted
+    :param caseNames: list of the case folder names to extract, all the cases are extracted if None
+    :return:
+    :param caseNames: list of the extracted case folder names
+    '''
+    with open(os.path.join(dirArchive, indexFileName), 'r') as f:
+        index = json.load(f)['cases']
+    if caseNames is None:
+        caseNames = list(index.keys())
+    missing = [caseName for caseName in caseNames if caseName not in index]
+    assert len(missing) == 0, 'The following cases are not in the archive: ' + ', '.join(missing)
+
+    os.makedirs(dirExtract, exist_ok=True)
+    extracted = {}
+    archives = {}
+    try:
+        for caseName in caseNames:
+            dirCaseFile = os.path.join(dirExtract, caseName)
+            if os.path.exists(dirCaseFile):
+                shutil.rmtree(dirCaseFile)
+            os.mkdir(dirCaseFile)
+            for file, (fileName, offset, size) in index[caseName].items():
+                filePath = os.path.join(dirCaseFile, file)
+                if (fileName, offset) in extracted:
+                    linkFile(extracted[(fileName, offset)], filePath)
+                    continue
+                if fileName not in archives:
+                    archives[fileName] = open(os.path.join(dirArchive, fileName), 'rb')
+                archives[fileName].seek(offset)
+                with open(filePath, 'wb') as f_bin:
+                    #   the data is copied in blocks so that large files are not read into memory in their entirety
+                    remaining = size
+                    while remaining > 0:
+                        buf = archives[fileName].read(min(remaining, 2 ** 20))
+                        f_bin.write(buf)
+                        remaining -= len(buf)
+                extracted[(fileName, offset)] = filePath
+    finally:
+        for f in archives.values():
+            f.close()
+
+    #   the case file only retains the namelists of the extracted cases
+    if os.path.exists(os.path.join(dirArchive, 'cases.nam')):
+        with open(os.path.join(dirArchive, 'cases.nam'), 'r') as f:
+            namelists = re.findall(r'&casename\n.*?\n/\n', f.read(), flags=re.S)
+        with open(os.path.join(dirExtract, 'cases.nam'), 'w') as f:
+            for namelist in namelists:
+                if re.search(r"globalFolderName = '\./(.*)/'", namelist)[1] in caseNames:
+                    f.write(namelist)
+
+    return caseNames
+
+
+if __name__ == '__main__':
+    extractArchive(sys.argv[1], sys.argv[2], sys.argv[3:] if len(sys.argv) > 3 else None)
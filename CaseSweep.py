@@ -0,0 +1,391 @@
+#       VSP2WOPWOP Analysis Mode Case Sweep
+
+#   This module runs the operating condition sweep of a single blade geometry in the analysis mode (OperMode = 2).
+#   Every combination of T, Vx, Vz, and omega is trimmed and its patch, functional data, BPM, and namelist files are
+#   written to its own case directory. Since the cases are independent of one another they can be distributed over a
+#   pool of worker processes, the number of which is set by UserIn['nWorkers']. The results are collected in the same
+#   order as the nested loops over T, Vx, Vz, and omega, so that loadParams and the list of case folders that is
+#   referenced by caseFile_write are identical to those of a serial run. If UserIn['hoverBatch'] = 1, all the hover and
+#   axial flight cases are trimmed beforehand in a single call to loadingHoverBatch, as are all the forward flight cases
+#   in a single call to loadingFFBatch for each rotational rate if UserIn['ffBatch'] = 1. If UserIn['warmStart'] = 1,
+#   the cases are instead solved as a continuation: they are ordered so that neighbouring operating conditions follow
+#   one another and the trim of each case is initialized with the converged trim variables of its nearest solved
+#   neighbour. If UserIn['linkGeom'] = 1, the geometry patch file is written once and linked into each case directory.
+#   If UserIn['resumeSweep'] = 1, only the cases whose inputs have changed, or that have not been completed, are
+#   computed, see SweepManifest.py. The files of each case are written by a pool of UserIn['writeThreads'] background
+#   threads while the next case is trimmed, see AsyncWriter.py. If UserIn['archiveOutput'] = 1, the case directories are
+#   bundled into archives rather than written to the output directory, see CaseArchive.py.
+
+#%% imports necessary modules
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.spatial import cKDTree
+from loadingHover import loadingHover
+from loadingFF import loadingFF
+from loadingHoverBatch import loadingHoverBatch
+from loadingFFBatch import loadingFFBatch
+from ConstantLoadingPatchFileWrite import ConstantLoadingPatchFileWrite
+from PeriodicLoadingPatchFileWrite import PeriodicLoadingPatchFileWrite
+from nmlWrite import nml_write
+from ConstantBPMWrite import ConstantBPMWrite
+from PeriodicBPMWrite import PeriodicBPMWrite
+from GeomPatchFileWrite import GeomPatchFileWrite
+from PolarTable import PolarTable
+from OutputStore import storeFile, linkFile
+from SweepManifest import sweepFields, hashInputs, loadRecord, saveRecord, removeStale
+from AsyncWriter import AsyncWriter
+from CaseArchive import CaseArchive, clearArchive, writeIndex
+
+#%%
+#   Quantities that are shared by all the cases of a sweep. These are set once per worker process, rather than being
+#   sent along with each case.
+shared = {}
+
+
+def initSweep(UserIn, geomParams, XsecPolar, iter_geom, dirSaveFile, geomFile=None):
+    shared.update({'UserIn': UserIn, 'geomParams': geomParams, 'XsecPolar': XsecPolar, 'iter_geom': iter_geom,
+                   'dirSaveFile': dirSaveFile, 'geomFile': geomFile})
+    #   the polar table of each rotational rate is built once and reused by all the cases
+    shared['polarTable'] = polarTables(UserIn, geomParams, XsecPolar)
+
+
+def polarTables(UserIn, geomParams, XsecPolar):
+    '''
+    This function builds the polar table of each rotational rate, see PolarTable.py.
+    :param UserIn: dictionary of the user inputs
+    :param geomParams: dictionary of the blade geometric parameters
+    :param XsecPolar: dictionary of the airfoil polars, corresponding to each rotational rate
+    :return:
+    :param polarTable: dictionary of the polar tables, with the same keys as XsecPolar
+    '''
+    return {key: PolarTable(XsecPolar[key], geomParams['r'], UserIn['XsecLocation']) for key in XsecPolar.keys()}
+
+
+def sweepCases(UserIn):
+    '''
+    This function assembles the list of operating conditions of the sweep in the order of the nested loops over T, Vx,
+    Vz, and omega.
+    :param UserIn: dictionary of the user inputs
+    :return:
+    :param cases: list of dictionaries containing the operating condition and folder name of each case
+    '''
+    cases = []
+    for iter_thrust, nThrust in enumerate(UserIn['T']):
+        for iter_Vx, nVx in enumerate(UserIn['Vx']):
+            for iter_Vz, nVz in enumerate(UserIn['Vz']):
+                for iter_omega, nOmega in enumerate(UserIn['omega']):
+
+                    globalFolderName = 'T_' + '{:.2e}'.format(nThrust) + 'N_Vx_' + str(round(nVx * 1.944)) \
+                                       + 'Kts_Vz_' + str(round(nVz)) + 'ms_Nr_' + str(round(nOmega)) + 'RPM'
+
+                    if len(UserIn['alphaShaft']) > 1:
+                        alphaShaft = UserIn['alphaShaft'][iter_Vx]
+                    else:
+                        alphaShaft = UserIn['alphaShaft'][0]
+
+                    cases.append({'globalFolderName': globalFolderName, 'T': nThrust, 'Vx': nVx, 'Vz': nVz,
+                                  'omega': nOmega, 'iter_omega': iter_omega, 'alphaShaft': alphaShaft})
+    return cases
+
+
+def continuationOrder(cases, nChains):
+    '''
+    This function orders the cases of the sweep for the warm-started continuation. Starting from the first case, the
+    nearest case that has not yet been visited is repeatedly appended to the path, with the distances evaluated over T,
+    Vx, Vz, and omega, each normalized by its range over the sweep. The path is split into nChains contiguous chains,
+    which are each solved in order by a single worker. Every case is assigned the nearest case of the same flight
+    regime (hover/axial or forward flight) that precedes it within its chain, from which its trim is initialized.
+    :param cases: list of dictionaries containing the operating condition of each case, returned by sweepCases
+    :param nChains: number of chains into which the path is split
+    :return:
+    :param chains: list of chains, each a list of (index of the case, position of its seed case within the chain or
+    None) tuples
+    '''
+    x = np.array([[case['T'], case['Vx'], case['Vz'], case['omega']] for case in cases], dtype=float)
+    span = np.ptp(x, axis=0)
+    span[span == 0] = 1
+    x = (x - np.min(x, axis=0)) / span
+    tree = cKDTree(x)
+
+    def nearest(i, valid):
+        #   nearest case to case i for which valid is true, the number of neighbours that are queried is doubled until
+        #   one is found, so that only the close neighbours of i are usually sorted
+        k = 1
+        while True:
+            k = min(2 * k, len(cases))
+            ind = np.atleast_1d(tree.query(x[i], k=k)[1])
+            ind = ind[valid(ind)]
+            if len(ind) > 0:
+                return ind[0]
+            if k == len(cases):
+                return None
+
+    path = [0]
+    visited = np.zeros(len(cases), dtype=bool)
+    visited[0] = True
+    for i in range(len(cases) - 1):
+        path.append(nearest(path[-1], lambda ind: ~visited[ind]))
+        visited[path[-1]] = True
+
+    #   flight regime of each case and position of each case within its chain, or -1 if it has not yet been solved
+    hover = np.array([case['Vx'] == 0 for case in cases])
+    position = np.full(len(cases), -1)
+    chains = []
+    for chainPath in np.array_split(path, nChains):
+        chain = []
+        for pos, i in enumerate(chainPath):
+            j = nearest(i, lambda ind: (position[ind] >= 0) & (hover[ind] == hover[i]))
+            chain.append((int(i), None if j is None else int(position[j])))
+            position[i] = pos
+        position[chainPath] = -1
+        chains.append(chain)
+
+    return chains
+
+
+def runChain(chain):
+    '''
+    This function trims the cases of a chain in order, each initialized with the converged trim variables of its seed
+    case if it has one, see continuationOrder. The files of the cases are written in the background and all of them
+    have been written once this function returns.
+    :param chain: tuple of the number of the chain and the list of case dictionaries, each optionally containing the
+    position of its seed case within the chain ('seed')
+    :return:
+    :param loadingOut: list of the computed loading parameters of each case
+    '''
+    UserIn = shared['UserIn']
+    part, chain = chain
+    loadingOut = []
+    #   the writer is closed first, so that all the cases have been added before the archive is closed
+    archive = None
+    if UserIn['archiveOutput'] == 1:
+        archive = CaseArchive(shared['dirSaveFile'], part)
+    with archive or nullcontext(), AsyncWriter(UserIn['writeThreads'], UserIn['writeQueue']) as writer:
+        for case in chain:
+            trimInit = None
+            if case.get('seed') is not None:
+                trimInit = loadingOut[case['seed']].get('trimState')
+            loadingOut.append(runCase(case, trimInit, writer, archive))
+    return loadingOut
+
+
+def runCase(case, trimInit=None, writer=None, archive=None):
+    '''
+    This function trims a single case of the sweep and writes out its files.
+    :param case: dictionary containing the operating condition and folder name of the case
+    :param trimInit: converged trim variables of a neighbouring case, with which the trim is initialized
+    :param writer: AsyncWriter to which the writing of the files is submitted, the files are written immediately if None
+    :param archive: CaseArchive to which the files are added, the files are written to the case directory if None
+    :return:
+    :param loadingOut: dictionary of the computed loading parameters
+    '''
+    UserIn = shared['UserIn']
+    geomParams = shared['geomParams']
+    XsecPolar = shared['XsecPolar']
+
+    #   the files of an archived case are written to a scratch directory in the local temporary directory
+    if archive is not None:
+        dirCaseFile = mkdtemp(prefix=case['globalFolderName'] + '_')
+    else:
+        dirCaseFile = os.path.abspath(os.path.join(shared['dirSaveFile'], case['globalFolderName']))
+        if os.path.exists(dirCaseFile) == 1:
+            rmtree(dirCaseFile)
+        os.mkdir(dirCaseFile)
+
+    if 'loadingOut' in case:
+        loadingOut = case['loadingOut']
+    elif case['Vx'] == 0:
+        key = list(XsecPolar.keys())[case['iter_omega']]
+        loadingOut = loadingHover(UserIn, geomParams, XsecPolar[key], case['T'], case['omega'], case['Vz'],
+                                  shared['polarTable'][key], trimInit)
+    else:
+        key = list(XsecPolar.keys())[case['iter_omega']]
+        loadingOut = loadingFF(UserIn, geomParams, XsecPolar[key], case['T'], case['omega'], case['Vx'],
+                               case['Vz'], case['alphaShaft'], shared['polarTable'][key], trimInit)
+
+    if writer is None:
+        writeCase(case, loadingOut, dirCaseFile, archive)
+    else:
+        writer.submit(writeCase, case, loadingOut, dirCaseFile, archive)
+
+    return loadingOut
+
+
+def writeCase(case, loadingOut, dirCaseFile, archive=None):
+    '''
+    This function writes out the patch, functional data, BPM, and namelist files of a trimmed case and then records it
+    in the manifest, or adds them to the archive.
+    :param case: dictionary containing the operating condition and folder name of the case
+    :param loadingOut: dictionary of the computed loading parameters
+    :param dirCaseFile: directory of the case
+    :param archive: CaseArchive to which the files are added, after which the scratch directory is deleted
+    '''
+    UserIn = shared['UserIn']
+    geomParams = shared['geomParams']
+
+    #   the geometry patch file is either linked from the store or written out, the scratch directory of an archived case
+    #   may be on a different filesystem from the store, in which case the file is copied rather than symbolically linked
+    if shared['geomFile'] is not None:
+        linkFile(shared['geomFile'], os.path.join(dirCaseFile, UserIn['geomFileName'] + '.dat'), archive is None)
+    else:
+        GeomPatchFileWrite(UserIn['geomFileName'], geomParams, dirCaseFile)
+
+    if case['Vx'] == 0:
+        ConstantLoadingPatchFileWrite(UserIn['loadingFileName'], loadingOut, geomParams['nXsecs'], dirCaseFile)
+    else:
+        PeriodicLoadingPatchFileWrite(UserIn['loadingFileName'], loadingOut, geomParams['nXsecs'], case['omega'],
+                                      dirCaseFile)
+
+    #   the BPM file is referenced by the namelist of each case and is therefore written to the case directory
+    if UserIn['BBNoiseFlag'] == 1:
+        if case['Vx'] == 0:
+            ConstantBPMWrite(geomParams, loadingOut, dirCaseFile)
+        else:
+            PeriodicBPMWrite(geomParams, loadingOut, UserIn['nRev'], case['omega'], dirCaseFile)
+
+    if UserIn['nmlWrite'] == 1:
+        nml_write(UserIn, loadingOut, dirCaseFile, case['Vx'], case['Vz'], case['omega'], case['alphaShaft'],
+                  shared['iter_geom'], geomParams['nXsecs'])
+
+    if archive is not None:
+        archive.addCase(case['globalFolderName'], dirCaseFile)
+        rmtree(dirCaseFile)
+
+    #   the case is only recorded as complete once all of its files have been written
+    elif 'key' in case:
+        saveRecord(os.path.join(shared['dirSaveFile'], '.manifest'), dirCaseFile, case['key'], loadingOut)
+
+
+def CaseSweep(UserIn, geomParams, XsecPolar, iter_geom, dirSaveFile):
+    '''
+    This function runs all the cases of the operating condition sweep, either serially or over a pool of worker
+    processes.
+    :param UserIn: dictionary of the user inputs
+    :param geomParams: dictionary of the blade geometric parameters
+    :param XsecPolar: dictionary of the airfoil polars, corresponding to each rotational rate
+    :param iter_geom: index of the DegenGeom geometry
+    :param dirSaveFile: directory of the geometry, in which the case directories are created
+    :return:
+    :param loadParams: dictionary of the loading parameters of each case, keyed by the case folder name
+    :param globalFolder: list of the case folder names
+    '''
+    cases = sweepCases(UserIn)
+    globalFolder = [case['globalFolderName'] for case in cases]
+    loadingOut = [None] * len(cases)
+
+    #   Incremental sweep: the records of the cases that are no longer part of the sweep are deleted along with their
+    #   directories, and the cases whose records are up to date are loaded rather than recomputed, see SweepManifest.py.
+    if UserIn['resumeSweep'] == 1:
+        dirManifest = os.path.join(dirSaveFile, '.manifest')
+        removeStale(dirManifest, dirSaveFile, globalFolder)
+        sweepInputs = hashInputs({key: value for key, value in UserIn.items() if key not in sweepFields}, geomParams,
+                                 iter_geom)
+        polarInputs = [hashInputs(XsecPolar[key]) for key in XsecPolar.keys()]
+        for i, case in enumerate(cases):
+            case['key'] = hashInputs(sweepInputs, polarInputs[case['iter_omega']], case['T'], case['Vx'], case['Vz'],
+                                     case['omega'], case['alphaShaft'])
+            loadingOut[i] = loadRecord(dirManifest, os.path.join(dirSaveFile, case['globalFolderName']), case['key'])
+
+    #   indices of the cases that are to be computed
+    pending = [i for i, out in enumerate(loadingOut) if out is None]
+    pendingCases = [cases[i] for i in pending]
+
+    #   The hover/axial flight cases that share the same polars are trimmed simultaneously, only the files are then
+    #   written out by runCase. The polar tables are built once for the batched trims of both flight regimes.
+    if UserIn['hoverBatch'] == 1 or UserIn['ffBatch'] == 1:
+        polarTable = polarTables(UserIn, geomParams, XsecPolar)
+    if UserIn['hoverBatch'] == 1:
+        for iter_omega, key in enumerate(XsecPolar.keys()):
+            hoverCases = [case for case in pendingCases if case['Vx'] == 0 and case['iter_omega'] == iter_omega]
+            if len(hoverCases) > 0:
+                batchOut = loadingHoverBatch(UserIn, geomParams, XsecPolar[key], [case['T'] for case in hoverCases],
+                                             [case['omega'] for case in hoverCases],
+                                             [case['Vz'] for case in hoverCases], polarTable[key])
+                for case, out in zip(hoverCases, batchOut):
+                    case['loadingOut'] = out
+
+    #   The forward flight cases that share the same polars are likewise trimmed simultaneously.
+    if UserIn['ffBatch'] == 1:
+        for iter_omega, key in enumerate(XsecPolar.keys()):
+            ffCases = [case for case in pendingCases if case['Vx'] != 0 and case['iter_omega'] == iter_omega]
+            if len(ffCases) > 0:
+                batchOut = loadingFFBatch(UserIn, geomParams, XsecPolar[key], [case['T'] for case in ffCases],
+                                          [case['omega'] for case in ffCases], [case['Vx'] for case in ffCases],
+                                          [case['Vz'] for case in ffCases], [case['alphaShaft'] for case in ffCases],
+                                          polarTable[key])
+                for case, out in zip(ffCases, batchOut):
+                    case['loadingOut'] = out
+
+    #   The geometry patch file, which is identical for every case, is written once to the store and linked into each
+    #   case directory, see OutputStore.py.
+    geomFile = None
+    if UserIn['linkGeom'] == 1 and len(pendingCases) > 0:
+        dirStore = os.path.join(dirSaveFile, '.store')
+        os.makedirs(dirStore, exist_ok=True)
+        GeomPatchFileWrite(UserIn['geomFileName'], geomParams, dirStore)
+        geomFile = storeFile(os.path.join(dirStore, UserIn['geomFileName'] + '.dat'), dirStore)
+
+    if UserIn['archiveOutput'] == 1:
+        clearArchive(dirSaveFile)
+
+    initArgs = (UserIn, geomParams, XsecPolar, iter_geom, dirSaveFile, geomFile)
+    if len(pendingCases) == 0:
+        pendingOut = []
+    elif UserIn['warmStart'] == 1:
+        #   each chain of the continuation is solved by a single worker, the results are then returned to the order of
+        #   the sweep
+        chains = continuationOrder(pendingCases, min(UserIn['nWorkers'], len(pendingCases)))
+        chainOut = poolMap(runChain, [(part, [{**pendingCases[i], 'seed': seed} for i, seed in chain])
+                                      for part, chain in enumerate(chains)], UserIn['nWorkers'], initSweep, initArgs)
+        pendingOut = [None] * len(pendingCases)
+        for chain, out in zip(chains, chainOut):
+            for (i, seed), caseOut in zip(chain, out):
+                pendingOut[i] = caseOut
+    else:
+        #   The cases are solved in contiguous chunks, the files of each chunk are written in the background and have
+        #   all been written before its results are returned from the worker.
+        nChunks = min(4 * UserIn['nWorkers'], len(pendingCases)) if UserIn['nWorkers'] > 1 else 1
+        chunks = [[pendingCases[i] for i in chunk] for chunk in np.array_split(np.arange(len(pendingCases)), nChunks)]
+        chunkOut = poolMap(runChain, list(enumerate(chunks)), UserIn['nWorkers'], initSweep, initArgs)
+        pendingOut = [out for chunk in chunkOut for out in chunk]
+
+    for i, out in zip(pending, pendingOut):
+        loadingOut[i] = out
+
+    if UserIn['archiveOutput'] == 1:
+        writeIndex(dirSaveFile, globalFolder)
+    loadParams = dict(zip(globalFolder, loadingOut))
+
+    return loadParams, globalFolder
+
+
+def poolMap(func, items, nWorkers, initializer, initArgs):
+    '''
+    This function applies func to each item, over a pool of worker processes if nWorkers > 1, and returns the results
+    in the same order as the items. The initializer is called once per worker process with initArgs, or once in the
+    current process if the items are evaluated serially.
+    '''
+    return list(poolIter(func, items, nWorkers, initializer, initArgs))
+
+
+def poolIter(func, items, nWorkers, initializer, initArgs):
+    '''
+    This function is the same as poolMap, except that the result of each item is yielded as soon as it, and those of
+    the preceding items, have been evaluated.
+    '''
+    nWorkers = min(nWorkers, len(items))
+
+    if nWorkers > 1:
+        #   items are sent to the workers in chunks to limit the communication overhead of large sweeps
+        chunksize = max(1, len(items) // (4 * nWorkers))
+        with ProcessPoolExecutor(max_workers=nWorkers, initializer=initializer, initargs=initArgs) as executor:
+            yield from executor.map(func, items, chunksize=chunksize)
+        return
+
+    initializer(*initArgs)
+    for item in items:
+        yield func(item)
@@ -9,8 +9,8 @@
 def ConstantBPMWrite(geomParams,loadParams,dirSaveFile):
     #%% imports necessary modules
     import os
-    import struct
     import numpy as np
+    from WopwopBinary import bpmHeader, bpmFloat, writeRecord
 
     #%% TEflow angle is hard coded to 1 degree
     TEflowAngle = np.zeros(len(geomParams['chordDist']))*1*(np.pi/180)
@@ -33,38 +33,14 @@ def ConstantBPMWrite(geomParams,loadParams,dirSaveFile):
 
     with open(os.path.abspath(os.path.join(dirSaveFile ,'BPM.dat')), 'bw') as f_bin:
 
-        f_bin.write(struct.pack('>i', magic_number))
-        f_bin.write(struct.pack('>i', nSect))
-        f_bin.write(struct.pack('>i', uniformBlade))
-        f_bin.write(struct.pack('>i', sectChordFlag))
-        f_bin.write(struct.pack('>i', sectLengthFlag))
-        f_bin.write(struct.pack('>i', TEthicknessFlag))
-        f_bin.write(struct.pack('>i', TEflowAngleFlag))
-        f_bin.write(struct.pack('>i', TipLCSFlag))
-        f_bin.write(struct.pack('>i', SectAOAFlag))
-        f_bin.write(struct.pack('>i', UFlag))
-        f_bin.write(struct.pack('>i', timeType))
+        f_bin.write(bpmHeader.pack(magic_number, nSect, uniformBlade, sectChordFlag, sectLengthFlag, TEthicknessFlag,
+                                   TEflowAngleFlag, TipLCSFlag, SectAOAFlag, UFlag, timeType))
 
+        #   Constant blade section data: the sectional chord, length, TE thickness, and TE flow angle of each section
+        writeRecord(f_bin, np.transpose([geomParams['chordDist'][:nSect], geomParams['sectLen'][:nSect],
+                                         geomParams['TE_thick'][:nSect], TEflowAngle[:nSect]]), bpmFloat)
 
-    #   Constant blade section data
-        for i in range(0,nSect):
-            #   sectional chord
-            f_bin.write(struct.pack('>f', geomParams['chordDist'][i]))
-            #   sectional length
-            f_bin.write(struct.pack('>f', geomParams['sectLen'][i]))
-            #   TE Thickness
-            f_bin.write(struct.pack('>f', geomParams['TE_thick'][i]))
-            #   TE Flow Angle
-            f_bin.write(struct.pack('>f', TEflowAngle[i]))
-
-        # for i in range(0,nSect):
-            #   Effective sectional AoA
-        f_bin.write(struct.pack('>'+str(len(loadParams['AoA']))+'f', *loadParams['AoA']))
-            # f_bin.write(struct.pack('>f', loadParams['AoA'][i]))
-            #   Sectional tip lift-curve slope
-        # for i in range(nXsecs):
-        #     f_bin.write(struct.pack('<f', loadParams['ClaDist'][i]))
-        # for i in range(0,nSect):
-            #   Sectional freestream velocity
-        f_bin.write(struct.pack('>'+str(len(loadParams['U']))+'f', *loadParams['U']))
-
+        #   Effective sectional AoA
+        writeRecord(f_bin, loadParams['AoA'], bpmFloat)
+        #   Sectional freestream velocity
+        writeRecord(f_bin, loadParams['U'], bpmFloat)
@@ -9,8 +9,8 @@
 def ConstantLoadingPatchFileWrite(loadingFileName, loadParams, nXsecs,dirSaveFile):
     #%% imports necessary modules
     import numpy as np
-    import struct
     import os
+    from WopwopBinary import functionalHeader, zoneHeader, patchFloat, patchInt, writeRecord, asciiBytes
     #%%
     aeroLoads = np.transpose([loadParams['dFx'],loadParams['dFy'],loadParams['dFz']])
     # aeroLoads = aeroLoads/np.expand_dims(loadParams['compactArea'],axis = 1)
@@ -50,30 +50,11 @@ def ConstantLoadingPatchFileWrite(loadingFileName, loadParams, nXsecs,dirSaveFil
 
     with open(os.path.abspath(os.path.join(dirSaveFile, loadingFileName + '.dat')),'bw') as f_bin:
 
-        f_bin.write(struct.pack('<i', magic_number))
-        f_bin.write(struct.pack('<i', version_number[0]))
-        f_bin.write(struct.pack('<i', version_number[1]))
-        comments_bin = struct.pack('<' + str(len(comments)) + 's', bytes(comments, encoding='ascii'))
-        f_bin.write(comments_bin)
-        f_bin.write(struct.pack(str(1024 - len(comments_bin)) + 'x'))
-        f_bin.write(struct.pack('<i', 2))
-        f_bin.write(struct.pack('<i', Nzones))
-        f_bin.write(struct.pack('<i', grid_type))
-        f_bin.write(struct.pack('<i', geom_type))
-        f_bin.write(struct.pack('<i', vector_centering))
-        f_bin.write(struct.pack('<i', data_type))
-        f_bin.write(struct.pack('<i', ref_frame))
-        f_bin.write(struct.pack('<i', precision))
-        f_bin.write(struct.pack('<i', 0))
-        f_bin.write(struct.pack('<i', 0))
-
-        for i in range(len(dataZones)):
-            f_bin.write(struct.pack('<i', dataZones[i]))
-
-        f_bin.write(struct.pack('<32s', bytes(zoneName, encoding='ascii')))
-        f_bin.write(struct.pack('<i', iMax))
-        f_bin.write(struct.pack('<i', jMax))
-
-        for i in range(np.size(aeroLoads,1)):
-            f_bin.write(struct.pack('<' + str(np.size(aeroLoads,0)) + 'f', *aeroLoads[:,i]))
+        f_bin.write(functionalHeader.pack(magic_number, version_number[0], version_number[1], asciiBytes(comments), 2,
+                                          Nzones, grid_type, geom_type, vector_centering, data_type, ref_frame,
+                                          precision, 0, 0))
+        writeRecord(f_bin, dataZones, patchInt)
+        f_bin.write(zoneHeader.pack(asciiBytes(zoneName), iMax, jMax))
 
+        #   each component of the loading vectors is written out in turn
+        writeRecord(f_bin, np.transpose(aeroLoads), patchFloat)
@@ -0,0 +1,158 @@
+#       VSP2WOPWOP DegenGeom Binary Cache
+
+#   This module maintains a persistent binary cache of analyzed DegenGeom files so that an unchanged geometry does not
+#   need to be parsed from the csv file on every run. Each entry is keyed by the hash of the csv file's contents and the
+#   version of the parser, and is stored in its own directory. The directory contains an index file (index.json), which
+#   holds the header rows and the byte offsets of each degenerate geometry block, and a .npy file for each block that
+#   has been parsed. The blocks are memory-mapped when they are loaded. The total size of the cache is capped, once it
+#   is exceeded the least recently used entries are evicted.
+
+#%% imports necessary modules
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from AnalyzeDegenGeom import parserVersion
+
+#%%
+def cacheKey(filePath):
+    '''
+    This function computes the key of the cache entry corresponding to a DegenGeom file.
+    :param filePath: path to the DegenGeom csv file
+    :return:
+    :param key: hash of the file contents combined with the parser version
+    '''
+    h = hashlib.sha1()
+    with open(filePath, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            h.update(chunk)
+    return h.hexdigest() + '_v' + str(parserVersion)
+
+
+def cacheLoad(key, cacheDir):
+    '''
+    This function returns the cached index of a DegenGeom file, if it is available.
+    :param key: cache key of the DegenGeom file
+    :param cacheDir: directory where the cache is located
+    :return:
+    :param index: byte offsets of each degenerate geometry block of each component
+    :param indHeader: list of the header rows of each degenerate geometry type
+    '''
+    dirEntry = os.path.join(cacheDir, key)
+    try:
+        with open(os.path.join(dirEntry, 'index.json'), 'r') as f:
+            entry = json.load(f)
+        #   updates the access time of the entry, which is referenced when evicting the least recently used entries
+        os.utime(os.path.join(dirEntry, 'index.json'))
+    except (OSError, ValueError):
+        return None
+
+    indHeader = [(n, header) for n, header in entry['indHeader']]
+
+    return entry['index'], indHeader
+
+
+def cacheSave(key, cacheDir, index, indHeader, cacheSize):
+    '''
+    This function creates the cache entry of a DegenGeom file and then evicts the least recently used entries until the
+    total size of the cache is within its limit. The entry is first written to a temporary directory, which is then
+    renamed, so that a partially written entry is never read.
+    :param key: cache key of the DegenGeom file
+    :param cacheDir: directory where the cache is located
+    :param index: byte offsets of each degenerate geometry block of each component
+    :param indHeader: list of the header rows of each degenerate geometry type
+    :param cacheSize: maximum size of the cache [MB]
+    '''
+    dirEntry = os.path.join(cacheDir, key)
+    if os.path.exists(dirEntry):
+        return
+    os.makedirs(cacheDir, exist_ok=True)
+    dirTemp = dirEntry + '.' + str(os.getpid()) + '.tmp'
+    if os.path.exists(dirTemp):
+        shutil.rmtree(dirTemp)
+    os.mkdir(dirTemp)
+
+    with open(os.path.join(dirTemp, 'index.json'), 'w') as f:
+        json.dump({'indHeader': [[n, header] for n, header in indHeader], 'index': index}, f)
+
+    try:
+        os.rename(dirTemp, dirEntry)
+    except OSError:
+        #   another process has written the same entry in the meantime
+        shutil.rmtree(dirTemp, ignore_errors=True)
+
+    cacheEvict(cacheDir, cacheSize, keep=key)
+
+
+def cacheLoadBlock(cacheDir, key, component, block):
+    '''
+    This function returns the memory-mapped array of a degenerate geometry block, if it has been cached.
+    :param cacheDir: directory where the cache is located
+    :param key: cache key of the DegenGeom file
+    :param component: name of the component
+    :param block: name of the degenerate geometry
+    '''
+    try:
+        return np.load(os.path.join(cacheDir, key, blockFileName(component, block)), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def cacheSaveBlock(cacheDir, key, component, block, data, cacheSize):
+    '''
+    This function adds the array of a parsed degenerate geometry block to an existing cache entry.
+    :param cacheDir: directory where the cache is located
+    :param key: cache key of the DegenGeom file
+    :param component: name of the component
+    :param block: name of the degenerate geometry
+    :param data: parsed array of the degenerate geometry
+    :param cacheSize: maximum size of the cache [MB]
+    '''
+    dirEntry = os.path.join(cacheDir, key)
+    if not os.path.isdir(dirEntry):
+        return
+    fileName = os.path.join(dirEntry, blockFileName(component, block))
+    fileTemp = fileName + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(fileTemp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+        os.replace(fileTemp, fileName)
+    except OSError:
+        #   the entry has been evicted by another process in the meantime
+        return
+
+    cacheEvict(cacheDir, cacheSize, keep=key)
+
+
+def blockFileName(component, block):
+    return component.replace(' ', '') + '_' + block + '.npy'
+
+
+def cacheEvict(cacheDir, cacheSize, keep=None):
+    '''
+    This function deletes the least recently used cache entries until the total size of the cache is within its limit.
+    :param cacheDir: directory where the cache is located
+    :param cacheSize: maximum size of the cache [MB]
+    :param keep: key of an entry that should not be evicted (i.e. the entry that was just written)
+    '''
+    entries = []
+    for key in os.listdir(cacheDir):
+        dirEntry = os.path.join(cacheDir, key)
+        if key.endswith('.tmp') or not os.path.isdir(dirEntry):
+            continue
+        try:
+            size = sum(os.path.getsize(os.path.join(dirEntry, f)) for f in os.listdir(dirEntry))
+            accessed = os.path.getmtime(os.path.join(dirEntry, 'index.json'))
+        except OSError:
+            continue
+        entries.append((accessed, size, key))
+
+    totalSize = sum(entry[1] for entry in entries)
+    for accessed, size, key in sorted(entries):
+        if totalSize <= cacheSize * 2 ** 20:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(cacheDir, key), ignore_errors=True)
+        totalSize = totalSize - size
@@ -26,3 +26,15 @@ def ErrorHandles(UserIn):
         assert type(UserIn['zMax']) is list, "Ensure that 'zMax' is specified as a comma-delimited list"
     elif UserIn['obsType']==2:
         assert type(UserIn['radius']) is list, "Ensure that 'radius' is specified as a comma-delimited list"
+
+    assert type(UserIn['nWorkers']) is int and UserIn['nWorkers'] >= 1, "Ensure that 'nWorkers' is specified as a positive integer"
+    assert type(UserIn['writeThreads']) is int and UserIn['writeThreads'] >= 0, "Ensure that 'writeThreads' is specified as a non-negative integer"
+    assert type(UserIn['writeQueue']) is int and UserIn['writeQueue'] >= 1, "Ensure that 'writeQueue' is specified as a positive integer"
+    if UserIn['archiveOutput'] == 1:
+        assert UserIn['resumeSweep'] == 0, "The archive output mode ('archiveOutput' = 1) requires 'resumeSweep' = 0"
+    assert type(UserIn['phiRes']) is int and UserIn['phiRes'] >= 3, "Ensure that 'phiRes' is specified as an integer greater than two"
+    assert type(UserIn['andersonDepth']) is int and UserIn['andersonDepth'] >= 0, "Ensure that 'andersonDepth' is specified as a non-negative integer"
+    assert type(UserIn['inflowMaxIter']) is int and UserIn['inflowMaxIter'] >= 1, "Ensure that 'inflowMaxIter' is specified as a positive integer"
+    if UserIn['ffBatch'] == 1:
+        assert UserIn['inflowMod'] in [1, 2, 3], "The batched forward flight trim ('ffBatch' = 1) only supports 'inflowMod' = 1, 2, or 3"
+        assert UserIn['phiResTol'] == 0, "The batched forward flight trim ('ffBatch' = 1) requires 'phiResTol' = 0"
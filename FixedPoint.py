@@ -0,0 +1,174 @@
+#       VSP2WOPWOP Accelerated Fixed Point Iteration
+
+#   This function solves x = g(x), which is how each of the inflow models is converged. Rather than simply repeating
+#   x = g(x) until the relative change of every element is less than the tolerance, the next iterate is formed with
+#   Anderson mixing: the combination of the previous 'depth' iterates that minimizes the linearized residual,
+#   g(x) - x, in a least squares sense. The mixed iterate is only accepted if it is finite and of the same sign as g(x),
+#   the history is otherwise discarded and a plain fixed point step is taken, as it is whenever the residual increases.
+#   The number of evaluations of g is limited to maxIter so that a non-convergent iteration always terminates. With
+#   depth = 0 the iterates are identical to those of the plain fixed point iteration. fixedPointBatch carries out the
+#   same iteration for multiple independent problems at once, such as the inflow distributions of the cases of a sweep.
+
+#%% imports necessary modules
+import numpy as np
+
+#%%
+def fixedPoint(g, x0, tol, maxIter=200, depth=3, report=None):
+    '''
+    This function converges the fixed point iteration x = g(x). Elements of the residual that are not finite are
+    considered to have converged and are excluded from the mixing.
+    :param g: function returning the next iterate, of the same size as x
+    :param x0: initial guess, either a scalar or an array
+    :param tol: tolerance of the relative change in each element of x between successive iterations
+    :param maxIter: maximum number of evaluations of g
+    :param depth: number of previous iterates included in the Anderson mixing, set equal to zero for the plain fixed
+    point iteration
+    :param report: dictionary that accumulates the number of calls, evaluations of g, and unconverged calls
+    :return:
+    :param x: g evaluated at the final iterate
+    :param nIter: number of evaluations of g
+    :param converged: true if the relative change of every element is less than the tolerance
+    '''
+    x = x0
+    dG, dF = [], []
+    gPrev, fPrev = None, None
+    converged = False
+
+    for nIter in range(1, maxIter + 1):
+        gx = g(x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = np.abs((gx - x) / gx)
+        if not np.any(err > tol):
+            converged = True
+            break
+        if depth == 0:
+            x = gx
+            continue
+
+        gFlat = np.ravel(gx).astype(float)
+        f = gFlat - np.ravel(x)
+        finite = np.isfinite(f)
+        #   the history is discarded if the residual has increased
+        if fPrev is not None and np.linalg.norm(f[finite]) > np.linalg.norm(fPrev[finite]):
+            dG, dF = [], []
+        elif fPrev is not None:
+            dG.append(gFlat - gPrev)
+            dF.append(f - fPrev)
+            if len(dF) > depth:
+                dG.pop(0)
+                dF.pop(0)
+        gPrev, fPrev = gFlat, f
+
+        x = gx
+        if len(dF) > 0:
+            F = np.stack(dF, axis=1)[finite]
+            G = np.stack(dG, axis=1)[finite]
+            if np.all(np.isfinite(F)) and np.all(np.isfinite(G)):
+                #   the least squares problem is solved through its normal equations, which are only of size depth
+                gamma = np.linalg.lstsq(F.T @ F, F.T @ f[finite], rcond=None)[0]
+                xMix = gFlat.copy()
+                xMix[finite] = gFlat[finite] - G @ gamma
+                if np.all(np.isfinite(xMix[finite])) and np.all(np.sign(xMix[finite]) == np.sign(gFlat[finite])):
+                    x = np.reshape(xMix, np.shape(gx))
+
+    if report is not None:
+        report['calls'] = report['calls'] + 1
+        report['iterations'] = report['iterations'] + nIter
+        report['unconverged'] = report['unconverged'] + (not converged)
+
+    return gx, nIter, converged
+
+
+def fixedPointBatch(g, x0, tol, maxIter=200, depth=3):
+    '''
+    This function converges the fixed point iterations x = g(x) of multiple independent problems, which correspond to
+    the first axis of x. Only the problems that have not yet converged are evaluated on each iteration, while the
+    Anderson mixing, along with its safeguards, is carried out for each problem independently, as in fixedPoint. Since
+    the mixing coefficients of each problem are solved for from the normal equations of the least squares problem, any
+    history that has not yet been filled contributes nothing to the mixing.
+    :param g: function returning the next iterate of the problems at the positions pos along the first axis, called as
+    g(x[pos], pos), where pos is a slice if every problem is evaluated
+    :param x0: initial guess of each problem
+    :param tol: tolerance of the relative change in each element of x between successive iterations
+    :param maxIter: maximum number of evaluations of g
+    :param depth: number of previous iterates included in the Anderson mixing, set equal to zero for the plain fixed
+    point iteration
+    :return:
+    :param x: g evaluated at the final iterate of each problem
+    :param nIter: number of evaluations of g of each problem
+    :param converged: true for each problem whose relative change of every element is less than the tolerance
+    '''
+    x = np.array(x0, dtype=float)
+    gOut = x.copy()
+    n = len(x)
+    size = x[0].size
+    nIter = np.zeros(n, dtype=int)
+    active = np.ones(n, dtype=bool)
+
+    #   differences of successive iterates and residuals of each problem, along with the slot that is overwritten next
+    dG, dF = np.zeros((n, depth, size)), np.zeros((n, depth, size))
+    gPrev, fPrev = np.zeros((n, size)), np.zeros((n, size))
+    hasPrev = np.zeros(n, dtype=bool)
+    slot = np.zeros(n, dtype=int)
+
+    def select(pos):
+        #   the problems are referenced by a slice rather than by an index array if all of them are selected, so that
+        #   the arrays are indexed without being copied
+        return slice(None) if len(pos) == n else pos
+
+    for i in range(maxIter):
+        pos = np.where(active)[0]
+        if len(pos) == 0:
+            break
+        sel = select(pos)
+        gx = g(x[sel], sel)
+        nIter[sel] = nIter[sel] + 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = np.abs((gx - x[sel]) / gx)
+        gOut[sel] = gx
+        active[sel] = np.any(np.reshape(err > tol, (len(pos), -1)), axis=1)
+        if depth == 0:
+            x[sel] = gx
+            continue
+
+        #   problems that have not converged
+        keep = active[pos]
+        if not np.all(keep):
+            pos, gx = pos[keep], gx[keep]
+            sel = pos
+        gFlat = np.reshape(gx, (len(pos), size))
+        f = gFlat - np.reshape(x[sel], (len(pos), size))
+        finite = np.isfinite(f)
+        allFinite = np.all(finite)
+        if not allFinite:
+            f = np.where(finite, f, 0)
+
+        #   the history is discarded if the residual has increased
+        fPrevSel = fPrev[sel] if allFinite else np.where(finite, fPrev[sel], 0)
+        increased = np.linalg.norm(f, axis=1) > np.linalg.norm(fPrevSel, axis=1)
+        reset = pos[hasPrev[sel] & increased]
+        dG[reset], dF[reset] = 0, 0
+        append = hasPrev[sel] & ~increased
+        ind = pos[append]
+        dG[ind, slot[ind]] = gFlat[append] - gPrev[ind]
+        dF[ind, slot[ind]] = f[append] - fPrev[ind]
+        slot[ind] = (slot[ind] + 1) % depth
+        gPrev[sel], fPrev[sel], hasPrev[sel] = gFlat, f, True
+
+        F, G = dF[sel], dG[sel]
+        if not allFinite:
+            F, G = np.where(finite[:, None, :], F, 0), np.where(finite[:, None, :], G, 0)
+        gamma = np.linalg.pinv(F @ np.transpose(F, (0, 2, 1))) @ (F @ f[:, :, None])
+        with np.errstate(invalid='ignore'):
+            xMix = gFlat - np.squeeze(np.transpose(G, (0, 2, 1)) @ gamma, axis=2)
+            #   the mixed iterate is only accepted if it is finite and of the same sign as g(x), np.sign(nan) being
+            #   unequal to any sign
+            same = np.sign(xMix) == np.sign(gFlat)
+        if allFinite:
+            accept = np.all(same, axis=1)
+        else:
+            accept = np.all(~finite | same, axis=1)
+            xMix = np.where(finite, xMix, gFlat)
+        x[sel] = np.reshape(np.where(accept[:, None], xMix, gFlat), np.shape(gx))
+
+    return gOut, nIter, ~active
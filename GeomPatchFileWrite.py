@@ -10,9 +10,9 @@
 def GeomPatchFileWrite(geomFileName, geomParams, dirSaveFile):
 
     #%% imports necessary modules
-    import struct
     import numpy as np
     import os
+    from WopwopBinary import geomHeader, zoneHeader, patchFloat, writeRecord, asciiBytes
     #%%
 
     fileName = geomFileName
@@ -35,36 +35,16 @@ def GeomPatchFileWrite(geomFileName, geomParams, dirSaveFile):
 
     with open(os.path.abspath(os.path.join(dirSaveFile,fileName + '.dat')),'bw') as f_bin:
 
-        f_bin.write(struct.pack('<i', magic_number))
-        f_bin.write(struct.pack('<i', version_number[0]))
-        f_bin.write(struct.pack('<i', version_number[1]))
-        f_bin.write(struct.pack('<32s', bytes(units, encoding='ascii')))
-        comments_bin = struct.pack('<' + str(len(comments)) + 's', bytes(comments, encoding='ascii'))
-        f_bin.write(comments_bin)
-        f_bin.write(struct.pack(str(1024 - len(comments_bin)) + 'x'))
-        f_bin.write(struct.pack('<i', geometryFile))
-        f_bin.write(struct.pack('<i', Nzones))
-        f_bin.write(struct.pack('<i', grid_type))
-        f_bin.write(struct.pack('<i', geometry_type))
-        f_bin.write(struct.pack('<i', vector_centering))
-        f_bin.write(struct.pack('<i', precision))
-        f_bin.write(struct.pack('<i', iblank))
-        f_bin.write(struct.pack('<i', 0))
+        f_bin.write(geomHeader.pack(magic_number, version_number[0], version_number[1], asciiBytes(units),
+                                    asciiBytes(comments), geometryFile, Nzones, grid_type, geometry_type,
+                                    vector_centering, precision, iblank, 0))
 
         #structured header
         for i in range(Nzones):
-            f_bin.write(struct.pack('<32s', bytes(zoneName[i], encoding='ascii')))
-            f_bin.write(struct.pack('<i', iMax[i]))
-            f_bin.write(struct.pack('<i', jMax[i]))
+            f_bin.write(zoneHeader.pack(asciiBytes(zoneName[i]), iMax[i], jMax[i]))
 
-        for i in range(np.size(geomParams['surfNodes'],1)):
-            f_bin.write(struct.pack('<' + str(np.size(geomParams['surfNodes'],0)) + 'f',*geomParams['surfNodes'][:,i]))
-
-        for i in range(np.size(geomParams['surfNorms'],1)):
-            f_bin.write(struct.pack('<' + str(np.size(geomParams['surfNorms'],0)) + 'f',*geomParams['surfNorms'][:,i]))
-
-        for i in range(np.size(geomParams['liftLineCoord'],1)):
-            f_bin.write(struct.pack('<' + str(np.size(geomParams['liftLineCoord'],0)) + 'f',*geomParams['liftLineCoord'][:,i]))
-
-        for i in range(np.size(geomParams['liftLineNorm'],1)):
-            f_bin.write(struct.pack('<' + str(np.size(geomParams['liftLineNorm'],0)) + 'f',*geomParams['liftLineNorm'][:,i]))
+        #   each component of the coordinates and normal vectors is written out in turn
+        writeRecord(f_bin, np.transpose(geomParams['surfNodes']), patchFloat)
+        writeRecord(f_bin, np.transpose(geomParams['surfNorms']), patchFloat)
+        writeRecord(f_bin, np.transpose(geomParams['liftLineCoord']), patchFloat)
+        writeRecord(f_bin, np.transpose(geomParams['liftLineNorm']), patchFloat)
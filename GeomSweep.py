@@ -0,0 +1,100 @@
+#       VSP2WOPWOP Design Mode Geometry Sweep
+
+#   This module runs the design mode (OperMode = 1), in which each DegenGeom geometry variant is trimmed to its own
+#   operating condition. The geometries are independent of one another so each one is parsed, processed, trimmed, and
+#   written out by a worker process when UserIn['nWorkers'] > 1. The XFoil polars are read once by the main process and
+#   are shared with the workers. The results are yielded in the order of UserIn['dataFileName'], each as soon as it is
+#   complete, so that MainDict and cases.nam are assembled exactly as in a serial run and each geometry can be written to
+#   the HDF5 file while the following geometries are still being trimmed.
+
+#%% imports necessary modules
+import os
+from shutil import rmtree
+from AnalyzeDegenGeom import AnalyzeDegenGeom
+from ProcessGeom import ProcessGeom
+from loadingHover import loadingHover
+from loadingFF import loadingFF
+from ConstantLoadingPatchFileWrite import ConstantLoadingPatchFileWrite
+from PeriodicLoadingPatchFileWrite import PeriodicLoadingPatchFileWrite
+from nmlWrite import nml_write
+from ConstantBPMWrite import ConstantBPMWrite
+from PeriodicBPMWrite import PeriodicBPMWrite
+from GeomPatchFileWrite import GeomPatchFileWrite
+from designModeVal import designModeVal
+from CaseSweep import poolIter
+
+#%%
+#   Quantities that are shared by all the geometries. These are set once per worker process.
+shared = {}
+
+
+def initSweep(UserIn, XsecPolar, dirSave):
+    shared.update({'UserIn': UserIn, 'XsecPolar': XsecPolar, 'dirSave': dirSave})
+
+
+def runGeom(iter_geom):
+    '''
+    This function parses, processes, and trims a single DegenGeom geometry and writes out its files.
+    :param iter_geom: index of the DegenGeom geometry in UserIn['dataFileName']
+    :return:
+    :param geomParams: dictionary of the blade geometric parameters
+    :param loadParams: dictionary of the computed loading parameters
+    '''
+    UserIn = shared['UserIn']
+    dataFileName = UserIn['dataFileName'][iter_geom]
+
+    #   Parses and returns data contained in the DegenGeom file, or loads it from the cache if the file has already
+    #   been parsed
+    if UserIn['cacheDegenGeom'] == 1:
+        [dataSorted, indHeader] = AnalyzeDegenGeom(dataFileName, UserIn['cacheDir'], UserIn['cacheSize'])
+    else:
+        [dataSorted, indHeader] = AnalyzeDegenGeom(dataFileName)
+
+    geomParams = ProcessGeom(dataSorted, indHeader, UserIn['loadPos'], UserIn['Nb'], UserIn['rotation'])
+    #   the DegenGeom file is no longer referenced once the blade geometry has been processed
+    dataSorted.close()
+
+    dirSaveFile = os.path.abspath(os.path.join(shared['dirSave'], dataFileName[:-4]))
+    if os.path.exists(dirSaveFile) == 1:
+        rmtree(dirSaveFile)
+    os.mkdir(dirSaveFile)
+
+    GeomPatchFileWrite(UserIn['geomFileName'], geomParams, dirSaveFile)
+
+    T, Vz, Vx, omega, alphaShaft, XsecPolar_select = designModeVal(UserIn, shared['XsecPolar'], iter_geom)
+
+    if Vx == 0:
+        loadParams = loadingHover(UserIn, geomParams, XsecPolar_select, T, omega, Vz)
+        ConstantLoadingPatchFileWrite(UserIn['loadingFileName'], loadParams, geomParams['nXsecs'], dirSaveFile)
+    else:
+        loadParams = loadingFF(UserIn, geomParams, XsecPolar_select, T, omega, Vx, Vz, alphaShaft)
+        PeriodicLoadingPatchFileWrite(UserIn['loadingFileName'], loadParams, geomParams['nXsecs'], omega, dirSaveFile)
+
+    if UserIn['BBNoiseFlag'] == 1:
+        if Vx == 0:
+            ConstantBPMWrite(geomParams, loadParams, dirSaveFile)
+        else:
+            PeriodicBPMWrite(geomParams, loadParams, UserIn['nRev'], omega, dirSaveFile)
+
+    if UserIn['nmlWrite'] == 1:
+        nml_write(UserIn, loadParams, dirSaveFile, Vx, Vz, omega, alphaShaft, iter_geom, geomParams['nXsecs'])
+
+    return geomParams, loadParams
+
+
+def GeomSweep(UserIn, XsecPolar, dirSave):
+    '''
+    This function runs all the DegenGeom geometries of the design mode, either serially or over a pool of worker
+    processes, and yields the results of each geometry in order as soon as they are complete.
+    :param UserIn: dictionary of the user inputs
+    :param XsecPolar: dictionary of the airfoil polars, corresponding to each rotational rate
+    :param dirSave: parent directory, in which the directory of each geometry is created
+    :return:
+    :param geomName: folder name of the geometry
+    :param geomDict: dictionary of the geometric and loading parameters of the geometry
+    '''
+    out = poolIter(runGeom, list(range(len(UserIn['dataFileName']))), UserIn['nWorkers'], initSweep,
+                   (UserIn, XsecPolar, dirSave))
+
+    for dataFileName, (geomParams, loadParams) in zip(UserIn['dataFileName'], out):
+        yield dataFileName[:-4], {'geomParams': geomParams, 'XsecPolar': XsecPolar, 'loadParams': loadParams}
@@ -0,0 +1,59 @@
+#       VSP2WOPWOP Content-Addressed Output Store
+
+#   This module maintains a content-addressed store of output files that are identical across the cases of a sweep,
+#   such as the blade geometry patch file. Each file is written once, named by the hash of its contents, and is then
+#   linked into every case directory under the name that is referenced by the case namelist. A hard link is used if
+#   possible, otherwise a relative symbolic link, and the file is only copied if the filesystem supports neither.
+
+#%% imports necessary modules
+import os
+import shutil
+import hashlib
+
+#%%
+def storeFile(filePath, dirStore):
+    '''
+    This function moves a file into the store, unless a file of identical contents is already stored, in which case it
+    is simply removed.
+    :param filePath: path to the file that is to be stored
+    :param dirStore: directory of the store
+    :return:
+    :param storePath: path to the stored file, named by the hash of its contents and its original extension
+    '''
+    h = hashlib.sha1()
+    with open(filePath, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            h.update(chunk)
+    storePath = os.path.abspath(os.path.join(dirStore, h.hexdigest() + os.path.splitext(filePath)[1]))
+
+    os.makedirs(dirStore, exist_ok=True)
+    if os.path.exists(storePath):
+        os.remove(filePath)
+    else:
+        os.replace(filePath, storePath)
+    return storePath
+
+
+def linkFile(storePath, filePath, symbolic=True):
+    '''
+    This function links a stored file into a case directory.
+    :param storePath: path to the stored file, returned by storeFile
+    :param filePath: path of the link
+    :param symbolic: if False, the file is copied rather than symbolically linked if it cannot be hard linked, e.g. if
+    the case directory is later archived, in which case only the link itself would be stored
+    :return:
+    :param linkType: 'hard', 'symbolic', or 'copy', depending on how the file was linked
+    '''
+    try:
+        os.link(storePath, filePath)
+        return 'hard'
+    except OSError:
+        if not symbolic:
+            shutil.copyfile(storePath, filePath)
+            return 'copy'
+    try:
+        os.symlink(os.path.relpath(storePath, os.path.dirname(os.path.abspath(filePath))), filePath)
+        return 'symbolic'
+    except OSError:
+        shutil.copyfile(storePath, filePath)
+        return 'copy'
@@ -11,8 +11,8 @@
 def PeriodicBPMWrite(geomParams,loadParams,nRev,omega,dirSaveFile):
     #%% imports necessary modules
     import os
-    import struct
     import numpy as np
+    from WopwopBinary import bpmHeader, bpmPeriodicHeader, bpmFloat, writeRecord
 
     #%% TEflowAngle hardcoded to 1 degree
     TEflowAngle = np.ones(len(geomParams['chordDist']))*(np.pi/180)
@@ -34,47 +34,21 @@ def PeriodicBPMWrite(geomParams,loadParams,nRev,omega,dirSaveFile):
     period = (omega/60) ** -1                #  Period of revolution
     Nsteps = loadParams['phiRes']         #  Azimuthal loading resolution
     time = np.linspace(0,nRev*period,nRev*Nsteps)
-    rev_count = 0
 
 #%%
 
     with open(os.path.abspath(os.path.join(dirSaveFile ,'BPM.dat')), 'bw') as f_bin:
 
-        f_bin.write(struct.pack('>i', magic_number))
-        f_bin.write(struct.pack('>i', nSect))
-        f_bin.write(struct.pack('>i', uniformBlade))
-        f_bin.write(struct.pack('>i', sectChordFlag))
-        f_bin.write(struct.pack('>i', sectLengthFlag))
-        f_bin.write(struct.pack('>i', TEthicknessFlag))
-        f_bin.write(struct.pack('>i', TEflowAngleFlag))
-        f_bin.write(struct.pack('>i', TipLCSFlag))
-        f_bin.write(struct.pack('>i', SectAOAFlag))
-        f_bin.write(struct.pack('>i', UFlag))
-        f_bin.write(struct.pack('>i', timeType))
+        f_bin.write(bpmHeader.pack(magic_number, nSect, uniformBlade, sectChordFlag, sectLengthFlag, TEthicknessFlag,
+                                   TEflowAngleFlag, TipLCSFlag, SectAOAFlag, UFlag, timeType))
+        f_bin.write(bpmPeriodicHeader.pack(nRev, period, Nsteps))
 
-        f_bin.write(struct.pack('>i', nRev))
-        f_bin.write(struct.pack('>f', period))
-        f_bin.write(struct.pack('>i', Nsteps))
+        #   Constant blade section data: the sectional chord, length, TE thickness, and TE flow angle of each section
+        writeRecord(f_bin, np.transpose([geomParams['chordDist'][:nSect], geomParams['sectLen'][:nSect],
+                                         geomParams['TE_thick'][:nSect], TEflowAngle[:nSect]]), bpmFloat)
 
-        #   Constant blade section data
-        for i in range(0, nSect):
-            #   sectional chord
-            f_bin.write(struct.pack('>f', geomParams['chordDist'][i]))
-            #   sectional length
-            f_bin.write(struct.pack('>f', geomParams['sectLen'][i]))
-            #   TE Thickness
-            f_bin.write(struct.pack('>f',  geomParams['TE_thick'][i]))
-            #   TE Flow Angle
-            f_bin.write(struct.pack('>f', TEflowAngle[i]))
-
-        for i,t in enumerate(time):
-            f_bin.write(struct.pack('>f', t))
-            if i > 0 and i % Nsteps == 0:
-                rev_count += 1
-            #   Constant blade section data
-            # for ii in range(0, nSect):
-            #     f_bin.write(struct.pack('>f', loadParams['AoA'][i-rev_count*Nsteps][ii]))
-            #     f_bin.write(struct.pack('>f', loadParams['U'][i-rev_count*Nsteps][ii]))
-
-            f_bin.write(struct.pack('>' + str(np.shape(loadParams['AoA'])[1]) + 'f', *loadParams['AoA'][i-rev_count*Nsteps]))
-            f_bin.write(struct.pack('>' + str(np.shape(loadParams['U'])[1]) + 'f', *loadParams['U'][i-rev_count*Nsteps]))
+        #   Each time step consists of the time followed by the sectional angle of attack and freestream velocity at
+        #   the corresponding azimuthal station, which repeat every revolution
+        ind = np.arange(len(time)) % Nsteps
+        writeRecord(f_bin, np.hstack([np.expand_dims(time, axis=1), np.asarray(loadParams['AoA'])[ind],
+                                      np.asarray(loadParams['U'])[ind]]), bpmFloat)
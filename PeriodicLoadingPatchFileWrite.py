@@ -10,8 +10,8 @@
 def PeriodicLoadingPatchFileWrite(loadingFileName, loadParams, nXsecs, omega,dirSaveFile):
     #%% imports necessary modules
     import numpy as np
-    import struct
     import os
+    from WopwopBinary import functionalHeader, periodicZoneHeader, patchFloat, patchInt, writeRecord, asciiBytes
     #%%
     loads = [loadParams['dFx'],loadParams['dFy'],loadParams['dFz']]
     # aeroLoads = aeroLoads/np.expand_dims(loadParams['compactArea'],axis = 1)
@@ -41,41 +41,18 @@ def PeriodicLoadingPatchFileWrite(loadingFileName, loadParams, nXsecs, omega,dir
 
     with open(os.path.abspath(os.path.join(dirSaveFile, loadingFileName + '.dat')),'bw') as f_bin:
 
-        f_bin.write(struct.pack('<i', magic_number))
-        f_bin.write(struct.pack('<i', version_number[0]))
-        f_bin.write(struct.pack('<i', version_number[1]))
-        comments_bin = struct.pack('<' + str(len(comments)) + 's', bytes(comments, encoding='ascii'))
-        f_bin.write(comments_bin)
-        f_bin.write(struct.pack(str(1024 - len(comments_bin)) + 'x'))
-        f_bin.write(struct.pack('<i', 2))
-        f_bin.write(struct.pack('<i', Nzones))
-        f_bin.write(struct.pack('<i', grid_type))
-        f_bin.write(struct.pack('<i', geom_type))
-        f_bin.write(struct.pack('<i', vector_centering))
-        f_bin.write(struct.pack('<i', data_type))
-        f_bin.write(struct.pack('<i', ref_frame))
-        f_bin.write(struct.pack('<i', precision))
-        f_bin.write(struct.pack('<i', 0))
-        f_bin.write(struct.pack('<i', 0))
-
-        for i in range(len(dataZones)):
-            f_bin.write(struct.pack('<i', dataZones[i]))
-
-        f_bin.write(struct.pack('<32s', bytes(zoneName, encoding='ascii')))
-        f_bin.write(struct.pack('<f', period))
-        f_bin.write(struct.pack('<i', nkey))
-        f_bin.write(struct.pack('<i', iMax))
-        f_bin.write(struct.pack('<i', jMax))
-
-        for i,key in enumerate(keys):
-
-            f_bin.write(struct.pack('<f', key))
-
-            # if i == nkey:
-            #     for ii, df in enumerate(loads):
-            #         f_bin.write(struct.pack('<' + str(np.size(df[0])) + 'f', *df[0]))
-            # else:
-            for ii, df in enumerate(loads):
-                f_bin.write(struct.pack('<'+str(np.shape(df)[1])+'f', *df[i]))
-
-
+        f_bin.write(functionalHeader.pack(magic_number, version_number[0], version_number[1], asciiBytes(comments), 2,
+                                          Nzones, grid_type, geom_type, vector_centering, data_type, ref_frame,
+                                          precision, 0, 0))
+        writeRecord(f_bin, dataZones, patchInt)
+        f_bin.write(periodicZoneHeader.pack(asciiBytes(zoneName), period, nkey, iMax, jMax))
+
+        #   The data section is assembled as a single little-endian single precision array, in which each row consists
+        #   of a key followed by the x, y, and z components of the loading at each spanwise element, and is then written
+        #   out in one call rather than packing each row individually.
+        nr = np.shape(loads[0])[1]
+        data = np.empty((nkey, 1 + len(loads) * nr), dtype=patchFloat)
+        data[:, 0] = keys
+        for ii, df in enumerate(loads):
+            data[:, 1 + ii * nr:1 + (ii + 1) * nr] = df[:nkey]
+        writeRecord(f_bin, data, patchFloat)
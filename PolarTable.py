@@ -0,0 +1,144 @@
+#       VSP2WOPWOP Airfoil Polar Table
+
+#   This module assembles the XFoil polars of the airfoil sections along the blade span into a single table so that the
+#   sectional lift and drag coefficients can be evaluated for an entire angle of attack distribution at once, rather
+#   than looping over each radial station. The table is built once per blade geometry and polar set. The polars are
+#   stacked end to end, each radial station references the polar of its airfoil section, and the stall parameters are
+#   expanded to the radial stations. The interpolation reproduces that of np.interp, which was previously applied to
+#   each station individually.
+
+#%% imports necessary modules
+import bisect
+import numpy as np
+
+#%%
+class PolarTable:
+    '''
+    Precompiled table of the airfoil polars corresponding to each radial station of the blade.
+    :param XsecPolar: dictionary of the airfoil polars, returned by polarRead
+    :param r: nondimensional radial stations
+    :param XsecLocation: nondimensional radial location at which each airfoil section begins
+    '''
+
+    def __init__(self, XsecPolar, r, XsecLocation):
+        self.keys = list(XsecPolar.keys())
+        nXsecs = len(r)
+
+        #   index of the polar corresponding to each radial station
+        self.stationPolar = np.zeros(nXsecs, dtype=int)
+        if len(XsecLocation) > 1:
+            ind = np.zeros((len(XsecLocation) + 1))
+            for i, Xsec in enumerate(XsecLocation):
+                ind[i] = bisect.bisect(r, Xsec)
+            ind[0] = 0
+            ind[-1] = nXsecs
+            for i in range(len(self.keys)):
+                self.stationPolar[int(ind[i]):int(ind[i + 1])] = i
+
+        #   stacked angle of attack, lift, and drag coefficients of all the polars and the range of each polar
+        polars = [XsecPolar[key]['Polar'] for key in self.keys]
+        self.alpha = np.concatenate([polar[:, 0] for polar in polars])
+        self.CL = np.concatenate([polar[:, 1] for polar in polars])
+        self.CD = np.concatenate([polar[:, 2] for polar in polars])
+        self.start = np.cumsum([0] + [len(polar) for polar in polars])[:-1]
+        self.end = self.start + [len(polar) for polar in polars]
+
+        #   radial stations that reference each polar
+        self.stations = [np.where(self.stationPolar == i)[0] for i in range(len(self.keys))]
+        self.contiguous = [len(cols) > 0 and cols[-1] - cols[0] + 1 == len(cols) for cols in self.stations]
+
+        #   lift curve slope and stall parameters of each radial station
+        self.liftSlope = np.array([XsecPolar[key]['Lift Slope'] for key in self.keys])[self.stationPolar]
+        self.alphaMax = np.array([XsecPolar[key]['alphaMax'] for key in self.keys])[self.stationPolar]
+        self.alphaStall = np.array([XsecPolar[key]['Alpha0'] % (2 * np.pi) for key in self.keys])[self.stationPolar]
+        self.ClMax = np.array([XsecPolar[key]['ClMax'] for key in self.keys])[self.stationPolar]
+        self.ClMin = np.array([XsecPolar[key]['ClMin'] for key in self.keys])[self.stationPolar]
+        self.CdMax = np.array([XsecPolar[key]['CdMax'] for key in self.keys])[self.stationPolar]
+        self.stallSlope = (self.ClMin - self.ClMax) / (self.alphaStall - self.alphaMax)
+        #   minimum angle of attack of the polar of each radial station
+        self.alphaMin = self.alpha[self.start][self.stationPolar]
+
+        #   resolution of the uniformly resampled table, which is only built if it is referenced
+        self.dAlpha = None
+
+    def lookup(self, AoA):
+        '''
+        This function linearly interpolates the sectional blade load coefficients from the XFoil polars based on the
+        angle of attack distribution. If the blade section is stalled CL at that section is linearly interpolated
+        between the maximum and minimum CL, while CD is simply set to its maximum value for the respective airfoil.
+        :param AoA: angle of attack distribution, the radial stations must correspond to the last axis [rad]
+        return:
+        :param CL:  lift coefficient distribution
+        :param CD:  drag coefficient distribution
+        '''
+        AoA = np.asarray(AoA, dtype=float)
+
+        #   index of the upper polar point bracketing each angle of attack, within the stacked table
+        ind = np.empty(np.shape(AoA), dtype=int)
+        for i, cols in enumerate(self.stations):
+            if len(cols) == 0:
+                continue
+            cols = slice(cols[0], cols[-1] + 1) if self.contiguous[i] else cols
+            ind[..., cols] = np.clip(np.searchsorted(self.alpha[self.start[i]:self.end[i]], AoA[..., cols], side='right'),
+                                     1, self.end[i] - self.start[i] - 1) + self.start[i]
+
+        x0, x1 = self.alpha[ind - 1], self.alpha[ind]
+        below, above = AoA < x0, AoA >= x1
+        CL = (self.CL[ind] - self.CL[ind - 1]) / (x1 - x0) * (AoA - x0) + self.CL[ind - 1]
+        CD = (self.CD[ind] - self.CD[ind - 1]) / (x1 - x0) * (AoA - x0) + self.CD[ind - 1]
+        CL = np.where(above, self.CL[ind], np.where(below, self.CL[ind - 1], CL))
+        CD = np.where(above, self.CD[ind], np.where(below, self.CD[ind - 1], CD))
+
+        #   stalled sections
+        stall = AoA > self.alphaMax
+        if np.any(stall):
+            CLstall = np.where(AoA >= self.alphaStall, self.ClMin, self.stallSlope * (AoA - self.alphaMax) + self.ClMax)
+            CL = np.where(stall, CLstall, CL)
+            CD = np.where(stall, self.CdMax, CD)
+
+        return CL, CD
+
+    def resample(self, dAlpha=np.pi / 18000):
+        '''
+        This function resamples each polar onto a uniformly spaced angle of attack grid, so that the interval
+        containing any angle of attack can be computed directly rather than searched for. The table is only rebuilt if
+        the resolution changes.
+        :param dAlpha: angle of attack resolution of the resampled table [rad], 0.01 deg by default
+        '''
+        if self.dAlpha == dAlpha:
+            return
+        self.dAlpha = dAlpha
+
+        n = [int(np.ceil((self.alpha[end - 1] - self.alpha[start]) / dAlpha)) + 1 for start, end in zip(self.start, self.end)]
+        grids = [self.alpha[start] + np.arange(ni) * dAlpha for ni, start in zip(n, self.start)]
+        self.uCL = np.concatenate([np.interp(grid, self.alpha[start:end], self.CL[start:end])
+                                   for grid, start, end in zip(grids, self.start, self.end)])
+        self.uCD = np.concatenate([np.interp(grid, self.alpha[start:end], self.CD[start:end])
+                                   for grid, start, end in zip(grids, self.start, self.end)])
+
+        #   offset of the resampled polar of each radial station within the stacked table and its last interval
+        self.uOffset = np.cumsum([0] + n)[:-1][self.stationPolar]
+        self.uLast = (np.array(n) - 2)[self.stationPolar]
+
+    def lookupUniform(self, AoA):
+        '''
+        This function linearly interpolates the sectional blade load coefficients from the uniformly resampled polars,
+        see resample(). Angles of attack that lie beyond the polar are set equal to the coefficients at its end points,
+        the stall branch is not applied.
+        :param AoA: angle of attack distribution, the radial stations must correspond to the last axis [rad]
+        return:
+        :param CL:  lift coefficient distribution
+        :param CD:  drag coefficient distribution
+        '''
+        if self.dAlpha is None:
+            self.resample()
+
+        x = (np.asarray(AoA, dtype=float) - self.alphaMin) / self.dAlpha
+        k = np.clip(np.nan_to_num(np.floor(x)), 0, self.uLast).astype(int)
+        w = np.clip(x - k, 0, 1)
+        ind = k + self.uOffset
+
+        CL = self.uCL[ind] + w * (self.uCL[ind + 1] - self.uCL[ind])
+        CD = self.uCD[ind] + w * (self.uCD[ind + 1] - self.uCD[ind])
+
+        return CL, CD
@@ -19,11 +19,11 @@ def ProcessGeom(dataSorted, indHeader, loadPos, Nb, rotation):
     pntsPerXsec = int(indHeader[0][1][2])
 
     #   extracts surface nodes
-    surfNodes = np.float64(dataSorted['Component 1']['SURFACE_NODE'][1:, :3])
+    surfNodes = dataSorted['Component 1']['SURFACE_NODE'][:, :3].copy()
 
     #   extracts LE and TE Nodes
-    LENodes = np.float64(dataSorted['Component 1']['STICK_NODE'][1:, :3])
-    TENodes = np.float64(dataSorted['Component 1']['STICK_NODE'][1:, 3:6])
+    LENodes = dataSorted['Component 1']['STICK_NODE'][:, :3]
+    TENodes = dataSorted['Component 1']['STICK_NODE'][:, 3:6]
 
     TE_thick = abs(surfNodes[2::pntsPerXsec,2]-surfNodes[(pntsPerXsec-3)::pntsPerXsec,2])
 
@@ -0,0 +1,88 @@
+#       VSP2WOPWOP Azimuthal and Radial Quadrature
+
+#   This module precomputes the quantities that are repeatedly referenced when integrating the blade loads over the
+#   rotor disk in forward flight. The nested trapezoidal integration over the radial and azimuthal stations,
+#   1/(2*pi)*np.trapz(np.trapz(f, r), phi), is equivalent to a weighted sum of f, so a single weight matrix is formed
+#   from the trapezoidal weights of each grid. The sine and cosine of the azimuth, along with their products with the
+#   radial stations, are likewise only computed once. The thrust and hub moment coefficients are evaluated together in
+#   a single weighted reduction, as are any other integrals that are stacked along a leading axis.
+
+#%% imports necessary modules
+import numpy as np
+
+#%%
+#   Quadrature of each radial and azimuthal grid that has been referenced, these are reused by subsequent cases
+cache = {}
+cacheSize = 8
+
+
+def quadrature(r, phiRes):
+    '''
+    This function returns the quadrature corresponding to the radial stations and azimuthal resolution, it is only
+    constructed the first time that the grid is referenced.
+    :param r: nondimensional radial stations
+    :param phiRes: number of azimuthal stations, spanning 0 to 2*pi
+    '''
+    key = (np.asarray(r, dtype=float).tobytes(), phiRes)
+    if key not in cache:
+        if len(cache) >= cacheSize:
+            cache.pop(next(iter(cache)))
+        cache[key] = Quadrature(r, np.linspace(0, 2 * np.pi, phiRes))
+    return cache[key]
+
+
+def trapzWeights(x):
+    '''
+    This function returns the weights of the trapezoidal rule, such that np.sum(w*f) = np.trapz(f, x).
+    '''
+    dx = np.diff(x)
+    w = np.zeros(len(x))
+    w[:-1] = w[:-1] + dx / 2
+    w[1:] = w[1:] + dx / 2
+    return w
+
+
+class Quadrature:
+    '''
+    Integration weights and trigonometric tables of an azimuthal and radial grid.
+    :param r: nondimensional radial stations
+    :param phi: azimuthal stations [rad]
+    '''
+
+    def __init__(self, r, phi):
+        self.r = r
+        self.phi = phi
+
+        #   trigonometric tables, of size [len(phi) x 1] and [len(phi) x len(r)]
+        self.sinPhi = np.expand_dims(np.sin(phi), axis=1)
+        self.cosPhi = np.expand_dims(np.cos(phi), axis=1)
+        self.rSinPhi = r * self.sinPhi
+        self.rCosPhi = r * self.cosPhi
+
+        #   weight matrix of the azimuthally averaged, 1/(2*pi), radial and azimuthal integration
+        self.W = np.outer(trapzWeights(phi), trapzWeights(r)) / (2 * np.pi)
+
+        #   weights of the thrust, roll, and pitch moment coefficients
+        self.Wmoments = np.stack([self.W, self.W * self.rSinPhi, -self.W * self.rCosPhi])
+
+    def integrate(self, f):
+        '''
+        This function evaluates 1/(2*pi)*np.trapz(np.trapz(f, r), phi), where any leading axes of f are retained so that
+        multiple quantities can be integrated in a single reduction.
+        :param f: array of size [... x len(phi) x len(r)]
+        '''
+        return np.einsum('...ij,ij->...', f, self.W)
+
+    def moments(self, dCT):
+        '''
+        This function computes the thrust, roll moment, and pitch moment coefficients from the distribution of the thrust
+        coefficient in a single weighted reduction.
+        :param dCT: radial and azimuthal distribution of the thrust coefficient, of size [... x len(phi) x len(r)], where
+        any leading axes are retained
+        :return:
+        :param CT: thrust coefficient
+        :param CMX: roll moment coefficient
+        :param CMY: pitch moment coefficient
+        '''
+        CT, CMX, CMY = np.einsum('kij,...ij->k...', self.Wmoments, dCT)
+        return CT, CMX, CMY
@@ -0,0 +1,278 @@
+#       VSP2WOPWOP Results Reader
+
+#   This module reads the results files (MainDict.h5) written by VSP2WOPWOP, either a single file or all the results
+#   files within a directory, without loading them in their entirety. Only the names of the geometries and cases are read
+#   when a file is opened, the cases of a geometry can then be selected by their operating condition, which is parsed
+#   from the case folder names, and the loading parameters of the selected cases are only read once they are indexed.
+#   Both the nested and the columnar layouts (UserIn['hdf5Columnar']) are supported. Datasets that are stored
+#   contiguously and uncompressed are memory-mapped, rather than read through h5py, so that a slice only reads the
+#   corresponding part of the file. The values that have been read are kept in a least recently used cache of a limited
+#   number of entries. Only the geometries that are listed in the index of a results file are read, such that a
+#   partially written file may be opened. An example of its usage:
+
+#       with ResultsReader('OLS') as results:
+#           cases = results.cases('OLS_DegenGeom', Vx=40)
+#           CT = results.field('OLS_DegenGeom', 'CT', cases)[:]
+#           dFz = results.field('OLS_DegenGeom', 'dFz', cases)[0]
+
+#%% imports necessary modules
+import os
+import re
+from glob import glob
+from collections import OrderedDict
+import numpy as np
+import h5py
+
+#%%
+#   operating condition encoded in the case folder names, see CaseSweep.sweepCases
+caseNamePattern = re.compile(r'T_(?P<T>[^N]+)N_Vx_(?P<Vx>-?\d+)Kts_Vz_(?P<Vz>-?\d+)ms_Nr_(?P<omega>-?\d+)RPM')
+
+
+def caseCondition(caseName):
+    '''
+    This function parses the operating condition of a case from its folder name.
+    :param caseName: case folder name
+    :return:
+    :param condition: dictionary of the thrust (N), forward velocity (kts), climb velocity (m/s), and rotational rate
+    (rpm), all but the thrust are rounded to the nearest integer, or None if the name is not that of a sweep case
+    '''
+    match = caseNamePattern.fullmatch(caseName)
+    if match is None:
+        return None
+    return {'T': float(match['T']), 'Vx': int(match['Vx']), 'Vz': int(match['Vz']), 'omega': int(match['omega'])}
+
+
+class LazyField:
+    '''
+    This class represents a loading parameter of a set of cases, which is only read once it is indexed. Indexing with
+    an integer returns the parameter of a single case, while indexing with a slice or list returns the parameters of
+    the selected cases, stacked along the first axis if they are all of the same size.
+    :param reader: ResultsReader from which the parameter is read
+    :param sources: list of the (file, dataset path, row) of the parameter of each case, the row is None if the
+    dataset corresponds to a single case
+    '''
+    def __init__(self, reader, sources):
+        self.reader = reader
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __getitem__(self, ind):
+        if isinstance(ind, (int, np.integer)):
+            return self.reader.read([self.sources[ind]])[0]
+        values = self.reader.read([self.sources[i] for i in np.arange(len(self.sources))[ind]])
+        if len(values) > 0 and all(np.shape(value) == np.shape(values[0]) for value in values):
+            return np.array(values)
+        return values
+
+
+class ResultsReader:
+    '''
+    This class opens a results file, or all the results files (MainDict.h5) within a directory, for reading.
+    :param path: path to a results file or to a directory containing results files
+    :param cacheSize: maximum number of values kept in the least recently used cache
+    '''
+    def __init__(self, path, cacheSize=256):
+        if os.path.isdir(path):
+            filePaths = sorted(glob(os.path.join(path, '**', 'MainDict.h5'), recursive=True))
+        else:
+            filePaths = [path]
+        self.files = [h5py.File(filePath, 'r') for filePath in filePaths]
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.maps = OrderedDict()
+        self.index = {}
+
+        #   Geometries of each file. The geometries of the files within a directory are prefixed by the relative path
+        #   to their file, if more than one file is found.
+        self.geometries = OrderedDict()
+        for f, filePath in zip(self.files, filePaths):
+            if 'index' in f:
+                names = [name.decode() if isinstance(name, bytes) else name for name in f['index'][()]]
+            else:
+                names = list(f.keys())
+            prefix = ''
+            if len(self.files) > 1:
+                prefix = os.path.relpath(os.path.dirname(filePath), path).replace(os.sep, '/') + '/'
+            for name in names:
+                if name != 'UserIn' and name in f and 'loadParams' in f[name]:
+                    self.geometries[prefix + name] = (f, name)
+
+    def caseIndex(self, geometry):
+        '''
+        This function returns the location of the loading parameters of each case of a geometry, which is only read
+        the first time that the geometry is referenced.
+        :param geometry: name of the geometry
+        :return:
+        :param index: ordered dictionary of the (group path, row) of each case, keyed by the case folder name, the row
+        is None for the nested layout
+        '''
+        if geometry in self.index:
+            return self.index[geometry]
+        f, name = self.geometries[geometry]
+        group = f[name + '/loadParams']
+        index = OrderedDict()
+        tables = [table for table in ['hover', 'forwardFlight'] if table + '/name' in group]
+        if len(tables) > 0:
+            for table in tables:
+                for row, caseName in enumerate(group[table + '/name'][()]):
+                    index[caseName.decode()] = (group.name + '/' + table, row)
+        else:
+            for caseName in group.keys():
+                index[caseName] = (group.name + '/' + caseName, None)
+        self.index[geometry] = index
+        return index
+
+    def cases(self, geometry, **condition):
+        '''
+        This function returns the cases of a geometry, optionally only those at the specified operating condition. The
+        thrust is matched to within the three significant figures of the case folder names.
+        :param geometry: name of the geometry
+        :param condition: any of T (N), Vx (kts), Vz (m/s), and omega (rpm), either a single value or a list of values
+        :return:
+        :param cases: list of the case folder names
+        '''
+        cases = []
+        for caseName in self.caseIndex(geometry):
+            caseCond = caseCondition(caseName)
+            if len(condition) > 0 and caseCond is None:
+                continue
+            match = True
+            for key, values in condition.items():
+                values = np.atleast_1d(values)
+                if key == 'T':
+                    match = match and np.any(np.abs(caseCond[key] - values) <= 5e-3 * np.abs(values))
+                else:
+                    match = match and np.any(np.round(values) == caseCond[key])
+            if match:
+                cases.append(caseName)
+        return cases
+
+    def fields(self, geometry, case):
+        '''
+        This function returns the names of the loading parameters of a case.
+        :param geometry: name of the geometry
+        :param case: case folder name
+        :return:
+        :param fields: list of the names of the loading parameters, nested parameters are named by their path
+        '''
+        f, name = self.geometries[geometry]
+        path, row = self.caseIndex(geometry)[case]
+        fields = []
+
+        def visit(key, obj):
+            if isinstance(obj, h5py.Dataset) and key != 'name':
+                #   parameters whose size differs between the cases of a table are stored as a dataset per case
+                ragged = re.fullmatch(r'(.+)/(\d+)', key)
+                if row is None or ragged is None:
+                    fields.append(key)
+                elif ragged[2] == str(row):
+                    fields.append(ragged[1])
+        f[path].visititems(visit)
+        return fields
+
+    def field(self, geometry, key, cases=None):
+        '''
+        This function returns a loading parameter of the specified cases of a geometry, which is only read once it is
+        indexed.
+        :param geometry: name of the geometry
+        :param key: name of the loading parameter, nested parameters are named by their path, e.g. 'trimReport/nfev'
+        :param cases: list of the case folder names, all the cases are included if None
+        :return:
+        :param field: LazyField of the loading parameter of each case
+        '''
+        f, name = self.geometries[geometry]
+        index = self.caseIndex(geometry)
+        if cases is None:
+            cases = list(index.keys())
+        sources = []
+        for caseName in cases:
+            path, row = index[caseName]
+            if row is not None and isinstance(f[path + '/' + key], h5py.Group):
+                sources.append((f, path + '/' + key + '/' + str(row), None))
+            else:
+                sources.append((f, path + '/' + key, row))
+        return LazyField(self, sources)
+
+    def dataset(self, geometry, path):
+        '''
+        This function reads any other dataset of a geometry in its entirety, e.g. 'geomParams/r'.
+        :param geometry: name of the geometry
+        :param path: path to the dataset within the group of the geometry
+        :return:
+        :param value: value of the dataset
+        '''
+        f, name = self.geometries[geometry]
+        return self.read([(f, name + '/' + path, None)])[0]
+
+    def mapDataset(self, f, path):
+        '''
+        This function returns a memory map of a dataset, if it is stored contiguously and uncompressed, otherwise the
+        h5py dataset itself. Either one is only read once it is indexed. The most recently used maps are retained.
+        '''
+        if (f.filename, path) in self.maps:
+            self.maps.move_to_end((f.filename, path))
+        else:
+            ds = f[path]
+            offset = ds.id.get_offset()
+            if ds.chunks is None and offset is not None and ds.dtype.kind in 'biuf' and ds.ndim > 0:
+                self.maps[(f.filename, path)] = np.memmap(f.filename, dtype=ds.dtype, mode='r', offset=offset,
+                                                          shape=ds.shape)
+            else:
+                self.maps[(f.filename, path)] = ds
+            #   the number of open maps is limited, as each one holds a file descriptor
+            if len(self.maps) > self.cacheSize:
+                self.maps.popitem(last=False)
+        return self.maps[(f.filename, path)]
+
+    def read(self, sources):
+        '''
+        This function reads the values of a list of sources, from the cache where possible. The rows of each table
+        dataset that are not cached are read in a single call.
+        :param sources: list of the (file, dataset path, row) of each value, see LazyField
+        :return:
+        :param values: list of the values
+        '''
+        values = [None] * len(sources)
+        missing = OrderedDict()
+        for i, (f, path, row) in enumerate(sources):
+            key = (f.filename, path, row)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                values[i] = self.cache[key]
+            else:
+                missing.setdefault((f, path), []).append((i, row))
+
+        for (f, path), rows in missing.items():
+            data = self.mapDataset(f, path)
+            if rows[0][1] is None:
+                read = [data[()]] * len(rows)
+            else:
+                #   h5py requires the rows to be unique and in increasing order
+                unique, inverse = np.unique([row for i, row in rows], return_inverse=True)
+                read = np.asarray(data[unique])[inverse]
+            for (i, row), value in zip(rows, read):
+                if isinstance(value, bytes):
+                    value = value.decode()
+                elif isinstance(value, np.ndarray) and value.dtype.kind == 'O':
+                    value = np.array([v.decode() if isinstance(v, bytes) else v for v in value.ravel()],
+                                     dtype=object).reshape(value.shape)
+                values[i] = value
+                self.cache[(f.filename, path, row)] = value
+                if len(self.cache) > self.cacheSize:
+                    self.cache.popitem(last=False)
+        return values
+
+    def close(self):
+        self.maps.clear()
+        self.index.clear()
+        self.cache.clear()
+        for f in self.files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
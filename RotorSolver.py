@@ -0,0 +1,919 @@
+#       VSP2WOPWOP Rotor Solver
+
+#   This module trims a single blade geometry in hover/axial flight or forward flight and computes its aerodynamic loads.
+#   The quantities that only depend on the blade geometry, the polar set, and the azimuthal resolution, namely the
+#   airfoil parameters expanded to the radial stations, the polar table, and the quadrature of the rotor disk, are
+#   computed once when the solver is constructed. The blade element quantities that are evaluated on every inflow
+#   iteration in forward flight, which are each of size [phiRes x len(r)], are held in work arrays that are allocated
+#   along with the solver and are updated in place. A solver is therefore reused by every operating condition of the
+#   same blade, see rotorSolver(), while loadingHover and loadingFF remain the interface to the rest of the program.
+
+#%% imports necessary modules
+import bisect
+import numpy as np
+from scipy.optimize import least_squares
+from PolarTable import PolarTable
+from Quadrature import quadrature
+from RpmTrim import RpmTrim
+from FixedPoint import fixedPoint
+
+#%%
+#   Solver of each blade geometry, polar set, and azimuthal resolution that has been referenced, these are reused by
+#   subsequent cases
+cache = {}
+cacheSize = 8
+
+
+def rotorSolver(geomParams, XsecPolar, XsecLocation, phiRes, polarTable=None):
+    '''
+    This function returns the solver corresponding to the blade geometry, polar set, and azimuthal resolution, it is
+    only constructed the first time that they are referenced. The solver retains geomParams and XsecPolar, so that
+    neither can be replaced by another object of the same identity while it is cached.
+    :param geomParams: dictionary of the blade geometric parameters
+    :param XsecPolar: dictionary of the airfoil polars
+    :param XsecLocation: nondimensional radial location at which each airfoil section begins
+    :param phiRes: number of azimuthal stations, spanning 0 to 2*pi
+    :param polarTable: polar table of the blade, which is otherwise built by the solver
+    '''
+    key = (id(geomParams), id(XsecPolar), tuple(XsecLocation), phiRes)
+    if key not in cache:
+        if len(cache) >= cacheSize:
+            cache.pop(next(iter(cache)))
+        cache[key] = RotorSolver(geomParams, XsecPolar, XsecLocation, phiRes, polarTable)
+    return cache[key]
+
+
+class RotorSolver:
+    '''
+    BEMT solver of a single blade geometry and polar set.
+    :param geomParams: dictionary of the blade geometric parameters
+    :param XsecPolar: dictionary of the airfoil polars
+    :param XsecLocation: nondimensional radial location at which each airfoil section begins
+    :param phiRes: number of azimuthal stations, spanning 0 to 2*pi
+    :param polarTable: polar table of the blade, which is otherwise built by the solver
+    '''
+
+    def __init__(self, geomParams, XsecPolar, XsecLocation, phiRes, polarTable=None):
+        self.geomParams = geomParams
+        self.XsecPolar = XsecPolar
+        self.phiRes = phiRes
+        self.R = geomParams['R']
+        self.r = geomParams['r']
+        self.twistDist = geomParams['twistDist']
+        self.solDist = geomParams['solDist']
+        r = self.r
+
+        #   This section of the code populates an array of the airfoil parameters based on their radial location along
+        #   the blade span
+        self.XsecPolarExp = {}
+        #   if multiple airfoil sections are used along the blade span are used this section of the code would be
+        #   executed
+        if len(XsecLocation) > 1:
+            ind = np.zeros((len(XsecLocation) + 1))
+            #   creates an array of size r that is filled with the indices corresponding to the radial location of each
+            #   airfoil
+            for i, Xsec in enumerate(XsecLocation):
+                ind[i] = bisect.bisect(r, Xsec)
+            ind[0] = 0
+            ind[-1] = len(r)
+            #   loops through each airfoil section and their parameters, populating an array of size r, with these
+            #   parameters. These arrays are then written to the XsecPolarExp dictionary.
+            for i, Xsec in enumerate(XsecPolar.keys()):
+                for ii, param in enumerate(list(XsecPolar[Xsec].keys())[1:]):
+                    if i == 0:
+                        self.XsecPolarExp[param] = XsecPolar[Xsec][param] * np.ones(len(r))
+                    else:
+                        self.XsecPolarExp[param][int(ind[i]):] = XsecPolar[Xsec][param]
+        #   if only a single airfoil section is used along the blade span the section's parameters are expanded to
+        #   correspond to each blade section
+        else:
+            for i, key in enumerate(list(XsecPolar[list(XsecPolar.keys())[0]].keys())[1:]):
+                self.XsecPolarExp[key] = np.ones(len(r)) * XsecPolar[list(XsecPolar.keys())[0]][key]
+
+        #   Table of the airfoil polars corresponding to each radial station
+        if polarTable is None:
+            polarTable = PolarTable(XsecPolar, r, XsecLocation)
+        self.polarTable = polarTable
+
+        #   integration weights and trigonometric tables of the azimuthal and radial grid, see Quadrature.py
+        self.quad = quadrature(r, phiRes)
+
+        #   work arrays of the forward flight inflow iteration, of size [phiRes x len(r)]
+        shape = np.shape(self.quad.rSinPhi)
+        self.theta = np.empty(shape)
+        self.ut = np.empty(shape)
+        self.inflowAngle = np.empty(shape)
+        self.alpha = np.empty(shape)
+        self.AoA = np.empty(shape)
+        self.CL = np.empty(shape)
+        self.CD = np.empty(shape)
+        self.dCT = np.empty(shape)
+        self.cos = np.empty(shape)
+        self.sin = np.empty(shape)
+        #   radial factor of the thrust coefficient distribution
+        self.dCTscale = 1 / 2 * self.solDist * r ** 2
+
+    # %% Hover and axial flight
+
+    def rpm_residuals(self, omega):
+        '''
+        This function computes the residuals based on the signed percentage difference between the computed and target
+        thrust. The rotational rate is adjusted until this residual is equal to zero.
+        :param omega: rotational rate [rad/s]
+        :return:
+        :param res:  percentage error between the target and computed T
+        '''
+        R = self.R
+        trim_out = self.rpm_trim(omega)
+        res = (self.T - trim_out[0] * self.rho * np.pi * R ** 2 * (omega * R) ** 2) / self.T
+        return res
+
+    def coll_residuals(self, th0):
+        '''
+        This function computes the residuals based on the percentage difference between the computed and target CT.
+        The collective pitch is adjusted until this residual is minimized.
+        :param th0: collective pitch setting
+        :return:
+        :param res:  percentage error between the target and computed CT
+        '''
+        th = th0 + self.twistDist
+        trim_out = self.coll_trim(th)
+        res = np.abs((self.targCT - trim_out[0]) / self.targCT)
+        return res
+
+    def rpm_trim(self, omega):
+        """
+        This function computes the radial loading distribution based on the thrust coefficient
+        :param omega: rotational rate [rad/s]
+        :return:
+        :param CT: Radially integrated thrust coefficient
+        :param dCT: Incremental thrust coefficient
+        :param dCL:  Radial distribution of the lift coefficient
+        :param dCD:  Radial distribution of the drag coefficient
+        :param AoA: Radial angle of attack distribution
+        """
+        R, r = self.R, self.r
+        #   the axial climb/descent inflow ratio varies with the rotational rate
+        self.lam_c = self.Vz / (omega * R)
+        CT_init = self.T / (self.rho * np.pi * R ** 2 * (omega * R) ** 2)
+        lam_init = np.sqrt(CT_init / 2)
+        lam = fixedPoint(lambda lam: self.TipLoss(lam, self.twistDist), lam_init, 0.0005, self.UserIn['inflowMaxIter'],
+                         self.UserIn['andersonDepth'], self.inflowReport)[0]
+        AoA = self.twistDist - lam / r
+        dCL, dCD = self.PolarLookup(AoA)
+        dCT = 0.5 * self.solDist * dCL * r ** 2
+        CT = np.trapz(dCT, r)
+
+        return CT, dCT, dCL, dCD, lam, AoA
+
+    def coll_trim(self, th):
+        """
+        This function computes the radial loading distribution based on the thrust coefficient
+        :param th: collective pitch setting+twist distribution [rad]
+        :return:
+        :param CT:  integrated thrust coefficient
+        :param dCT:  radial thrust coefficient distribution
+        :param dCL:  radial lift coefficient distribution
+        :param dCD:  radial drag coefficient distribution
+        :param lam:  radial inflow coefficient distribution
+        :param AoA: radial angle of attack distribution [rad]
+        """
+        r = self.r
+        lam = self.TipLoss(self.lamInit, th)
+        AoA = th - lam / r
+        dCL, dCD = self.PolarLookup(AoA)
+        dCT = 0.5 * self.solDist * (dCL * np.cos(lam / r) - dCD * np.sin(lam / r)) * r ** 2
+        CT = np.trapz(dCT, r)
+
+        return CT, dCT, dCL, dCD, lam, AoA
+
+    def TipLoss(self, lambdaInit, ThetaDist):
+        """
+        This function applies the fixed point iteration method to compute the inflow distribution and applies
+        Prandtl's tip loss formulation, if specified for in the input module, see FixedPoint.py
+        :param lambdaInit: Initial guess for the inflow ratio
+        :param ThetaDist: collective pitch angle + twist distribution (rad)
+        :return:
+        :param:  lam: radial inflow distribution
+        """
+        r, solDist, lam_c = self.r, self.solDist, self.lam_c
+        Cla = self.XsecPolarExp['Lift Slope']
+        if self.UserIn['tipLoss'] == 1:
+            def iterate(lambdaInit):
+                f = 0.5 * self.UserIn['Nb'] * ((1 - r) / lambdaInit)
+                F = (2 / np.pi) * np.arccos(np.e ** (-f))
+                return np.sqrt(1/4*(solDist*Cla/(8*F)-lam_c)**2+solDist*Cla*ThetaDist*r/(8*F))-(solDist*Cla/(16*F)-lam_c/2)
+
+            lam = fixedPoint(iterate, lambdaInit, 0.005, self.UserIn['inflowMaxIter'], self.UserIn['andersonDepth'],
+                             self.inflowReport)[0]
+        else:
+            F = 1
+            lam = np.sqrt(1/4*(solDist*Cla/(8*F)-lam_c)**2+solDist*Cla*ThetaDist*r/(8*F))-(solDist*Cla/(16*F)-lam_c/2)
+
+        lam[np.where(np.isnan(lam) == 1)] = 0
+        return lam
+
+    def PolarLookup(self, AoA):
+        """
+        This function linearly interpolates the sectional blade load coefficients from the XFoil polar based on the
+        computed angle of attack distribution. If the blade section is stalled CL at that section is linearly
+        interpolated between the maximum and minimum CL, while CD is simply set to its maximum value for the
+        respective airfoil. The polars are evaluated for all the radial stations at once, see PolarTable.py.
+        :param alpha: angle of attack distribution
+        return:
+        :param dCL:  radial lift coefficient distribution
+        :param dCD:  radial drag coefficient distribution
+        """
+        dCL, dCD = self.polarTable.lookup(AoA)
+        return dCL, dCD
+
+    def trim_hover(self, UserIn, T, omega, Vz, trimInit=None):
+        '''
+        This function trims the rotor to the desired thrust condition in hover or axial flight and computes the
+        aerodynamic loads using BEMT.
+        :param UserIn: dictionary of the user inputs
+        :param T: target thrust [N]
+        :param omega: rotational rate [rpm]
+        :param Vz: climb rate [m/s]
+        :param trimInit: converged trim variables of a neighbouring case, with which the trim is initialized
+        :return:
+        :param loadParams: dictionary of the computed loading parameters
+        '''
+        geomParams = self.geomParams
+        self.UserIn = UserIn
+        Nb = UserIn['Nb']
+        R = self.R
+        r = self.r
+        solDist = self.solDist
+        twistDist = self.twistDist
+        rho = self.rho = UserIn['rho']
+        Adisk = geomParams['diskArea']
+        sol = geomParams['solidity']
+        self.T = T
+        self.Vz = Vz
+        #   converts rotational rate from degrees to radians
+        omega = omega / 60 * 2 * np.pi
+        #   Target thrust coefficient
+        self.targCT = T / (rho * Adisk * (omega * R) ** 2)
+        #   Converts initial guess for the collective pitch setting from degrees to radians
+        th0 = UserIn['thetaInit'] * (np.pi / 180)
+        #   Initial guess for the radial inflow distribution
+        self.lamInit = np.ones(len(r)) * np.sqrt(self.targCT / 2)
+        #   Axial climb/descent inflow ratio
+        self.lam_c = Vz / (omega * R)
+        #   Initial guess for the trimmed rotational rate
+        omegaInit = omega
+        #   Number of calls to the tip loss inflow iteration and of its fixed point iterations
+        self.inflowReport = {'calls': 0, 'iterations': 0, 'unconverged': 0}
+
+        #   The trim is otherwise initialized with the converged collective pitch, rotational rate, and inflow
+        #   distribution of a neighbouring case, see CaseSweep.py
+        if trimInit is not None:
+            th0 = trimInit['th'][0]
+            omegaInit = trimInit['omega']
+            #   the shape of the inflow distribution is reused, while its mean is set by the momentum theory estimate
+            lamSeed = np.asarray(trimInit['lambda'])
+            if np.any(lamSeed > 0):
+                self.lamInit = np.where(lamSeed > 0, lamSeed * np.mean(self.lamInit) / np.mean(lamSeed[lamSeed > 0]),
+                                        self.lamInit)
+
+        if -2 < Vz/np.sqrt(T/(2*rho*Adisk)) < 0:
+            raise ValueError('Non-physical solution, 1D assumption of momentum theory is violated')
+
+        # This function employs the non-linear least square optimization method (LM) to compute the necessary
+        # rotational rate or collective pitch angle to meet the target thrust or thrust coefficient, respectively.
+        # The rpm trim is otherwise solved for with Brent's method, with the rotational rate bounded by a tip speed
+        # equal to the speed of sound, see RpmTrim.py.
+        if UserIn['trim'] == 1:
+            if UserIn['trimSolver'] == 2:
+                omega, trimReport = RpmTrim(self.rpm_residuals, omegaInit, UserIn['c'] / R, UserIn['trimTol'])
+                residuals = np.abs([trimReport['residual']])
+            else:
+                trim_sol = least_squares(self.rpm_residuals, omegaInit, method='lm')
+                omega = trim_sol.x
+                residuals = np.abs(trim_sol.fun)
+                #   the LM method reports success once it stalls, the trim is therefore only deemed to have converged if
+                #   the normalized residual is within the tolerance
+                trimReport = {'solver': 'lm', 'converged': bool(np.max(residuals) <= UserIn['trimTol']),
+                              'iterations': trim_sol.nfev, 'nfev': trim_sol.nfev}
+            CT, dCT, dCL, dCD, lam, AoA = self.rpm_trim(omega)
+            #   the blade pitch is fixed to the twist distribution
+            th = np.zeros(3)
+        else:
+            trim_sol = least_squares(self.coll_residuals, th0, method='lm')
+            CT, dCT, dCL, dCD, lam, AoA = self.coll_trim(trim_sol.x + twistDist)
+            th = np.array([np.squeeze(trim_sol.x), 0, 0])
+            residuals = trim_sol.fun
+            trimReport = {'solver': 'lm', 'converged': bool(np.max(np.abs(residuals)) <= UserIn['trimTol']),
+                          'iterations': trim_sol.nfev, 'nfev': trim_sol.nfev}
+
+        U = np.sqrt((omega*geomParams['rdim'])**2+(omega*R*lam)**2)
+        #   Integrated lift and drag coefficients
+        CL = np.trapz(dCL, r)
+        CD = np.trapz(dCD, r)
+
+        #   Distribution and integrated of the power/torque coefficient
+        dCP = 0.5 * solDist * (lam / r * dCL + dCD) * r ** 3
+        CP = np.trapz(dCP, r)
+
+        #   Power required by the rotor
+        P = CP * rho * Adisk * (omega * R) ** 3
+
+        #   Distribution and integrated thrust
+        dT = dCT * rho * Adisk * (omega * R) ** 2
+        T = np.trapz(dT, r)
+
+        #   Distribution and integrated torque
+        dQ = dCP * rho * Adisk * (omega * R) ** 2 * R
+        Q = np.trapz(dQ, r)
+
+        # Rotates the normal force component by the collective pitch setting, so that a single change of base (CB) can
+        # be applied to the blade geometry and loading vector in the namelist file. If the collective pitch CB is
+        # unnecessary, then dFz = dT/Nb.
+        dFz = dT/Nb*np.cos(-th[0])-dQ/(Nb*r*R)*np.sin(-th[0])
+
+        # Rotates the inplane force component by the collective pitch setting, so that a single change of base (CB)
+        # can be applied to the blade geometry and loading vector in the namelist file. If the collective pitch CB is
+        # unnecessary, then dFx =dQ/(Nb*r*R).
+        dFx = dT/Nb*np.sin(-th[0])+dQ/(Nb*r*R)*np.cos(-th[0])
+
+        #   Figure of merit, induced power factor = 1.15
+        FM = CP / (1.15 * CP + sol / 8 * CD)
+
+        #   Sets any infinite values of the computed force components (primarily near the blade root) equal to zero.
+        dFx[np.where(np.isnan(dFx) == 1)] = 0
+        dFz[np.where(np.isnan(dFz) == 1)] = 0
+        dFy = np.zeros(len(r))
+
+        #   if the rotor is rotating CW the force distributions are flipped along the longitudinal axis of the rotor
+        #   disk.
+        if UserIn['rotation'] == 2:
+            dFx = -dFx
+
+        # Assembles all computed load parameters into a dictionary
+        loadParams = {'coll_residuals': residuals, 'trimReport': trimReport, 'th': th, 'beta': [0, 0, 0], 'CT': CT,
+                      'T': T, 'dCT': dCT, 'dT': dT, 'CP': CP, 'P': P, 'Q': Q, 'dCP': dCP, 'dQ': dQ, 'dCL': dCL,
+                      'dCD': dCD, 'CL': CL, 'CD': CD, 'FM': FM, 'AoA': AoA,
+                      'ClaDist': np.copy(self.XsecPolarExp['Lift Slope']), 'lambda': lam, 'dFx': dFx, 'dFy': dFy,
+                      'dFz': dFz, 'omega': omega, 'U': U, 'trimState': {'th': th, 'omega': omega, 'lambda': lam},
+                      'inflowReport': self.inflowReport}
+        return loadParams
+
+    # %% Forward flight
+
+    def fixed_pitch_residuals(self, omega):
+        '''
+        This function computes the residuals between the trim targets and computed trim variables for rpm trim.
+        :param omega: rotational rate [rad/s]
+        :return: difference between the target and computed thrust
+        '''
+        trimOut = self.fixed_pitch_trim(omega)
+        res = self.trimTargs - trimOut[0]
+        return res
+
+    def variable_pitch_residuals(self, th, mu, lamTPP_init):
+        '''
+        This function computes the residuals between the trim targets and computed trim variables for collective and
+        cyclic pitch trim.
+        :param th: an array of three elements the first being the collective pitch setting, followed by the lateral and
+        longituinal cyclic pitch amplitudes.
+        :param mu: advance ratio
+        :param lamTPP_init: initial estimate for the inflow ratio
+        :return: difference between the trim targets and computes CT, beta1c, and beta1s.
+        '''
+        if self.UserIn['trim'] == 2:
+            trimOut = self.variable_pitch_trim([th, 0, 0], mu, lamTPP_init)
+            res = self.trimTargs - trimOut[0]
+        else:
+            trimOut = self.variable_pitch_trim(th, mu, lamTPP_init)
+            res = self.trimTargs - np.array([trimOut[0], trimOut[2], trimOut[3]])
+        return res
+
+    def bladeLoads(self, up, theta):
+        '''
+        This function evaluates the angle of attack, sectional lift and drag coefficients, and the thrust coefficient
+        distribution for an inflow distribution. The work arrays of the solver are overwritten and returned, rather than
+        being allocated on each call.
+        :param up: nondimensionalized normal velocity component
+        :param theta: blade pitch distribution [rad]
+        :return:
+        :param AoA: angle of attack distribution [rad]
+        :param CL: lift coefficient distribution
+        :param CD: drag coefficient distribution
+        :param dCT: thrust coefficient distribution
+        '''
+        AoA, dCT, cos, sin = self.AoA, self.dCT, self.cos, self.sin
+
+        #   AoA = (theta-up/ut)%(2*pi)
+        np.divide(up, self.ut, out=self.inflowAngle)
+        np.subtract(theta, self.inflowAngle, out=AoA)
+        np.remainder(AoA, 2 * np.pi, out=AoA)
+
+        CL, CD = self.aeroParams(AoA, (self.CL, self.CD))
+
+        #   dCT = 1/2*solDist*r**2*(CL*cos(up/ut)-CD*sin(up/ut))
+        np.cos(self.inflowAngle, out=cos)
+        np.sin(self.inflowAngle, out=sin)
+        np.multiply(CL, cos, out=dCT)
+        np.multiply(CD, sin, out=sin)
+        np.subtract(dCT, sin, out=dCT)
+        np.multiply(self.dCTscale, dCT, out=dCT)
+
+        return AoA, CL, CD, dCT
+
+    def fixed_pitch_trim(self, omega):
+        '''
+        This function performs an rpm trim, whereby the rotational rate is varied until the desired thrust is achieved.
+        :param omega: rotational rate [rad/s]
+        :return:
+        '''
+        UserIn, quad, r, R = self.UserIn, self.quad, self.r, self.R
+        AoA, dCT, cos, sin = self.AoA, self.dCT, self.cos, self.sin
+
+        mu = self.U / (omega * R)
+        CT = self.W/(self.rho * np.pi * R ** 2 * (omega * R) ** 2)
+        #   uniform thrust distribution, which initializes the Pitt-Peters inflow model
+        dCT.fill(CT/(r[-1]-r[0]))
+        lamTPP_init = self.inflowModSelect(UserIn['inflowMod'], mu*np.tan(self.alphaInit), mu, CT, dCT)
+
+        #   ut = r + mu*sin(phi)
+        ut = self.ut
+        np.multiply(quad.sinPhi, mu, out=ut)
+        np.add(r, ut, out=ut)
+
+        def iterate(up):
+            #   the drag term of the thrust coefficient distribution is weighted by the angle of attack, so the blade
+            #   loads are evaluated here rather than by bladeLoads
+            np.divide(up, ut, out=self.inflowAngle)
+            np.subtract(self.twistDist, self.inflowAngle, out=AoA)
+            np.remainder(AoA, 2 * np.pi, out=AoA)
+            CL, CD = self.aeroParams(AoA, (self.CL, self.CD))
+            np.cos(self.inflowAngle, out=cos)
+            np.multiply(CL, cos, out=dCT)
+            np.sin(self.inflowAngle, out=sin)
+            np.multiply(CD, AoA, out=cos)
+            np.multiply(cos, sin, out=sin)
+            np.subtract(dCT, sin, out=dCT)
+            np.multiply(self.dCTscale, dCT, out=dCT)
+            CT = quad.integrate(dCT)
+            loads[:] = [up, AoA, CL, CD, dCT, CT]
+            return self.inflowModSelect(UserIn['inflowMod'], up, mu, CT, dCT)
+
+        #   the inflow and thrust distributions are converged together, see FixedPoint.py
+        loads = []
+        lamTPP_init = fixedPoint(iterate, lamTPP_init, 0.0005, UserIn['inflowMaxIter'], UserIn['andersonDepth'],
+                                 self.inflowReport)[0]
+        up, AoA, CL, CD, dCT, CT = loads
+
+        T = CT * self.rho * np.pi * R ** 2 * (omega * R) ** 2
+
+        return T,CT,dCT,lamTPP_init,ut,up,CL,CD,AoA,mu
+
+    def variable_pitch_trim(self, th, mu, lamTPP_init):
+        '''
+        This function performs a collective/cyclic pitch trim, whereby the thrust coefficient, roll, and pitching
+        moments are the trim targets.
+        :param th: an array of three elements the first being the collective pitch setting, followed by the lateral and
+        longituinal cyclic pitch amplitudes, expressed in radians.
+        :param mu: the advance ratio
+        :param lamTPP_init: a constant inflow ratio with respect to the tip path plane (TTP)
+        :return:
+        :param CT: converged thrust coefficient
+        :param lamTTP_temp: converged inflow ratio
+        :param theta_expanded: expanded form of the pitch variations, accounting for first harmonic fluctuations in
+        cyclic pitch (len(phi)xlen(r)).
+        :param ut: nondimensionalized tangential velocity component, evaluated with respect to the hub plane.
+        :param up: nondimensionalized normal velocity component, evaluated with respect to the hub plane.
+        '''
+        UserIn, quad, R, omega = self.UserIn, self.quad, self.R, self.omega
+
+        #   theta_expanded = twistDist+th[0]+th[1]*cos(phi)+th[2]*sin(phi)
+        theta_expanded = self.theta
+        np.multiply(quad.cosPhi, th[1], out=theta_expanded)
+        np.add(self.twistDist + th[0], theta_expanded, out=theta_expanded)
+        np.multiply(quad.sinPhi, th[2], out=self.sin)
+        np.add(theta_expanded, self.sin, out=theta_expanded)
+
+        #   ut = r + mu*cos(alpha)*sin(phi)
+        ut = self.ut
+        np.multiply(quad.sinPhi, mu*np.cos(self.alphaInit), out=ut)
+        np.add(self.r, ut, out=ut)
+
+        def iterate(up):
+            AoA, CL, CD, dCT = self.bladeLoads(up, theta_expanded)
+            CT = quad.integrate(dCT)
+            loads[:] = [up, AoA, CL, CD, dCT, CT]
+            return self.inflowModSelect(UserIn['inflowMod'], up, mu, CT, dCT)
+
+        #   the inflow and thrust distributions are converged together, see FixedPoint.py
+        loads = []
+        lamTTP_temp = fixedPoint(iterate, lamTPP_init, 0.0005, UserIn['inflowMaxIter'], UserIn['andersonDepth'],
+                                 self.inflowReport)[0]
+        up, AoA, CL, CD, dCT, CT = loads
+
+        CMX, CMY = quad.moments(dCT)[1:]
+        Mx = CMX*self.rho*(omega*R)**2*np.pi*R**3
+        My = CMY*self.rho*(omega*R)**2*np.pi*R**3
+
+        return CT,dCT,Mx,My,lamTTP_temp,theta_expanded,ut,up,CL,CD,AoA
+
+    def variable_pitch_jacobian(self, trimOut):
+        '''
+        This function computes the Jacobian of the thrust coefficient, roll, and pitching moments with respect to the
+        collective and the lateral and longitudinal cyclic pitch amplitudes. The inflow distribution is frozen at its
+        converged value, so that the Jacobian can be evaluated directly from the blade element sums. Only the sectional
+        lift and drag curve slopes are computed numerically, by a central difference of the angle of attack.
+        :param trimOut: tuple returned by variable_pitch_trim
+        :return:
+        :param J: 3x3 Jacobian of [CT, Mx, My] with respect to [th0, th1c, th1s]
+        '''
+        quad, R, omega = self.quad, self.R, self.omega
+        CT,dCT,Mx,My,lam,theta_expanded,ut,up,CL,CD,AoA = trimOut
+        dAoA = 1e-4
+        CLp, CDp = self.aeroParams((AoA+dAoA)%(2*np.pi))
+        CLm, CDm = self.aeroParams((AoA-dAoA)%(2*np.pi))
+        #   derivative of the thrust coefficient distribution with respect to the angle of attack
+        dCT_dAoA = 1/2*self.solDist*self.r**2*((CLp-CLm)*np.cos(up/ut)-(CDp-CDm)*np.sin(up/ut))/(2*dAoA)
+
+        J = np.transpose([quad.moments(dCT_dAoA), quad.moments(dCT_dAoA*quad.cosPhi), quad.moments(dCT_dAoA*quad.sinPhi)])
+        J[1:] = J[1:]*self.rho*(omega*R)**2*np.pi*R**3
+        return J
+
+    def trimScale(self, omega):
+        '''
+        This function returns the scale by which the residuals of the pitch trim are normalized, i.e. the target thrust
+        coefficient for the thrust coefficient and the product of the target thrust and rotor radius for the hub
+        moments.
+        :param omega: rotational rate [rad/s]
+        :return:
+        :param scale: scale of the residual of each trim variable
+        '''
+        nDOF = 1 if self.UserIn['trim'] == 2 else 3
+        R = self.R
+        return np.array([1, self.rho*(omega*R)**2*np.pi*R**3, self.rho*(omega*R)**2*np.pi*R**3])[:nDOF]*np.atleast_1d(self.trimTargs)[0]
+
+    def newton_trim(self, th, mu, lamTPP_init):
+        '''
+        This function performs the collective (trim = 2) or collective and cyclic (trim = 3) pitch trim using a damped
+        Newton iteration. The Jacobian is initially evaluated by variable_pitch_jacobian and is subsequently corrected
+        by Broyden updates. The step is halved until the normalized residual decreases, the iteration is terminated
+        without taking the step if it does not decrease within 8 halvings. The iteration otherwise terminates once
+        the thrust coefficient and hub moments, normalized by the target thrust coefficient and the product of the
+        target thrust and rotor radius, are within UserIn['trimTol'] of their targets or after UserIn['trimMaxIter']
+        iterations.
+        :param th: initial guess for the collective and cyclic pitch settings [rad]
+        :param mu: advance ratio
+        :param lamTPP_init: initial estimate for the inflow ratio
+        :return:
+        :param th: trimmed collective and cyclic pitch settings [rad]
+        :param trimOut: tuple returned by variable_pitch_trim at the trimmed pitch settings
+        :param report: dictionary reporting the convergence of the iteration
+        '''
+        UserIn, omega, trimTargs = self.UserIn, self.omega, self.trimTargs
+        nDOF = 1 if UserIn['trim'] == 2 else 3
+        scale = self.trimScale(omega)
+
+        def residuals(trimOut):
+            return (np.atleast_1d(trimTargs) - np.array([trimOut[0], trimOut[2], trimOut[3]])[:nDOF])/scale
+
+        th = np.array(th, dtype=float)
+        trimOut = self.variable_pitch_trim(th, mu, lamTPP_init)
+        res = residuals(trimOut)
+        nfev = 1
+        iteration = 0
+        J = self.variable_pitch_jacobian(trimOut)[:nDOF, :nDOF]/scale[:, None]
+        while np.max(np.abs(res)) > UserIn['trimTol'] and iteration < UserIn['trimMaxIter']:
+            step = np.linalg.lstsq(J, res, rcond=None)[0]
+
+            damping = 1
+            for i in range(8):
+                thStep = th.copy()
+                thStep[:nDOF] = th[:nDOF]+damping*step
+                trimStep = self.variable_pitch_trim(thStep, mu, lamTPP_init)
+                resStep = residuals(trimStep)
+                nfev = nfev + 1
+                if np.linalg.norm(resStep) < np.linalg.norm(res):
+                    break
+                damping = damping/2
+            else:
+                #   none of the damped steps decreased the residual, the iteration is therefore terminated at the
+                #   current pitch settings, which have not converged, so that the LM method is used instead
+                break
+
+            #   Broyden update of the Jacobian, which accounts for the variation of the inflow with the pitch settings
+            #   that is neglected by the frozen inflow Jacobian. The Jacobian is re-evaluated if the step was damped.
+            if damping == 1:
+                dth = thStep[:nDOF]-th[:nDOF]
+                J = J+np.outer((res-resStep)-np.dot(J, dth), dth)/np.dot(dth, dth)
+            else:
+                J = self.variable_pitch_jacobian(trimStep)[:nDOF, :nDOF]/scale[:, None]
+
+            th, trimOut, res = thStep, trimStep, resStep
+            iteration = iteration + 1
+
+        report = {'solver': 'newton', 'converged': bool(np.max(np.abs(res)) <= UserIn['trimTol']),
+                  'iterations': iteration, 'nfev': nfev}
+        return th, trimOut, report
+
+    def inflowModSelect(self, model, lam, mu, CT, *args):
+        '''
+        This function selects and returns the converged inflow distribution based on the model specified in the user
+        input module.
+        :param model: integer specifing the model selected in the input module (UserIn['inflowMod'])
+        :param lam: initial guess for the inflow distribution, can be an arbitrary sized array
+        :param mu: = standard advance ratio (V/(omega*R)), unresolved into parallel and perpendicular components to the
+        rotor disk.
+        :param CT: thrust coefficient
+        :return:
+        '''
+        if model == 1:
+            lam = self.constant_inflow(lam, mu, CT)
+        elif model == 2:
+            lam = self.linear_inflow(lam, mu, CT)
+        elif model == 3:
+            lam = self.drees_inflow(lam, mu, CT)
+        elif model == 4:
+            lam = self.pitt_peters_inflow(lam, mu, args[0])
+        return lam
+
+    def constant_inflow(self, lam, mu, CT):
+        '''
+        This function applies the fixed point iteration method to converge the constant inflow ratio, see FixedPoint.py.
+        :param lam: the estimate of the inflow ratio
+        :param mu: the advance ratio
+        :param CT: thrust/weight coefficient
+        :return: converged inflow ratio
+        '''
+        alphaInit = self.alphaInit
+        mu = mu * np.cos(alphaInit)
+
+        def iterate(lam):
+            return mu * np.tan(alphaInit) + CT / (2 * np.sqrt(mu ** 2 + lam ** 2))
+
+        lam = fixedPoint(iterate, lam, 0.0005, self.UserIn['inflowMaxIter'], self.UserIn['andersonDepth'],
+                         self.inflowReport)[0]
+        return lam
+
+    def linear_inflow(self, lam, mu, CT):
+        '''
+        This function utilizes the fixed point itteration method to converge the Glauert's linear inflow model, see
+        FixedPoint.py.
+        :param lam: the estimate of the inflow ratio
+        :param mu: the advance ratio
+        :param CT: thrust/weight coefficient
+        :return: converged inflow ratio
+        '''
+        quad = self.quad
+        mu = mu*np.cos(self.alphaInit)
+
+        def iterate(lam):
+            return CT / (2 * np.sqrt(mu ** 2 + lam ** 2))*(1+1.2*quad.rCosPhi)
+
+        lam = fixedPoint(iterate, lam, 0.0005, self.UserIn['inflowMaxIter'], self.UserIn['andersonDepth'],
+                         self.inflowReport)[0]
+        return lam
+
+    def drees_inflow(self, lam, mu, CT):
+        '''
+        This function utilizes the fixed point itteration method to converge the Drees's inflow model, see
+        FixedPoint.py.
+        :param lam: the estimate of the inflow ratio
+        :param mu: the advance ratio
+        :param CT: thrust/weight coefficient
+        :return: converged inflow ratio
+        '''
+        quad, alphaInit = self.quad, self.alphaInit
+
+        def iterate(lam):
+            wake_skew = np.arctan(mu*np.cos(alphaInit)/lam)
+            kx = 4/3*((1-np.cos(wake_skew)-1.8*mu**2)/np.sin(wake_skew))
+            ky = -2*mu
+            return CT / (2 * np.sqrt(mu ** 2 + lam ** 2))*(1+kx*quad.rCosPhi+ky*quad.rSinPhi)
+
+        lam = fixedPoint(iterate, lam, 0.0005, self.UserIn['inflowMaxIter'], self.UserIn['andersonDepth'],
+                         self.inflowReport)[0]
+        return lam
+
+    def pitt_peters_inflow(self, lam, mu, dCT):
+        '''
+        This function computes the inflow distribution based on the steady component of the Pitt-Peters model. This
+        formulation was originally presented in, Pitt, Dale M., and David A. Peters. "Theoretical prediction of
+        dynamic-inflow derivatives." (1980) and then again in Chen, Robert TN. "A survey of nonuniform inflow models
+        for rotorcraft flight dynamics and control applications." (1989). This model takes into account the effects
+        that the hub moments have on the steady (1st harmonic) induced velocity distribution. This model should be
+        used when performing the fixed/collective pitch trim since the inflow distribution would inevitably vary in
+        order to produce the necessary reaction to counteract the hub moments.
+        :param lam: initial guess for the inflow distribution
+        :param mu: advance ratio
+        :param dCT: radial and azimuthal distribution of the thrust coefficient
+        '''
+        quad, alphaInit = self.quad, self.alphaInit
+
+        CT, CMX, CMY = quad.moments(dCT)
+
+        lam = self.constant_inflow(lam, mu, CT)
+        wake_skew = np.arctan(mu*np.cos(alphaInit)/lam)
+        vt = np.sqrt((mu*np.cos(alphaInit))**2+lam**2)
+        vm = ((mu*np.cos(alphaInit))**2+lam*(lam+CT/(2*np.sqrt(mu**2 + lam**2))))/vt
+
+        L = np.array([[0.5*vt,0,15*np.pi/(64*vm)*np.tan(wake_skew/2)],[0,-4/(vm*(1+np.cos(wake_skew))),0],[15*np.pi/(64*vt)*np.tan(wake_skew/2),0,-4*np.cos(wake_skew)/(vm*(1+np.cos(wake_skew)))]])
+        lam_0,lam_1c,lam_1s = np.dot(L,[CT,CMX,CMY])
+        lam = lam_0 + lam_1c*quad.rCosPhi+ lam_1s*quad.rSinPhi
+
+        return lam
+
+    def aeroParams(self, AoA, out=None):
+        '''
+        This function returns the lift and drag coefficients corresponding to a radial and azimuthal distribution of the
+        angles of attack. If UserIn['polarLookupFF'] = 1 the coefficients are linearly interpolated from the XFoil
+        polars, which have been resampled onto a uniform angle of attack grid (see PolarTable.py). Otherwise, the
+        airfoil is assumed to be symmetric, CL is the product of the lift curve slope and the angle of attack and the
+        drag coefficient is assumed to be 10% of the lift coefficient. The lift coefficient for stalled blade sections
+        is linearly interpolated between the section's airfoil minimum and maximum lift coefficients. In that case, the
+        sectional drag coefficient is set to the airfoil's drag coefficient at the angle of attack corresponding to the
+        maximum lift coefficient. With the tabulated polars, the sections whose angle of attack lies outside of the
+        range of the polar are treated as stalled.
+        :param AoA: array of size [phiRes x len(r)] filled with the computed angles of attack
+        :param out: tuple of the arrays to which CL and CD are written, these are otherwise allocated
+        :return:
+        :param CL: lift coefficient, linearly interpolated for the stalled blade sections
+        :param CD:  drag coefficient, set equal to its value at the angle of attack corresponding to themaximum lift
+        coefficient for the stalled blade sections
+        '''
+        XsecPolarExp = self.XsecPolarExp
+        CL, CD = (None, None) if out is None else out
+
+        if self.UserIn['polarLookupFF'] == 1:
+            #   AoA is wrapped to [-pi, pi) in order to be referenced against the polars
+            alpha = self.alpha if out is not None else np.empty(np.shape(AoA))
+            np.add(AoA, np.pi, out=alpha)
+            np.remainder(alpha, 2 * np.pi, out=alpha)
+            np.subtract(alpha, np.pi, out=alpha)
+            CL, CD = self.polarTable.lookupUniform(alpha)
+            azInd, rInd = np.where((alpha > self.polarTable.alphaMax) | (alpha < self.polarTable.alphaMin))
+        else:
+            #   assume that the airfoil is symmetric and therefore the CL can be estimated by the product of the
+            #   lift-curve slope and the angle of attack
+            CL = np.multiply(XsecPolarExp['Lift Slope'], AoA, out=CL)
+            #   CD is assumed to be 10% of CL
+            CD = np.multiply(0.1, CL, out=CD)
+
+            #   reruns the indices of stalled blade sections
+            azInd, rInd = np.where(AoA > XsecPolarExp['alphaMax'])
+
+        #   sets the CD of these sections equal to the CD @ CLmax and linearly interpolates CL between CLmin and CL
+        CD[azInd, rInd] = XsecPolarExp['CdMax'][rInd]
+        CL[azInd, rInd] = XsecPolarExp['ClMax'][rInd]+(AoA[azInd, rInd]-XsecPolarExp['alphaMax'][rInd])*(XsecPolarExp['ClMin'][rInd]-XsecPolarExp['ClMax'][rInd])/(XsecPolarExp['Alpha0'][rInd]+2*np.pi-XsecPolarExp['alphaMax'][rInd])
+        return CL, CD
+
+    def trim_forward_flight(self, UserIn, W, omega, Vx, Vz, alphaShaft, trimInit=None):
+        '''
+        This function trims the rotor in forward flight, by equating the drag and side force to zero, and computes the
+        periodic blade loads, at the azimuthal resolution of the solver.
+        :param UserIn: dictionary of the user inputs
+        :param W: target thrust [N]
+        :param omega: rotational rate [rpm]
+        :param Vx: forward flight speed [m/s]
+        :param Vz: climb rate [m/s]
+        :param alphaShaft: shaft tilt angle [deg]
+        :param trimInit: converged trim variables of a neighbouring case, with which the trim is initialized
+        :return:
+        :param loadParams: dictionary of the computed loading parameters
+        '''
+        geomParams, quad, R, r = self.geomParams, self.quad, self.R, self.r
+        self.UserIn = UserIn
+        self.W = W
+        omega = self.omega = omega/60*2*np.pi
+        rho = self.rho = UserIn['rho']
+        Nb = UserIn['Nb']
+        solDist = self.solDist
+
+        alphaShaft = alphaShaft*(np.pi/180)
+        thFP = np.arctan(Vz / Vx)
+        alphaInit = self.alphaInit = alphaShaft+thFP
+        self.U = np.linalg.norm((Vx,Vz))
+
+        mu = self.U/(omega*R)
+
+        phiRes = self.phiRes
+        phi = quad.phi
+        a = np.ones((len(r)))*self.XsecPolar[list(self.XsecPolar.keys())[0]]['Lift Slope']
+        th0 = UserIn['thetaInit']*np.pi/180
+        #   number of calls to the inflow models and of their fixed point iterations, see FixedPoint.py
+        inflowReport = self.inflowReport = {'calls': 0, 'iterations': 0, 'unconverged': 0}
+
+        #   Initial guess for the trimmed rotational rate, which is otherwise taken from the converged trim of a
+        #   neighbouring case along with the pitch settings and inflow distribution, see CaseSweep.py
+        omegaInit = omega
+        if trimInit is not None:
+            omegaInit = trimInit['omega']
+
+        if UserIn['trim']==1:
+            self.trimTargs = W
+            #   the rpm trim is solved for with Brent's method if it is selected, with the rotational rate bounded by a
+            #   tip speed equal to the speed of sound, see RpmTrim.py.
+            if UserIn['trimSolver'] == 2:
+                #   the residual of Brent's method is normalized by the target thrust
+                omega, trimReport = RpmTrim(lambda omega: self.fixed_pitch_residuals(omega)/W, omegaInit, UserIn['c']/R,
+                                            UserIn['trimTol'])
+                residuals = np.array([trimReport['residual']*W])
+            else:
+                trim_sol = least_squares(self.fixed_pitch_residuals, omegaInit, method = 'lm',diff_step = 0.5)
+                omega = trim_sol.x
+                residuals = trim_sol.fun
+                #   the LM method reports success once it stalls, the trim is therefore only deemed to have converged if
+                #   the thrust residual, normalized by the target thrust, is within the tolerance
+                trimReport = {'solver': 'lm', 'converged': bool(np.max(np.abs(residuals/W)) <= UserIn['trimTol']),
+                              'iterations': trim_sol.nfev, 'nfev': trim_sol.nfev}
+            th = np.zeros(3)
+            T,CT,dCT,lam,ut,up,CL,CD,AoA,mu = self.fixed_pitch_trim(omega)
+            #   the blade pitch is fixed to the twist distribution
+            theta_expanded = self.twistDist*np.ones(np.shape(quad.rSinPhi))
+
+        else:
+            if UserIn['trim'] == 2:
+                trimTargs = self.trimTargs = W/(rho*np.pi*R**2*(omega*R)**2)
+                th = np.array([th0, 0, 0])
+                lamTPP_init = self.inflowModSelect(1, mu*np.tan(alphaInit), mu, trimTargs)
+            else:
+                trimTargs = self.trimTargs = [W/(rho*np.pi*R**2*(omega*R)**2),0,0]
+                th = np.array([th0,np.pi/180,np.pi/180])
+                lamTPP_init = self.inflowModSelect(1, mu*np.tan(alphaInit), mu, trimTargs[0])
+
+            if trimInit is not None:
+                th = np.array([trimInit['th'][0], 0, 0]) if UserIn['trim'] == 2 else np.array(trimInit['th'], dtype=float)
+                #   the shape of the inflow distribution is reused if it was computed on the same azimuthal grid, while
+                #   its mean is set by the momentum theory estimate of this case
+                if np.shape(trimInit['lambda']) == np.shape(quad.rSinPhi):
+                    lamTPP_init = trimInit['lambda']*lamTPP_init/np.mean(trimInit['lambda'])
+
+            #   The Newton iteration is used if it is selected, the LM method is used otherwise or if the Newton
+            #   iteration did not converge, in which case it is initialized with the pitch settings of the final Newton
+            #   iteration.
+            if UserIn['trimSolver'] == 2:
+                th, trimOut, trimReport = self.newton_trim(th, mu, lamTPP_init)
+                residuals = np.atleast_1d(trimTargs) - np.array([trimOut[0], trimOut[2], trimOut[3]])[:len(np.atleast_1d(trimTargs))]
+            if UserIn['trimSolver'] != 2 or not trimReport['converged']:
+                if UserIn['trim'] == 2:
+                    trim_sol = least_squares(self.variable_pitch_residuals, th[0], args=[mu, lamTPP_init], method='lm')
+                    th = np.array([np.squeeze(trim_sol.x),0 ,0 ])
+                else:
+                    trim_sol = least_squares(self.variable_pitch_residuals, th ,args = [mu, lamTPP_init],method = 'lm')
+                    th = trim_sol.x
+                residuals = trim_sol.fun
+                #   the residuals are normalized as in newton_trim, since the LM method reports success once it stalls
+                converged = np.max(np.abs(residuals/self.trimScale(omega))) <= UserIn['trimTol']
+                trimReport = {'solver': 'lm', 'converged': bool(converged), 'iterations': trim_sol.nfev,
+                              'nfev': trim_sol.nfev}
+            CT,dCT,Mx,My,lam,theta_expanded,ut,up,CL,CD,AoA = self.variable_pitch_trim(th,mu, lamTPP_init)
+
+        #   the angle of attack distribution is returned to the user and is therefore copied out of the work array
+        AoA = np.copy(AoA)
+
+        UT = ut*omega*R
+        UP = up * omega * R
+        U = np.sqrt(UT**2+UP**2)
+
+        dT = rho*np.pi*R**2*(omega*R)**2*dCT
+
+        dCQ = 0.5*solDist*r**3*(CL*np.sin(up/ut)+CD*np.cos(up/ut))
+        dQ = rho*np.pi*R**3*(omega*R)**2*dCQ
+
+        # resolves loading vectors to vertical and horizontal directions so that a change of base can be applied to the
+        # blade geometry account for the pitching motion in the namelist file - 1/18/21
+        dFz =  dT/Nb*np.cos(-theta_expanded)-dQ/(Nb*r*R)*np.sin(-theta_expanded)
+        dFx = dT/Nb*np.sin(-theta_expanded)+dQ/(Nb*r*R)*np.cos(-theta_expanded)
+        dFr = np.zeros((np.shape(dFz)))
+
+        #   converged trim variables, prior to being flipped for a CW rotor, with which the trim of a neighbouring case
+        #   can be initialized
+        trimState = {'th': np.copy(th), 'omega': omega, 'lambda': lam}
+
+        #   if the rotor is rotating CW the force distributions are flipped along the longitudinal axis of the rotor
+        #   disk.
+        if UserIn['rotation'] == 2:
+            dFz = np.flip(dFz,axis = 0)
+            dFx = np.flip(dFx, axis=0)
+            AoA = np.flip(AoA, axis=0)
+            U = np.flip(U, axis=0)
+
+            if UserIn['inflowMod'] !=1:
+                lam = np.flip(lam, axis=0)
+            th[2] = -th[2]
+
+        #   integrates the thrust, torque, hub force, side force, roll moment, and pitch moment in a single reduction
+        T, CQ, Q, H, Y, Mx, My = quad.integrate(np.stack([dT, dCQ, dQ,
+                                                         Nb*(dFr*quad.cosPhi+dFx*quad.sinPhi),
+                                                         Nb*(dFr*quad.sinPhi-dFx*quad.cosPhi),
+                                                         Nb*geomParams['rdim']*dFz*quad.sinPhi,
+                                                         -Nb*geomParams['rdim']*dFz*quad.cosPhi]))
+        P = Q * omega
+        hubLM = [H,Y,Mx,My]
+
+        #   assembles a dictionary with the computed parameters that is returned to the user and is referenced in other
+        #   segments of the program
+        loadParams = {'residuals':residuals,'trimReport':trimReport,'phiRes':phiRes,'omega':omega,'ClaDist':a,'AoA':AoA,
+                      'alpha':alphaInit,'mu':mu,'phi':phi,'th':th,'CT':CT,'T':T,'CQ':CQ,'Q':Q,'P':P,'UP':UP,'UT':UT,
+                      'U':U,'dFx':dFx,'dFy':dFr,'dFz':dFz,'hubLM':hubLM,'trimState':trimState,
+                      'inflowReport':inflowReport}
+        return loadParams
@@ -0,0 +1,72 @@
+#       VSP2WOPWOP Bracketed RPM Trim
+
+#   This function trims the rotational rate of the rotor, with the blade pitch held fixed, so that the target thrust is
+#   attained. This scalar problem is solved for with Brent's method on the signed thrust residual, rather than a
+#   general nonlinear least squares solver. A bracket is first established about the initial rotational rate by
+#   geometrically expanding its bounds, so that the rotor is only analyzed near the initial rotational rate where
+#   possible. The bracket is physically bounded from above by the rotational rate at which the tip speed reaches the
+#   speed of sound. The residual is normalized by the target thrust and the trim is deemed to have converged once it is
+#   within the tolerance, as for the other trim solvers.
+
+#%% imports necessary modules
+import numpy as np
+from scipy.optimize import brentq
+
+#%%
+def RpmTrim(residuals, omega, omegaMax, tol, xtol=1e-12, maxIter=100):
+    '''
+    This function solves for the rotational rate at which the residual is equal to zero.
+    :param residuals: function returning the signed residual of the thrust, normalized by the target thrust, at a given
+    rotational rate [rad/s]
+    :param omega: initial rotational rate [rad/s]
+    :param omegaMax: maximum admissible rotational rate [rad/s]
+    :param tol: tolerance of the normalized residual
+    :param xtol: tolerance of the rotational rate relative to its initial value, at which the iteration is terminated if
+    the residual has not attained the tolerance
+    :param maxIter: maximum number of iterations of Brent's method
+    :return:
+    :param omega: trimmed rotational rate [rad/s]
+    :param report: dictionary containing the number of iterations and function evaluations, along with the final
+    normalized residual
+    '''
+    def f(x):
+        res = float(np.squeeze(residuals(x)))
+        #   Brent's method terminates as soon as the residual is equal to zero
+        return 0.0 if abs(res) <= tol else res
+
+    omega = float(np.squeeze(omega))
+    if not omega <= omegaMax:
+        raise ValueError('The initial rotational rate of the rpm trim, ' + str(round(omega * 60 / (2 * np.pi))) + ' rpm, '
+                         'exceeds that at which the blade tip speed reaches the speed of sound, '
+                         + str(round(omegaMax * 60 / (2 * np.pi))) + ' rpm')
+    lower = omega / 1.1
+    upper = min(1.1 * omega, omegaMax)
+    fLower = f(lower)
+    fUpper = f(upper)
+    nfev = 2
+
+    #   expands the bracket until the residual changes sign, towards the bound with the smaller residual
+    increase = abs(fUpper) < abs(fLower) or np.isnan(fLower)
+    while np.sign(fLower) == np.sign(fUpper):
+        if increase:
+            if upper >= omegaMax:
+                raise ValueError('The target thrust cannot be attained without the blade tip speed exceeding the speed '
+                                 'of sound, omega > ' + str(round(omegaMax * 60 / (2 * np.pi))) + ' rpm')
+            lower, fLower = upper, fUpper
+            upper = min(1.5 * upper, omegaMax)
+            fUpper = f(upper)
+        else:
+            if lower < omega * 1e-3:
+                raise ValueError('The rpm trim failed to bracket the target thrust')
+            upper, fUpper = lower, fLower
+            lower = lower / 1.5
+            fLower = f(lower)
+        nfev = nfev + 1
+
+    omega, out = brentq(f, lower, upper, xtol=xtol * omega, maxiter=maxIter, full_output=True, disp=False)
+    res = float(np.squeeze(residuals(omega)))
+
+    report = {'solver': 'brent', 'converged': bool(abs(res) <= tol), 'iterations': out.iterations,
+              'nfev': nfev + out.function_calls + 1, 'residual': res}
+
+    return omega, report
@@ -0,0 +1,144 @@
+#       VSP2WOPWOP Sweep Manifest
+
+#   This module keeps track of the completed cases of an analysis mode operating condition sweep, so that a rerun only
+#   recomputes the cases whose inputs have changed or whose outputs are missing, and an interrupted sweep resumes from
+#   where it stopped. Each case is identified by a hash of its inputs: the processed blade geometry, the polars of its
+#   rotational rate, its operating condition, and all the user inputs upon which its outputs depend. Once all the files
+#   of a case have been written, a record containing this hash, the names of the files, and the computed loading
+#   parameters is saved to the manifest directory ('.manifest') of the geometry. A case is skipped on a subsequent run
+#   if its record exists, the hash matches, and all of its files are present, in which case its loading parameters are
+#   loaded from the record. The hash also includes a fingerprint of the source files of the program, so that any change
+#   to the program invalidates all of the existing records, and the manifest version, which is incremented whenever the
+#   contents of the records change.
+
+#%% imports necessary modules
+import os
+import pickle
+import hashlib
+from shutil import rmtree
+import numpy as np
+
+#%%
+manifestVersion = 1
+#   fingerprint of the source files of the program, which is computed once per process by codeFingerprint
+codeVersion = None
+
+#   User inputs that either do not affect the outputs of a case or that are replaced by the operating condition of the
+#   case itself
+sweepFields = ['T', 'Vx', 'Vz', 'omega', 'alphaShaft', 'dataFileName', 'nWorkers', 'saveHDF5', 'cacheDegenGeom',
+               'cacheDir', 'cacheSize', 'outputFolderName', 'resumeSweep', 'hdf5Columnar', 'hdf5Compression',
+               'writeThreads', 'writeQueue', 'archiveOutput']
+
+
+def hashUpdate(h, item):
+    '''
+    This function recursively updates a hash with the contents of dictionaries, lists, arrays, and scalars. Dictionaries
+    are hashed in the order of their sorted keys.
+    :param h: hashlib object
+    :param item: quantity to be hashed
+    '''
+    if isinstance(item, dict):
+        h.update(b'{')
+        for key in sorted(item.keys(), key=str):
+            hashUpdate(h, str(key))
+            hashUpdate(h, item[key])
+        h.update(b'}')
+    elif isinstance(item, (list, tuple)):
+        h.update(b'[')
+        for x in item:
+            hashUpdate(h, x)
+        h.update(b']')
+    elif isinstance(item, np.ndarray):
+        h.update(bytes(str(item.dtype) + str(item.shape), encoding='ascii'))
+        h.update(np.ascontiguousarray(item).tobytes())
+    else:
+        h.update(bytes(type(item).__name__ + repr(item), encoding='utf-8'))
+
+
+def codeFingerprint():
+    '''
+    This function computes the hash of the source files of the program, i.e. the modules in the directory of this
+    module, so that the records that were computed by a different version of the program are recomputed.
+    :return:
+    :param codeVersion: hexadecimal digest of the hash
+    '''
+    global codeVersion
+    if codeVersion is None:
+        h = hashlib.sha1()
+        dirCode = os.path.dirname(os.path.abspath(__file__))
+        for file in sorted(os.listdir(dirCode)):
+            if file.endswith('.py'):
+                with open(os.path.join(dirCode, file), 'rb') as f:
+                    hashUpdate(h, [file, f.read()])
+        codeVersion = h.hexdigest()
+    return codeVersion
+
+
+def hashInputs(*items):
+    '''
+    This function computes the hash of a set of inputs, along with the manifest version and the fingerprint of the
+    program.
+    :param items: quantities to be hashed, see hashUpdate
+    :return:
+    :param key: hexadecimal digest of the hash
+    '''
+    h = hashlib.sha1()
+    hashUpdate(h, [manifestVersion, codeFingerprint(), *items])
+    return h.hexdigest()
+
+
+def loadRecord(dirManifest, dirCaseFile, key):
+    '''
+    This function returns the loading parameters of a completed case, provided that its record is up to date.
+    :param dirManifest: manifest directory of the geometry
+    :param dirCaseFile: directory of the case
+    :param key: hash of the current inputs of the case
+    :return:
+    :param loadParams: dictionary of the loading parameters of the case, or None if the case must be recomputed
+    '''
+    try:
+        with open(os.path.join(dirManifest, os.path.basename(dirCaseFile) + '.pkl'), 'rb') as f:
+            record = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    if record['key'] != key or not all(os.path.exists(os.path.join(dirCaseFile, file)) for file in record['files']):
+        return None
+    return record['loadParams']
+
+
+def saveRecord(dirManifest, dirCaseFile, key, loadParams):
+    '''
+    This function saves the record of a completed case, listing all the files in its directory. The record is first
+    written to a temporary file, which is then renamed, so that a partially written record is never read.
+    :param dirManifest: manifest directory of the geometry
+    :param dirCaseFile: directory of the case
+    :param key: hash of the inputs of the case
+    :param loadParams: dictionary of the loading parameters of the case
+    '''
+    os.makedirs(dirManifest, exist_ok=True)
+    filePath = os.path.join(dirManifest, os.path.basename(dirCaseFile) + '.pkl')
+    fileTemp = filePath + '.' + str(os.getpid()) + '.tmp'
+    with open(fileTemp, 'wb') as f:
+        pickle.dump({'key': key, 'files': sorted(os.listdir(dirCaseFile)), 'loadParams': loadParams}, f)
+    os.replace(fileTemp, filePath)
+
+
+def removeStale(dirManifest, dirSaveFile, caseNames):
+    '''
+    This function deletes the case directories and records of cases that are no longer part of the sweep.
+    :param dirManifest: manifest directory of the geometry
+    :param dirSaveFile: directory of the geometry, in which the case directories are located
+    :param caseNames: list of the case folder names of the current sweep
+    '''
+    if not os.path.isdir(dirManifest):
+        return
+    caseNames = set(caseNames)
+    for file in os.listdir(dirManifest):
+        name, ext = os.path.splitext(file)
+        if ext == '.tmp':
+            os.remove(os.path.join(dirManifest, file))
+        elif ext == '.pkl' and name not in caseNames:
+            if os.path.isdir(os.path.join(dirSaveFile, name)):
+                rmtree(os.path.join(dirSaveFile, name))
+            os.remove(os.path.join(dirManifest, file))
@@ -26,16 +26,79 @@ loadingFileName = "Load"
 # Names of DegenGeom files add as many geometry cases as you wish separated by commas.
 dataFileNames = ["Boeing360_DegenGeom.csv"]
 
+# Set equal to one in order to store the parsed DegenGeom files in a binary cache, so that geometries that have not
+# changed since a previous run are loaded from the cache rather than parsed again.
+cacheDegenGeom = 1
+
+# Directory in which the cached DegenGeom files are stored.
+cacheDir = '.DegenGeomCache'
+
+# Maximum size of the cache (MB), once it is exceeded the least recently used entries are evicted.
+cacheSize = 500
+
 # Operational mode: set equal to one for design mode, which is ideal for geometric parametric studies, where each
 # variant of the blade geometry geometry corresponds to a different operating condition. Set this quantity equal to
 # two to run in analysis mode. The analysis mode is tailored for running operational condition sweeps on each blade
 # geometry.
 operMode = 1
 
+# Number of worker processes over which the DegenGeom geometries (design mode) or the cases of the operating condition
+# sweep (analysis mode) are distributed. Set this quantity equal to one to run them serially.
+nWorkers = 1
+
+# Set equal to one to trim all the hover and axial flight cases of the analysis mode operating condition sweep
+# simultaneously, which is considerably faster for large sweeps.
+hoverBatch = 0
+
+# Set equal to one to trim all the forward flight cases of the analysis mode operating condition sweep simultaneously,
+# at the azimuthal resolution 'phiRes' ('phiResTol' must be equal to zero). Any case that does not converge is trimmed
+# individually. Only the constant, linear, and Drees inflow models ('inflowMod' = 1, 2, or 3) are supported.
+ffBatch = 0
+
+# Set equal to one to solve the analysis mode operating condition sweep as a continuation, whereby the cases are ordered
+# so that neighbouring operating conditions follow one another and the trim of each case is initialized with the
+# converged pitch settings, rotational rate, and inflow distribution of its nearest solved neighbour. When the cases are
+# distributed over multiple workers ('nWorkers' > 1) each worker solves a contiguous segment of the ordered sweep.
+warmStart = 0
+
+# Set equal to one to write the blade geometry patch file of the analysis mode operating condition sweep only once, to
+# the content-addressed store ('.store') in the output directory of the geometry, and link it into each case directory.
+# A hard link is used if possible, otherwise a symbolic link, and the file is only copied if neither is supported.
+linkGeom = 1
+
+# Set equal to one to resume the analysis mode operating condition sweep: the output directory of each geometry is
+# retained and only the cases whose inputs (geometry, polars, operating condition, and user inputs) have changed, or
+# whose outputs are incomplete, are recomputed. Cases that are no longer part of the sweep are deleted. Set equal to zero
+# to recompute every case.
+resumeSweep = 0
+
+# Number of background threads that write the files of the analysis mode operating condition sweep while the next case
+# is trimmed. Set this quantity equal to zero to write the files of each case before the next case is trimmed.
+writeThreads = 2
+
+# Maximum number of cases whose files are waiting to be written by the background threads ('writeThreads' > 0), once it
+# is reached the trim of the next case waits until the files of a case have been written.
+writeQueue = 4
+
+# Set equal to one to bundle the case directories of the analysis mode operating condition sweep into uncompressed tar
+# archives ('cases.000.tar', etc.) with an index ('cases.json'), rather than writing each of their files to the output
+# directory, which limits the number of files created on the (parallel) filesystem. The files of each case are staged
+# in the local temporary directory (TMPDIR). The case directories are extracted with 'python CaseArchive.py <geometry
+# output directory> <extraction directory> [case folder names]'. Requires 'resumeSweep' = 0.
+archiveOutput = 0
+
 # Set equal to one in order to save the main dictionary, which contains all the computed geometric and loading
 # parameters for each case as an HDF5 file. This file can be read using the following command: h5py.File("file path", 'MainDict.h5')), 'r')
+# or lazily, selecting the cases by their operating condition, with the ResultsReader class (ResultsReader.py).
 saveHDF5 = 1
 
+# Set equal to one to save the loading parameters of the analysis mode operating condition sweep in a columnar layout:
+# the hover/axial flight and forward flight cases of each geometry are stored as tables ('hover' and 'forwardFlight'),
+# in which each quantity is a single dataset indexed by case, rather than as a group per case. The compression filter
+# of the tables is set by 'hdf5Compression', either 'gzip', 'lzf', or None.
+hdf5Columnar = 0
+hdf5Compression = 'gzip'
+
 #%%
 '''Airfoil Cross Section Configuration'''
 
@@ -64,6 +127,17 @@ check = 0
 # are varied to attain the desired thrust condition, while the longitudinal and lateral flapping angles are minimized).
 trim = 2
 
+# Trim solver: set equal to 1 for the Levenberg-Marquardt method, or 2 for the dedicated solver of each trim type. For
+# the rpm trim (trim = 1) this is Brent's method, applied to the signed thrust error over a bracket of rotational rates
+# that is bounded from above by a tip speed equal to the speed of sound ('c'). For the collective/cyclic pitch trim
+# (trim = 2 or 3, forward flight only) this is a damped Newton iteration with a semi-analytic Jacobian, which reverts to
+# the Levenberg-Marquardt method if it does not converge within 'trimMaxIter' iterations. 'trimTol' is the convergence
+# tolerance of Brent's method and of the Newton iteration on the thrust coefficient and hub moments, normalized by the
+# target thrust coefficient and by the product of the target thrust and rotor radius, respectively.
+trimSolver = 2
+trimTol = 1e-10
+trimMaxIter = 25
+
 #   Direction of rotation set equal to 1 for CCW and 2 for CW
 rotation = 1
 
@@ -110,6 +184,28 @@ c = 340
 # linear, or 3 for Drees's , or 4 for the steady Pitt-Peters (applicable when trimming to non-zero hub moments) model.
 inflowMod = 4
 
+# Airfoil polar lookup in forward flight, set equal to 1 to linearly interpolate the sectional lift and drag coefficients
+# from the XFoil polars, or 0 to assume a symmetric airfoil, where CL is the product of the lift curve slope and the
+# angle of attack and CD is 10% of CL.
+polarLookupFF = 0
+
+# Number of azimuthal stations over which the periodic blade loads are computed in forward flight. This quantity sets
+# the number of keys in the periodic functional data file.
+phiRes = 361
+
+# Set this quantity greater than zero in order to adaptively refine the azimuthal resolution. The rotor is first trimmed
+# with 'phiRes' azimuthal stations and the number of azimuthal intervals is then doubled until the thrust coefficient
+# and hub loads change by less than this (relative) tolerance, or until 'phiResMax' stations are reached. When this
+# mode is used 'phiRes' should be set to a coarse resolution (e.g. 73).
+phiResTol = 0
+phiResMax = 1441
+
+# Depth of the Anderson mixing that accelerates the fixed point iterations of the inflow models (forward flight) and of
+# the tip loss formulation (hover), i.e. the number of previous iterates that are combined to form the next iterate.
+# Set equal to 0 for the plain fixed point iteration. 'inflowMaxIter' limits the number of iterations of each call.
+andersonDepth = 3
+inflowMaxIter = 200
+
 # %%
 '''Broadband noise analysis configuration '''
 
@@ -202,10 +298,11 @@ psiMin = -45
 psiMax = 0
 
 # %% Packs user input parameters into a dictionary (no need to edit)
-UserIn = {'OperMode': operMode, 'saveHDF5': saveHDF5, 'dataFileName': dataFileNames,
+UserIn = {'OperMode': operMode, 'saveHDF5': saveHDF5, 'hdf5Columnar': hdf5Columnar, 'hdf5Compression': hdf5Compression, 'dataFileName': dataFileNames,
+          'cacheDegenGeom': cacheDegenGeom, 'cacheDir': cacheDir, 'cacheSize': cacheSize, 'nWorkers': nWorkers, 'hoverBatch': hoverBatch, 'ffBatch': ffBatch, 'warmStart': warmStart, 'linkGeom': linkGeom, 'resumeSweep': resumeSweep, 'writeThreads': writeThreads, 'writeQueue': writeQueue, 'archiveOutput': archiveOutput,
           'airfoilPolarFileName': airfoilPolarFileName, 'XsecLocation': XsecLocation,
-          'aStart': aStart, 'aLength': aLength, 'check': check,'trim':trim, 'Nb': Nb,'rotation':rotation, 'Vx': Vx, 'Vz': Vz, 'alphaShaft': alphaShaft,
-          'omega': omega, 'T': T, 'thetaInit': thetaInit, 'loadPos': loadPos, 'tipLoss': tipLoss, 'inflowMod':inflowMod,'rho': rho, 'c': c,
+          'aStart': aStart, 'aLength': aLength, 'check': check,'trim':trim,'trimSolver':trimSolver,'trimTol':trimTol,'trimMaxIter':trimMaxIter, 'Nb': Nb,'rotation':rotation, 'Vx': Vx, 'Vz': Vz, 'alphaShaft': alphaShaft,
+          'omega': omega, 'T': T, 'thetaInit': thetaInit, 'loadPos': loadPos, 'tipLoss': tipLoss, 'inflowMod':inflowMod,'polarLookupFF':polarLookupFF,'phiRes':phiRes,'phiResTol':phiResTol,'phiResMax':phiResMax,'andersonDepth':andersonDepth,'inflowMaxIter':inflowMaxIter,'rho': rho, 'c': c,
           'nmlWrite': nmlWrite, 'outputFolderName': outputFolderName,
           'geomFileName': geomFileName, 'loadingFileName': loadingFileName,
           'BBNoiseFlag': BBNoiseFlag, 'NmlFileName': NmlFileName, 'nRev': nRev, 'nt': nt, 'obsType': obsType, 'xLoc': xLoc,
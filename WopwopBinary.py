@@ -0,0 +1,62 @@
+#       VSP2WOPWOP PSU-WOPWOP Binary File Format
+
+#   This module defines the binary layouts that are shared by the patch, functional data, and BPM file writers. The
+#   fixed length headers are precompiled struct.Struct layouts, while the variable length records are written from
+#   NumPy arrays through the buffer protocol, so that the data is converted to single precision in a single pass and
+#   never unpacked into Python objects. The patch and functional data files are little-endian, whereas the BPM files are
+#   big-endian. A new file type is added by defining its header layouts here and writing its records with writeRecord.
+
+#%% imports necessary modules
+import struct
+import numpy as np
+
+#%% little-endian patch and functional data files
+
+#   magic number, version number, units, comments, geometry file flag, number of zones, grid type, geometry type,
+#   normal vector centering, precision, iblank, and a reserved integer
+geomHeader = struct.Struct('<3i32s1024s8i')
+
+#   magic number, version number, comments, functional data file flag (2), number of zones, grid type, geometry type,
+#   normal vector centering, data type, reference frame, precision, and two reserved integers
+functionalHeader = struct.Struct('<3i1024s10i')
+
+#   zone name and the number of chordwise and spanwise elements of a constant structured zone
+zoneHeader = struct.Struct('<32s2i')
+
+#   zone name, period, number of keys, and the number of chordwise and spanwise elements of a periodic structured zone
+periodicZoneHeader = struct.Struct('<32sf3i')
+
+#   single precision floating point and integer data
+patchFloat, patchInt = '<f4', '<i4'
+
+#%% big-endian BPM files
+
+#   magic number, number of blade sections, uniform blade flag, the flags of the included sectional quantities, and the
+#   time type
+bpmHeader = struct.Struct('>11i')
+
+#   number of revolutions, period, and number of time steps per revolution of periodic data
+bpmPeriodicHeader = struct.Struct('>ifi')
+
+bpmFloat = '>f4'
+
+#%%
+def writeRecord(f_bin, data, dtype):
+    '''
+    This function writes an array to a binary file in C order, with the byte order and precision of the specified
+    data type. The array is only copied if it is not already of this type and contiguous.
+    :param f_bin: file object opened for binary writing
+    :param data: array, or nested sequence of equal length arrays, to be written
+    :param dtype: NumPy data type string, including its byte order, e.g. '<f4' or '>f4'
+    '''
+    f_bin.write(memoryview(np.ascontiguousarray(data, dtype=dtype)))
+
+
+def asciiBytes(string):
+    '''
+    This function encodes a string for a fixed length string field of a header, which struct pads with null bytes.
+    :param string: string to be encoded
+    :return:
+    :param string: ASCII encoded bytes
+    '''
+    return bytes(string, encoding='ascii')
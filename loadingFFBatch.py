@@ -0,0 +1,393 @@
+#       VSP2WOPWOP Batched Forward Flight Loading Calculation
+
+#   This function trims a single blade geometry to multiple forward flight operating conditions simultaneously. It
+#   carries out the same analysis as loadingFF, however the thrust, rotational rate, flight speeds, and shaft tilt
+#   angle are given as arrays and each azimuthal and radial quantity is evaluated for all the cases at once as an
+#   (ncases, phiRes, nXsecs) array. The inflow distribution of each case is converged by an Anderson accelerated fixed
+#   point iteration that only advances the cases that have not yet converged, see FixedPoint.py. The collective/cyclic pitch (trim = 2 or 3) of every case is
+#   solved for using a damped Newton iteration with a Broyden updated Jacobian, with the step of each case halved
+#   independently, and the rotational rate (trim = 1) using a vectorized secant method. Any case that has not converged
+#   within UserIn['trimMaxIter'] iterations is trimmed individually, see RotorSolver.py. A list of dictionaries, one
+#   per case and with the same contents as those returned by loadingFF, is returned.
+
+
+# %%
+def loadingFFBatch(UserIn, geomParams, XsecPolar, W, omega, Vx, Vz, alphaShaft, polarTable=None):
+
+    import numpy as np
+    from RotorSolver import rotorSolver
+    from FixedPoint import fixedPointBatch
+
+    def fixedPoint(g, x, ind, tol):
+        '''
+        This function converges the fixed point iteration x = g(x) of each case, see FixedPoint.py. The number of calls,
+        evaluations of g, and unconverged calls of each case are accumulated in inflowReport.
+        :param g: function returning the next iterate of the cases at the positions pos of ind, g(x[pos], pos), where pos
+        is a slice if every case is evaluated
+        :param x: initial guess of each case, the cases correspond to the first axis
+        :param ind: indices of the cases
+        :param tol: tolerance of the relative change in each element of x between successive iterations
+        :return:
+        :param x: converged iterate of each case
+        '''
+        x, nIter, converged = fixedPointBatch(g, x, tol, UserIn['inflowMaxIter'], UserIn['andersonDepth'])
+        inflowReport['calls'][ind] += 1
+        inflowReport['iterations'][ind] += nIter
+        inflowReport['unconverged'][ind] += ~converged
+        return x
+
+    def inflowModSelect(model, lam, ind, CT):
+        '''
+        This function selects and returns the converged inflow distribution of each case based on the model specified
+        in the input module, see RotorSolver.py.
+        :param model: integer specifing the model selected in the input module (UserIn['inflowMod'])
+        :param lam: initial guess for the inflow distribution of each case
+        :param ind: indices of the cases
+        :param CT: thrust coefficient of each case
+        '''
+        lam = np.broadcast_to(lam, (len(ind),) + np.shape(quad.rSinPhi))
+        CT = np.reshape(CT, (-1, 1, 1))
+        muCase = mu[ind][:, None, None]
+        alpha = alphaInit[ind][:, None, None]
+
+        if model == 1:
+            mu_x = muCase * np.cos(alpha)
+
+            def iterate(lam, pos):
+                return mu_x[pos] * np.tan(alpha[pos]) + CT[pos] / (2 * np.sqrt(mu_x[pos] ** 2 + lam ** 2))
+        elif model == 2:
+            mu_x = muCase * np.cos(alpha)
+
+            def iterate(lam, pos):
+                return CT[pos] / (2 * np.sqrt(mu_x[pos] ** 2 + lam ** 2)) * (1 + 1.2 * quad.rCosPhi)
+        else:
+            def iterate(lam, pos):
+                wake_skew = np.arctan(muCase[pos] * np.cos(alpha[pos]) / lam)
+                kx = 4 / 3 * ((1 - np.cos(wake_skew) - 1.8 * muCase[pos] ** 2) / np.sin(wake_skew))
+                ky = -2 * muCase[pos]
+                return CT[pos] / (2 * np.sqrt(muCase[pos] ** 2 + lam ** 2)) * (1 + kx * quad.rCosPhi + ky * quad.rSinPhi)
+
+        return fixedPoint(iterate, lam, ind, 0.0005)
+
+    def aeroParams(AoA):
+        '''
+        This function returns the lift and drag coefficients corresponding to the angle of attack distribution of each
+        case, including the treatment of the stalled blade sections, see RotorSolver.py.
+        :param AoA: angle of attack distribution of each case [rad]
+        '''
+        if UserIn['polarLookupFF'] == 1:
+            alpha = (AoA + np.pi) % (2 * np.pi) - np.pi
+            CL, CD = polarTable.lookupUniform(alpha)
+            stall = (alpha > polarTable.alphaMax) | (alpha < polarTable.alphaMin)
+        else:
+            CL = XsecPolarExp['Lift Slope'] * AoA
+            CD = 0.1 * CL
+            stall = AoA > XsecPolarExp['alphaMax']
+
+        rInd = np.nonzero(stall)[-1]
+        CD[stall] = XsecPolarExp['CdMax'][rInd]
+        CL[stall] = XsecPolarExp['ClMax'][rInd]+(AoA[stall]-XsecPolarExp['alphaMax'][rInd])*(XsecPolarExp['ClMin'][rInd]-XsecPolarExp['ClMax'][rInd])/(XsecPolarExp['Alpha0'][rInd]+2*np.pi-XsecPolarExp['alphaMax'][rInd])
+        return CL, CD
+
+    def inflowIteration(theta, ut, lamInit, ind, dragWeight=False):
+        '''
+        This function converges the inflow and thrust distributions of each case together, see loadingFF.
+        :param theta: blade pitch distribution of each case [rad]
+        :param ut: nondimensionalized tangential velocity component of each case
+        :param lamInit: initial estimate for the inflow ratio of each case
+        :param ind: indices of the cases
+        :param dragWeight: weighs the drag term of the thrust coefficient distribution by the angle of attack, as is
+        done for the rpm trim
+        :return:
+        :param loads: dictionary of the converged distributions of each case
+        '''
+        shape = (len(ind),) + np.shape(quad.rSinPhi)
+        loads = {key: np.zeros(shape) for key in ['up', 'AoA', 'CL', 'CD', 'dCT']}
+        loads['CT'] = np.zeros(len(ind))
+
+        def iterate(up, pos):
+            AoA = (theta[pos] - up / ut[pos]) % (2 * np.pi)
+            CL, CD = aeroParams(AoA)
+            if dragWeight:
+                dCT = 1/2*solDist*r**2*(CL*np.cos(up/ut[pos])-CD*AoA*np.sin(up/ut[pos]))
+            else:
+                dCT = 1/2*solDist*r**2*(CL*np.cos(up/ut[pos])-CD*np.sin(up/ut[pos]))
+            CT = quad.integrate(dCT)
+            loads['up'][pos], loads['AoA'][pos], loads['CL'][pos], loads['CD'][pos] = up, AoA, CL, CD
+            loads['dCT'][pos], loads['CT'][pos] = dCT, CT
+            return inflowModSelect(UserIn['inflowMod'], up, ind[pos], CT)
+
+        loads['lam'] = fixedPoint(iterate, lamInit, ind, 0.0005)
+        loads.update({'ut': ut, 'theta': theta})
+        return loads
+
+    def variable_pitch_trim(th, ind):
+        '''
+        This function computes the thrust coefficient and hub moments of each case at the specified collective and
+        cyclic pitch settings.
+        :param th: collective, lateral, and longitudinal cyclic pitch settings of each case [rad]
+        :param ind: indices of the cases
+        '''
+        th = th[:, :, None, None]
+        theta = twistDist + th[:, 0] + th[:, 1] * quad.cosPhi + th[:, 2] * quad.sinPhi
+        ut = r + (mu[ind] * np.cos(alphaInit[ind]))[:, None, None] * quad.sinPhi
+        loads = inflowIteration(theta, ut, lamTPP_init[ind], ind)
+
+        CMX, CMY = quad.moments(loads['dCT'])[1:]
+        loads['Mx'] = CMX * rho * (omega[ind] * R) ** 2 * np.pi * R ** 3
+        loads['My'] = CMY * rho * (omega[ind] * R) ** 2 * np.pi * R ** 3
+        return loads
+
+    def variable_pitch_jacobian(loads, ind):
+        '''
+        This function computes the Jacobian of the thrust coefficient, roll, and pitching moments of each case with
+        respect to the collective and cyclic pitch settings, with the inflow distribution frozen, see loadingFF.
+        :param loads: dictionary returned by variable_pitch_trim
+        :param ind: indices of the cases
+        :return:
+        :param J: Jacobian of each case, of size [len(ind) x 3 x 3]
+        '''
+        AoA, up, ut = loads['AoA'], loads['up'], loads['ut']
+        dAoA = 1e-4
+        CLp, CDp = aeroParams((AoA+dAoA)%(2*np.pi))
+        CLm, CDm = aeroParams((AoA-dAoA)%(2*np.pi))
+        dCT_dAoA = 1/2*solDist*r**2*((CLp-CLm)*np.cos(up/ut)-(CDp-CDm)*np.sin(up/ut))/(2*dAoA)
+
+        J = np.stack([np.transpose(quad.moments(dCT_dAoA)), np.transpose(quad.moments(dCT_dAoA*quad.cosPhi)),
+                      np.transpose(quad.moments(dCT_dAoA*quad.sinPhi))], axis=2)
+        J[:, 1:] = J[:, 1:]*(rho*(omega[ind]*R)**2*np.pi*R**3)[:, None, None]
+        return J
+
+    def residuals(loads, ind):
+        #   thrust coefficient and hub moments normalized by the target thrust coefficient and by the product of the
+        #   target thrust and rotor radius
+        return (trimTargs[ind] - np.transpose([loads['CT'], loads['Mx'], loads['My']])[:, :nDOF]) / scale[ind]
+
+    def newton_trim(th):
+        '''
+        This function performs the collective (trim = 2) or collective and cyclic (trim = 3) pitch trim of each case
+        using a damped Newton iteration, see RotorSolver.py. Each iteration only evaluates the cases that have not yet
+        converged, and the step of each case is halved until its own normalized residual decreases.
+        :param th: initial guess for the collective and cyclic pitch settings of each case [rad]
+        :return:
+        :param th: trimmed collective and cyclic pitch settings of each case [rad]
+        :param converged: true for each case whose normalized residual is within UserIn['trimTol']
+        '''
+        allCases = np.arange(nCases)
+        loads = variable_pitch_trim(th, allCases)
+        res = residuals(loads, allCases)
+        J = variable_pitch_jacobian(loads, allCases)[:, :nDOF, :nDOF] / scale[:, :, None]
+        nfev[:] = 1
+        active = np.max(np.abs(res), axis=1) > UserIn['trimTol']
+
+        for iteration in range(UserIn['trimMaxIter']):
+            ind = np.where(active)[0]
+            if len(ind) == 0:
+                break
+            step = np.squeeze(np.linalg.pinv(J[ind]) @ res[ind][:, :, None], axis=2)
+
+            #   each case is stepped until its normalized residual decreases, the step being halved otherwise
+            damping = np.ones(len(ind))
+            thStep = th[ind].copy()
+            resStep = np.zeros((len(ind), nDOF))
+            stepLoads = {}
+            pending = np.ones(len(ind), dtype=bool)
+            for i in range(8):
+                pos = np.where(pending)[0]
+                thStep[pos, :nDOF] = th[ind[pos], :nDOF] + damping[pos, None] * step[pos]
+                trial = variable_pitch_trim(thStep[pos], ind[pos])
+                resStep[pos] = residuals(trial, ind[pos])
+                nfev[ind[pos]] += 1
+                for key in ['AoA', 'up', 'ut']:
+                    stepLoads.setdefault(key, np.zeros((len(ind),) + np.shape(quad.rSinPhi)))[pos] = trial[key]
+                decreased = np.linalg.norm(resStep[pos], axis=1) < np.linalg.norm(res[ind[pos]], axis=1)
+                pending[pos[decreased]] = False
+                damping[pos[~decreased]] = damping[pos[~decreased]] / 2
+                if not np.any(pending):
+                    break
+
+            #   Broyden update of the Jacobian of the undamped cases, the Jacobian of the damped cases is re-evaluated
+            full = damping == 1
+            dth = thStep[full, :nDOF] - th[ind[full], :nDOF]
+            J[ind[full]] = J[ind[full]] + ((res[ind[full]] - resStep[full]) - np.squeeze(J[ind[full]] @ dth[:, :, None], axis=2))[:, :, None] \
+                           * dth[:, None, :] / np.sum(dth ** 2, axis=1)[:, None, None]
+            if np.any(~full):
+                J[ind[~full]] = variable_pitch_jacobian({key: value[~full] for key, value in stepLoads.items()},
+                                                        ind[~full])[:, :nDOF, :nDOF] / scale[ind[~full], :, None]
+
+            th[ind], res[ind] = thStep, resStep
+            iterations[ind] += 1
+            active[ind] = np.max(np.abs(resStep), axis=1) > UserIn['trimTol']
+
+        return th, ~active
+
+    def fixed_pitch_trim(omegaCase, ind):
+        '''
+        This function computes the thrust of each case at the specified rotational rate, with the blade pitch fixed to
+        the twist distribution.
+        :param omegaCase: rotational rate of each case [rad/s]
+        :param ind: indices of the cases
+        '''
+        mu[ind] = U[ind] / (omegaCase * R)
+        CT = W[ind] / (rho * np.pi * R ** 2 * (omegaCase * R) ** 2)
+        lamInit = inflowModSelect(UserIn['inflowMod'], (mu[ind] * np.tan(alphaInit[ind]))[:, None, None], ind, CT)
+        ut = r + mu[ind][:, None, None] * quad.sinPhi
+        theta = np.broadcast_to(twistDist, np.shape(ut))
+        loads = inflowIteration(theta, ut, lamInit, ind, dragWeight=True)
+        loads['T'] = loads['CT'] * rho * np.pi * R ** 2 * (omegaCase * R) ** 2
+        return loads
+
+    def rpm_residuals(omegaCase, ind):
+        nfev[ind] += 1
+        return (W[ind] - fixed_pitch_trim(omegaCase, ind)['T']) / W[ind]
+
+    def secant(x0, x1):
+        '''
+        This function solves rpm_residuals(x, ind) = 0 for all the cases simultaneously using the secant method, only
+        the cases that have not yet converged are evaluated on each iteration, see loadingHoverBatch.
+        :param x0: first initial guess of each case
+        :param x1: second initial guess of each case
+        :return:
+        :param x: solution of each case
+        :param converged: true for each case whose residual is within UserIn['trimTol']
+        '''
+        ind = np.arange(nCases)
+        f0 = rpm_residuals(x0, ind)
+        f1 = rpm_residuals(x1, ind)
+        x = x1.copy()
+        active = np.abs(f1) > UserIn['trimTol']
+
+        for i in range(UserIn['trimMaxIter']):
+            if not np.any(active):
+                break
+            ind = np.where(active)[0]
+            df = f1[ind] - f0[ind]
+            df[df == 0] = np.finfo(float).eps
+            #   the rotational rate is bounded by a tip speed equal to the speed of sound, as in RpmTrim
+            x2 = np.minimum(x1[ind] - f1[ind] * (x1[ind] - x0[ind]) / df, UserIn['c'] / R)
+            f2 = rpm_residuals(x2, ind)
+
+            x0[ind], f0[ind] = x1[ind], f1[ind]
+            x1[ind], f1[ind] = x2, f2
+            x[ind] = x2
+            iterations[ind] += 1
+            active[ind] = np.abs(f2) > UserIn['trimTol']
+
+        return x, ~active
+
+    # %%
+    #   This block of code defines parameters that are used throughout the remainder of the module
+    W, omega, Vx, Vz, alphaShaft = [np.array(x, dtype=float) for x in np.broadcast_arrays(np.ravel(W), np.ravel(omega),
+                                    np.ravel(Vx), np.ravel(Vz), np.ravel(alphaShaft))]
+    nCases = len(W)
+    rho = UserIn['rho']
+    Nb = UserIn['Nb']
+    R = geomParams['R']
+    r = geomParams['r']
+    solDist = geomParams['solDist']
+    twistDist = geomParams['twistDist']
+
+    #   the airfoil parameters expanded to the radial stations, the polar table, and the quadrature are those of the
+    #   solver of the blade, which also trims any case that does not converge
+    solver = rotorSolver(geomParams, XsecPolar, UserIn['XsecLocation'], UserIn['phiRes'], polarTable)
+    XsecPolarExp = solver.XsecPolarExp
+    polarTable = solver.polarTable
+    quad = solver.quad
+
+    #   converts rotational rate from rpm to rad/s, the requested rotational rate of each case is retained for any case
+    #   that is trimmed individually
+    omegaIn = omega
+    omega = omega/60*2*np.pi
+    alphaInit = alphaShaft*(np.pi/180)+np.arctan(Vz / Vx)
+    U = np.hypot(Vx, Vz)
+    mu = U/(omega*R)
+    a = np.ones((len(r)))*XsecPolar[list(XsecPolar.keys())[0]]['Lift Slope']
+
+    #   number of calls to the inflow models and of their fixed point iterations, along with the number of iterations
+    #   and evaluations of the trim, of each case
+    inflowReport = {key: np.zeros(nCases, dtype=int) for key in ['calls', 'iterations', 'unconverged']}
+    iterations = np.zeros(nCases, dtype=int)
+    nfev = np.zeros(nCases, dtype=int)
+
+    # %%
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if UserIn['trim'] == 1:
+            omega, converged = secant(omega.copy(), np.minimum(omega * 1.01, UserIn['c'] / R))
+            loads = fixed_pitch_trim(omega, np.arange(nCases))
+            th = np.zeros((nCases, 3))
+            res = np.transpose([W - loads['T']])
+            solverName = 'secant'
+        else:
+            nDOF = 1 if UserIn['trim'] == 2 else 3
+            targCT = W/(rho*np.pi*R**2*(omega*R)**2)
+            trimTargs = np.zeros((nCases, nDOF))
+            trimTargs[:, 0] = targCT
+            scale = np.transpose([np.ones(nCases), rho*(omega*R)**2*np.pi*R**3, rho*(omega*R)**2*np.pi*R**3])[:, :nDOF]*targCT[:, None]
+            th = np.zeros((nCases, 3))
+            th[:, 0] = UserIn['thetaInit']*np.pi/180
+            if UserIn['trim'] == 3:
+                th[:, 1:] = np.pi/180
+            #   constant inflow with respect to the tip path plane, with which the inflow iteration is initialized
+            lamTPP_init = inflowModSelect(1, (mu*np.tan(alphaInit))[:, None, None], np.arange(nCases), targCT)
+
+            th, converged = newton_trim(th)
+            loads = variable_pitch_trim(th, np.arange(nCases))
+            res = trimTargs - np.transpose([loads['CT'], loads['Mx'], loads['My']])[:, :nDOF]
+            solverName = 'newton'
+
+        CT, dCT, CL, CD, AoA = loads['CT'], loads['dCT'], loads['CL'], loads['CD'], loads['AoA']
+        lam, up, ut, theta_expanded = loads['lam'], loads['up'], loads['ut'], loads['theta']
+        omegaR = (omega*R)[:, None, None]
+
+        UT = ut*omegaR
+        UP = up*omegaR
+        Utot = np.sqrt(UT**2+UP**2)
+
+        dT = rho*np.pi*R**2*omegaR**2*dCT
+
+        dCQ = 0.5*solDist*r**3*(CL*np.sin(up/ut)+CD*np.cos(up/ut))
+        dQ = rho*np.pi*R**3*omegaR**2*dCQ
+
+        #   resolves the loading vectors to the vertical and horizontal directions, see loadingFF
+        dFz = dT/Nb*np.cos(-theta_expanded)-dQ/(Nb*r*R)*np.sin(-theta_expanded)
+        dFx = dT/Nb*np.sin(-theta_expanded)+dQ/(Nb*r*R)*np.cos(-theta_expanded)
+        dFr = np.zeros((np.shape(dFz)))
+
+    #   converged trim variables, prior to being flipped for a CW rotor
+    trimState = [{'th': np.copy(th[i]), 'omega': omega[i], 'lambda': lam[i]} for i in range(nCases)]
+
+    #   if the rotor is rotating CW the force distributions are flipped along the longitudinal axis of the rotor disk.
+    if UserIn['rotation'] == 2:
+        dFz = np.flip(dFz, axis=1)
+        dFx = np.flip(dFx, axis=1)
+        AoA = np.flip(AoA, axis=1)
+        Utot = np.flip(Utot, axis=1)
+        if UserIn['inflowMod'] != 1:
+            lam = np.flip(lam, axis=1)
+        th[:, 2] = -th[:, 2]
+
+    #   integrates the thrust, torque, hub force, side force, roll moment, and pitch moment of all the cases in a single
+    #   reduction
+    T, CQ, Q, H, Y, Mx, My = quad.integrate(np.stack([dT, dCQ, dQ,
+                                                     Nb*(dFr*quad.cosPhi+dFx*quad.sinPhi),
+                                                     Nb*(dFr*quad.sinPhi-dFx*quad.cosPhi),
+                                                     Nb*geomParams['rdim']*dFz*quad.sinPhi,
+                                                     -Nb*geomParams['rdim']*dFz*quad.cosPhi]))
+    P = Q * omega
+
+    #%%
+    #   Assembles the computed load parameters of each case into a dictionary, the cases that have not converged are
+    #   trimmed individually, starting from their requested rotational rate
+    loadParams = []
+    for i in range(nCases):
+        if not converged[i]:
+            loadParams.append(solver.trim_forward_flight(UserIn, W[i], omegaIn[i], Vx[i], Vz[i], alphaShaft[i]))
+            continue
+        trimReport = {'solver': solverName, 'converged': True, 'iterations': int(iterations[i]), 'nfev': int(nfev[i])}
+        loadParams.append({'residuals': res[i], 'trimReport': trimReport, 'phiRes': UserIn['phiRes'], 'omega': omega[i],
+                           'ClaDist': a, 'AoA': AoA[i], 'alpha': alphaInit[i], 'mu': mu[i], 'phi': quad.phi,
+                           'th': th[i], 'CT': CT[i], 'T': T[i], 'CQ': CQ[i], 'Q': Q[i], 'P': P[i], 'UP': UP[i],
+                           'UT': UT[i], 'U': Utot[i], 'dFx': dFx[i], 'dFy': dFr[i], 'dFz': dFz[i],
+                           'hubLM': [H[i], Y[i], Mx[i], My[i]], 'trimState': trimState[i],
+                           'inflowReport': {key: int(value[i]) for key, value in inflowReport.items()}})
+    return loadParams
@@ -0,0 +1,267 @@
+#       VSP2WOPWOP Batched Blade Loading Analysis for Hover and Axial Flight
+
+#   This function trims a single blade geometry to multiple hover/axial flight operating conditions simultaneously. It
+#   carries out the same BEMT analysis as loadingHover, however the thrust, rotational rate, and climb rate are given as
+#   arrays and each radial quantity is evaluated for all the cases at once as an (ncases, nXsecs) array. The collective
+#   pitch (trim = 2) or rotational rate (trim = 1) of every case is solved for using a vectorized secant method, the
+#   tip loss fixed point iteration is likewise carried out for all the cases at once by an Anderson accelerated fixed
+#   point iteration, see FixedPoint.py. Each case is advanced only until it has converged, so that the cases that
+#   converge quickly are not affected by those that do not. Any case whose trim has not converged within
+#   UserIn['trimMaxIter'] iterations is trimmed individually by loadingHover. A list of
+#   dictionaries, one per case and with the same contents as those returned by loadingHover, is returned.
+
+
+# %%
+def loadingHoverBatch(UserIn, geomParams, XsecPolar, T, omega, Vz, polarTable=None):
+
+    import numpy as np
+    from PolarTable import PolarTable
+    from FixedPoint import fixedPointBatch
+    from loadingHover import loadingHover
+
+    def secant(residuals, x0, x1):
+        '''
+        This function solves residuals(x, ind) = 0 for all the cases simultaneously using the secant method. Only the
+        cases that have not yet converged are evaluated on each iteration.
+        :param residuals: function returning the residuals of the cases specified by the index array ind
+        :param x0: first initial guess of each case
+        :param x1: second initial guess of each case
+        :return:
+        :param x: solution of each case
+        :param res: residual of each case at its solution
+        :param converged: true for each case whose residual is within UserIn['trimTol']
+        '''
+        ind = np.arange(len(x0))
+        f0 = residuals(x0, ind)
+        f1 = residuals(x1, ind)
+        nfev[:] = 2
+        x = x1.copy()
+        res = f1.copy()
+        active = ~(np.abs(f1) <= UserIn['trimTol'])
+
+        for i in range(UserIn['trimMaxIter']):
+            if not np.any(active):
+                break
+            ind = np.where(active)[0]
+            df = f1[ind] - f0[ind]
+            df[df == 0] = np.finfo(float).eps
+            x2 = x1[ind] - f1[ind] * (x1[ind] - x0[ind]) / df
+            f2 = residuals(x2, ind)
+
+            x0[ind], f0[ind] = x1[ind], f1[ind]
+            x1[ind], f1[ind] = x2, f2
+            x[ind], res[ind] = x2, f2
+            iterations[ind] += 1
+            nfev[ind] += 1
+            active[ind] = ~(np.abs(f2) <= UserIn['trimTol'])
+
+        return x, res, ~active
+
+    def coll_residuals(th0, ind):
+        '''
+        This function computes the residuals based on the percentage difference between the computed and target CT.
+        :param th0: collective pitch setting of each case [rad]
+        :param ind: indices of the cases that are evaluated
+        :return:
+        :param res:  percentage error between the target and computed CT
+        '''
+        CT = coll_trim(th0[:, None] + twistDist, ind)[0]
+        return (targCT[ind] - CT) / targCT[ind]
+
+    def rpm_residuals(omega, ind):
+        '''
+        This function computes the residuals based on the percentage difference between the computed and target thrust.
+        :param omega: rotational rate of each case [rad/s]
+        :param ind: indices of the cases that are evaluated
+        :return:
+        :param res:  percentage error between the target and computed T
+        '''
+        CT = rpm_trim(omega, ind)[0]
+        return (T[ind] - CT * rho * np.pi * R ** 2 * (omega * R) ** 2) / T[ind]
+
+    def coll_trim(th, ind):
+        """
+        This function computes the radial loading distribution of each case at the specified pitch distribution.
+        :param th: collective pitch setting+twist distribution of each case [rad]
+        :param ind: indices of the cases that are evaluated
+        """
+        lam = TipLoss(lamInit[ind], th, lam_c[ind], ind)
+        AoA = th - lam / r
+        dCL, dCD = PolarLookup(AoA)
+        dCT = 0.5 * solDist * (dCL * np.cos(lam / r) - dCD * np.sin(lam / r)) * r ** 2
+        CT = np.trapz(dCT, r, axis=1)
+
+        return CT, dCT, dCL, dCD, lam, AoA
+
+    def rpm_trim(omega, ind):
+        """
+        This function computes the radial loading distribution of each case at the specified rotational rate, the
+        blade pitch is fixed to the twist distribution.
+        :param omega: rotational rate of each case [rad/s]
+        :param ind: indices of the cases that are evaluated
+        """
+        th = np.broadcast_to(twistDist, (len(ind), len(r)))
+        lam = TipLoss(np.ones((len(ind), len(r))) * np.sqrt(T[ind] / (rho * np.pi * R ** 2 * (omega * R) ** 2) / 2)[:, None],
+                      th, Vz[ind] / (omega * R), ind)
+        AoA = th - lam / r
+        dCL, dCD = PolarLookup(AoA)
+        dCT = 0.5 * solDist * dCL * r ** 2
+        CT = np.trapz(dCT, r, axis=1)
+
+        return CT, dCT, dCL, dCD, lam, AoA
+
+    def TipLoss(lambdaInit, ThetaDist, lam_c, ind):
+        """
+        This function applies the fixed point iteration method to compute the inflow distribution of each case and
+        applies Prandtl's tip loss formulation, if specified for in the input module. Each case is iterated until its
+        own inflow distribution has converged, or for at most UserIn['inflowMaxIter'] iterations, see FixedPoint.py. The
+        number of calls, iterations, and unconverged calls of each case are accumulated in inflowReport.
+        :param lambdaInit: Initial guess for the inflow ratio of each case
+        :param ThetaDist: collective pitch angle + twist distribution of each case (rad)
+        :param lam_c: axial climb/descent inflow ratio of each case
+        :param ind: indices of the cases
+        :return:
+        :param:  lam: radial inflow distribution of each case
+        """
+        lam_c = lam_c[:, None]
+        if tipLoss == 1:
+            def iterate(lambdaInit, pos):
+                f = 0.5 * Nb * ((1 - r) / lambdaInit)
+                F = (2 / np.pi) * np.arccos(np.e ** (-f))
+                return np.sqrt(1/4*(solDist*Cla/(8*F)-lam_c[pos])**2+solDist*Cla*ThetaDist[pos]*r/(8*F))-(solDist*Cla/(16*F)-lam_c[pos]/2)
+
+            lam, nIter, converged = fixedPointBatch(iterate, lambdaInit, 0.005, UserIn['inflowMaxIter'],
+                                                    UserIn['andersonDepth'])
+            inflowReport['calls'][ind] += 1
+            inflowReport['iterations'][ind] += nIter
+            inflowReport['unconverged'][ind] += ~converged
+        else:
+            F = 1
+            lam = np.sqrt(1/4*(solDist*Cla/(8*F)-lam_c)**2+solDist*Cla*ThetaDist*r/(8*F))-(solDist*Cla/(16*F)-lam_c/2)
+
+        lam[np.isnan(lam)] = 0
+        return lam
+
+    def PolarLookup(AoA):
+        """
+        This function linearly interpolates the sectional blade load coefficients from the XFoil polars for all the
+        cases at once, see PolarTable.py.
+        :param AoA: angle of attack distribution of each case
+        return:
+        :param dCL:  radial lift coefficient distribution of each case
+        :param dCD:  radial drag coefficient distribution of each case
+        """
+        dCL, dCD = polarTable.lookup(AoA)
+        return dCL, dCD
+
+    # %%
+    #   This block of code defines parameters that are used throughout the remainder of the module
+    T, omega, Vz = [np.array(x, dtype=float) for x in np.broadcast_arrays(np.ravel(T), np.ravel(omega), np.ravel(Vz))]
+    Nb = UserIn['Nb']
+    R = geomParams['R']
+    twistDist = geomParams['twistDist']
+    solDist = geomParams['solDist']
+    XsecLocation = UserIn['XsecLocation']
+    rho = UserIn['rho']
+    tipLoss = UserIn['tipLoss']
+    r = geomParams['r']
+    Adisk = geomParams['diskArea']
+    sol = geomParams['solidity']
+    #   converts rotational rate from degrees to radians, the requested thrust and rotational rate of each case are
+    #   retained for any case that is trimmed individually
+    TIn, omegaIn = T, omega
+    omega = omega / 60 * 2 * np.pi
+    #   Target thrust coefficient
+    targCT = T / (rho * Adisk * (omega * R) ** 2)
+    #   Converts initial guess for the collective pitch setting from degrees to radians
+    th0 = UserIn['thetaInit'] * (np.pi / 180) * np.ones(len(T))
+    #   Initial guess for the radial inflow distribution
+    lamInit = np.ones((len(T), len(r))) * np.sqrt(targCT / 2)[:, None]
+    #   Axial climb/descent inflow ratio
+    lam_c = Vz / (omega * R)
+    #   Number of calls to the tip loss inflow iteration and of its fixed point iterations of each case
+    inflowReport = {key: np.zeros(len(T), dtype=int) for key in ['calls', 'iterations', 'unconverged']}
+    #   Number of iterations and evaluations of the trim of each case
+    iterations = np.zeros(len(T), dtype=int)
+    nfev = np.zeros(len(T), dtype=int)
+
+    nonPhysical = np.where((-2 < Vz / np.sqrt(T / (2 * rho * Adisk))) & (Vz / np.sqrt(T / (2 * rho * Adisk)) < 0))[0]
+    if len(nonPhysical) > 0:
+        raise ValueError('Non-physical solution, 1D assumption of momentum theory is violated for case(s) ' + str(list(nonPhysical)))
+
+    #   Table of the airfoil polars corresponding to each radial station
+    if polarTable is None:
+        polarTable = PolarTable(XsecPolar, r, XsecLocation)
+    #   Radial lift curve slope distribution
+    Cla = polarTable.liftSlope
+
+    # %%
+    #   Solves for the rotational rate or collective pitch angle of each case to meet the target thrust or thrust
+    #   coefficient, respectively.
+    allCases = np.arange(len(T))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if UserIn['trim'] == 1:
+            omega, res, converged = secant(rpm_residuals, omega.copy(), omega * 1.01)
+            CT, dCT, dCL, dCD, lam, AoA = rpm_trim(omega, allCases)
+            th = np.zeros(len(T))
+        else:
+            th, res, converged = secant(coll_residuals, th0.copy(), th0 + np.pi / 180)
+            CT, dCT, dCL, dCD, lam, AoA = coll_trim(th[:, None] + twistDist, allCases)
+
+        #%%
+        U = np.sqrt((omega[:, None] * geomParams['rdim']) ** 2 + (omega[:, None] * R * lam) ** 2)
+        #   Integrated lift and drag coefficients
+        CL = np.trapz(dCL, r, axis=1)
+        CD = np.trapz(dCD, r, axis=1)
+
+        #   Distribution and integrated of the power/torque coefficient
+        dCP = 0.5 * solDist * (lam / r * dCL + dCD) * r ** 3
+        CP = np.trapz(dCP, r, axis=1)
+
+        #   Power required by the rotor
+        P = CP * rho * Adisk * (omega * R) ** 3
+
+        #   Distribution and integrated thrust
+        dT = dCT * rho * Adisk * ((omega * R) ** 2)[:, None]
+        T = np.trapz(dT, r, axis=1)
+
+        #   Distribution and integrated torque
+        dQ = dCP * rho * Adisk * ((omega * R) ** 2)[:, None] * R
+        Q = np.trapz(dQ, r, axis=1)
+
+        #   Rotates the normal and inplane force components by the collective pitch setting, see loadingHover
+        dFz = dT / Nb * np.cos(-th[:, None]) - dQ / (Nb * r * R) * np.sin(-th[:, None])
+        dFx = dT / Nb * np.sin(-th[:, None]) + dQ / (Nb * r * R) * np.cos(-th[:, None])
+
+        #   Figure of merit, induced power factor = 1.15
+        FM = CP / (1.15 * CP + sol / 8 * CD)
+
+    #   converged trim variables, with which the trim of a neighbouring case can be initialized
+    trimState = [{'th': np.array([th[i], 0, 0]), 'omega': omega[i], 'lambda': lam[i]} for i in range(len(T))]
+
+    #   Sets any infinite values of the computed force components (primarily near the blade root) equal to zero.
+    dFx[np.isnan(dFx)] = 0
+    dFz[np.isnan(dFz)] = 0
+
+    #   if the rotor is rotating CW the force distributions are flipped along the longitudinal axis of the rotor disk.
+    if UserIn['rotation'] == 2:
+        dFx = -dFx
+
+    #%%
+    # Assembles the computed load parameters of each case into a dictionary, the cases that have not converged are
+    # trimmed individually, starting from their requested rotational rate
+    loadParams = []
+    for i in range(len(T)):
+        if not converged[i]:
+            loadParams.append(loadingHover(UserIn, geomParams, XsecPolar, TIn[i], omegaIn[i], Vz[i], polarTable))
+            continue
+        trimReport = {'solver': 'secant', 'converged': True, 'iterations': int(iterations[i]), 'nfev': int(nfev[i])}
+        loadParams.append({'coll_residuals': np.abs(res[i:i + 1]), 'trimReport': trimReport,
+                           'th': np.array([th[i], 0, 0]), 'beta': [0, 0, 0],
+                           'CT': CT[i], 'T': T[i], 'dCT': dCT[i], 'dT': dT[i], 'CP': CP[i], 'P': P[i], 'Q': Q[i],
+                           'dCP': dCP[i], 'dQ': dQ[i], 'dCL': dCL[i], 'dCD': dCD[i], 'CL': CL[i], 'CD': CD[i],
+                           'FM': FM[i], 'AoA': AoA[i], 'ClaDist': Cla, 'lambda': lam[i], 'dFx': dFx[i],
+                           'dFy': np.zeros(len(r)), 'dFz': dFz[i], 'omega': omega[i], 'U': U[i],
+                           'trimState': trimState[i],
+                           'inflowReport': {key: int(value[i]) for key, value in inflowReport.items()}})
+    return loadParams
@@ -0,0 +1,100 @@
+#       VSP2WOPWOP Case Archive Tests
+
+#   These tests write the case directories of a small sweep to an archive, as CaseSweep does if
+#   UserIn['archiveOutput'] = 1, and check that extractArchive restores every file byte for byte, including the
+#   geometry patch file that is linked into each case from the store.
+
+#%% imports necessary modules
+import os
+import sys
+import errno
+import tarfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OutputStore import storeFile, linkFile
+from CaseArchive import CaseArchive, clearArchive, writeIndex, extractArchive
+
+#%%
+caseNames = ['T_9.00e+02N_Vx_0Kts_Vz_0ms_Nr_2250RPM', 'T_9.00e+02N_Vx_58Kts_Vz_0ms_Nr_2250RPM',
+             'T_9.50e+02N_Vx_58Kts_Vz_0ms_Nr_2250RPM']
+
+
+def archiveSweep(tmp_path):
+    '''
+    This function stages the files of each case in a scratch directory, with the geometry patch file linked from the
+    store as in CaseSweep.writeCase, adds them to an archive, and writes the index and case file.
+    :return:
+    :param dirArchive: output directory of the geometry, containing the archive
+    :param files: dictionary of the contents of each file of each case
+    '''
+    dirArchive = tmp_path / 'out'
+    dirStore = dirArchive / '.store'
+    dirStore.mkdir(parents=True)
+    geom = os.urandom(70000)
+    (dirStore / 'Geom.dat').write_bytes(geom)
+    geomFile = storeFile(str(dirStore / 'Geom.dat'), str(dirStore))
+
+    clearArchive(str(dirArchive))
+    files = {}
+    with CaseArchive(str(dirArchive), 0) as archive:
+        for caseName in caseNames:
+            dirCaseFile = tmp_path / 'scratch' / caseName
+            dirCaseFile.mkdir(parents=True)
+            linkFile(geomFile, str(dirCaseFile / 'Geom.dat'), symbolic=False)
+            files[caseName] = {'Geom.dat': geom}
+            for file, size in [('Load.dat', 5000), ('BPM.dat', 0), ('case.nam', 700)]:
+                files[caseName][file] = os.urandom(size)
+                (dirCaseFile / file).write_bytes(files[caseName][file])
+            archive.addCase(caseName, str(dirCaseFile))
+    writeIndex(str(dirArchive), caseNames)
+
+    with open(dirArchive / 'cases.nam', 'w') as f:
+        for caseName in caseNames:
+            f.write("&casename\n globalFolderName = './" + caseName + "/'\n/\n")
+    return dirArchive, files
+
+
+def checkExtracted(dirExtract, files):
+    for caseName, caseFiles in files.items():
+        assert sorted(os.listdir(dirExtract / caseName)) == sorted(caseFiles)
+        for file, data in caseFiles.items():
+            assert (dirExtract / caseName / file).read_bytes() == data
+    with open(dirExtract / 'cases.nam', 'r') as f:
+        assert f.read().count('&casename') == len(files)
+
+
+def test_roundtrip(tmp_path):
+    dirArchive, files = archiveSweep(tmp_path)
+
+    #   the hard linked geometry patch file is only stored once
+    with tarfile.open(dirArchive / 'cases.000.tar') as tar:
+        assert [member.islnk() for member in tar.getmembers() if member.name.endswith('Geom.dat')] == [False, True, True]
+
+    assert extractArchive(str(dirArchive), str(tmp_path / 'all')) == caseNames
+    checkExtracted(tmp_path / 'all', files)
+
+    assert extractArchive(str(dirArchive), str(tmp_path / 'one'), caseNames[1:2]) == caseNames[1:2]
+    checkExtracted(tmp_path / 'one', {caseNames[1]: files[caseNames[1]]})
+
+
+def test_roundtrip_cross_filesystem(tmp_path, monkeypatch):
+    #   the scratch directory is on a different filesystem from the store, so that it cannot be hard linked
+    def link(src, dst, *args, **kwargs):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+    monkeypatch.setattr(os, 'link', link)
+
+    dirArchive, files = archiveSweep(tmp_path)
+    monkeypatch.undo()
+
+    with tarfile.open(dirArchive / 'cases.000.tar') as tar:
+        assert not any(member.issym() for member in tar.getmembers())
+
+    extractArchive(str(dirArchive), str(tmp_path / 'all'))
+    checkExtracted(tmp_path / 'all', files)
+
+
+def test_missing_case(tmp_path):
+    dirArchive, files = archiveSweep(tmp_path)
+    with pytest.raises(AssertionError):
+        extractArchive(str(dirArchive), str(tmp_path / 'none'), ['T_1.00e+03N_Vx_0Kts_Vz_0ms_Nr_2250RPM'])
@@ -4,35 +4,131 @@ Author: Daniel Weitsman
 This function writes the main dictionary (MainDict) to an HDF5 file. HDF5 is a universal file format that is structured
 like MATLAB .mat files. The content of HDF5 files can be read using the following function in the h5py package:
 h5py.File("path+file"), 'r').
+
+The file is written by an append-only store (HDF5Store), to which each entry of MainDict, such as the user inputs or
+the results of a geometry, is added once as soon as it is complete, rather than rewriting the entire file. After each
+entry is written the file is flushed and the name of the entry is appended to the resizable 'index' dataset, so that
+the entries listed in the index of a partially written file, e.g. of an interrupted run, are complete and readable.
+
+In the columnar layout (UserIn['hdf5Columnar'] = 1) the loading parameters of the cases of an analysis mode sweep are
+written as tables rather than as a group per case. The hover/axial flight and forward flight cases of each geometry are
+stored in the 'hover' and 'forwardFlight' tables of its loadParams group. The 'name' dataset of each table lists the case
+folder names, and each loading parameter is a single dataset that is indexed by case along its first axis, i.e. the
+scalars (CT, T, P, Q, etc.) are 1-D arrays and the distributions (dFz, AoA, U, etc.) are stacked into arrays of size
+[ncase x ...]. These datasets are chunked along the case axis and compressed. A parameter whose size differs between
+the cases of a table, e.g. if the azimuthal resolution is adapted, is instead written as a group containing a dataset
+for each case, named by its position in the table.
 '''
+import os
+import numpy as np
+
+#   the strings are encoded into a copy of the list, so that the lists of the user inputs are left unaltered
+def encode_str_list(str_list):
+    str_list = list(str_list)
+    for i, elem in enumerate(str_list):
+        if isinstance(elem, list):
+            str_list[i] = encode_str_list(elem)
+        elif isinstance(elem, str):
+            str_list[i] = elem.encode()
+        else:
+            break
+    return str_list
+
+
+def write_dict_hdf5(f_write, d, parent=''):
+    for key, value in d.items():
+        if isinstance(value, dict):
+            write_dict_hdf5(f_write, value, parent + '/' + key)
+        else:
+            if isinstance(value, list):
+                value = encode_str_list(value)
+            elif isinstance(value, str):
+                value = value.encode()
+            f_write.create_dataset(parent + '/' + key, shape=np.shape(value), data=value)
+
+
+def flatten_dict(d, parent=''):
+    #   nested dictionaries are flattened into a single dictionary, the keys of which are the paths of their entries
+    flat = {}
+    for key, value in d.items():
+        if isinstance(value, dict):
+            flat.update(flatten_dict(value, parent + key + '/'))
+        else:
+            flat[parent + key] = value
+    return flat
+
+
+def write_cases_hdf5(f_write, loadParams, parent, compression):
+    #   the forward flight cases are distinguished by their azimuthal stations ('phi')
+    tables = {'hover': [name for name, d in loadParams.items() if 'phi' not in d],
+              'forwardFlight': [name for name, d in loadParams.items() if 'phi' in d]}
+
+    for table, names in tables.items():
+        if len(names) == 0:
+            continue
+        path = parent + '/' + table
+        f_write.create_dataset(path + '/name', data=[name.encode() for name in names])
+        cases = [flatten_dict(loadParams[name]) for name in names]
+
+        for key in dict.fromkeys(key for case in cases for key in case):
+            values = [case.get(key) for case in cases]
+            if all(isinstance(value, str) for value in values):
+                f_write.create_dataset(path + '/' + key, data=[value.encode() for value in values])
+            elif all(value is not None and np.shape(value) == np.shape(values[0]) for value in values):
+                data = np.array(values)
+                #   each chunk spans as many cases as fit in approximately 256 kB
+                nChunk = int(max(1, min(len(names), 2 ** 18 // max(1, data[0].nbytes))))
+                f_write.create_dataset(path + '/' + key, data=data, chunks=(nChunk,) + np.shape(data)[1:],
+                                       compression=compression)
+            else:
+                for i, value in enumerate(values):
+                    if value is not None:
+                        write_dict_hdf5(f_write, {str(i): value}, path + '/' + key)
+
+
+class HDF5Store:
+    '''
+    This class writes the entries of MainDict to MainDict.h5 as they are completed.
+    :param save_path: directory in which MainDict.h5 is created, any existing file is overwritten
+    :param columnar: set equal to one to write the loading parameters of the cases of each geometry as tables
+    :param compression: compression filter of the tables, 'gzip', 'lzf', or None
+    '''
+    def __init__(self, save_path, columnar=0, compression='gzip'):
+        import h5py
+        self.columnar = columnar
+        self.compression = compression
+        self.f_write = h5py.File(os.path.abspath(os.path.join(save_path, 'MainDict.h5')), 'w')
+        self.index = self.f_write.create_dataset('index', shape=(0,), maxshape=(None,),
+                                                 dtype=h5py.string_dtype(encoding='utf-8'))
+        self.f_write.flush()
+
+    def append(self, key, value):
+        '''
+        This function writes an entry of MainDict and then records it in the index.
+        :param key: name of the entry
+        :param value: dictionary or dataset of the entry
+        '''
+        if self.columnar == 1 and isinstance(value, dict) and 'loadParams' in value:
+            write_dict_hdf5(self.f_write, {k: v for k, v in value.items() if k != 'loadParams'}, '/' + key)
+            write_cases_hdf5(self.f_write, value['loadParams'], '/' + key + '/loadParams', self.compression)
+        else:
+            write_dict_hdf5(self.f_write, {key: value})
+        self.f_write.flush()
+        self.index.resize((len(self.index) + 1,))
+        self.index[-1] = key
+        self.f_write.flush()
+
+    def close(self):
+        self.f_write.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def writeHDF5(MainDict,save_path):
-    #%% import necessary modules
-    import os
-    import h5py
-    import numpy as np
-    #%%
-    with h5py.File(os.path.abspath(os.path.join(save_path, 'MainDict.h5')), 'w') as f_write:
-
-        def encode_str_list(str_list):
-            for i, elem in enumerate(str_list):
-                if isinstance(elem, list):
-                    encode_str_list(elem)
-                elif isinstance(elem, str):
-                    str_list[i] = elem.encode()
-                else:
-                    break
-            return str_list
-
-        def write_dict_hdf5(d, parent=''):
-            for key, value in d.items():
-                if isinstance(value, dict):
-                    write_dict_hdf5(value, parent + '/' + key)
-                else:
-                    # print(key)
-                    if isinstance(value, list):
-                        value = encode_str_list(value)
-                    elif isinstance(value, str):
-                        value = value.encode()
-                    f_write.create_dataset(parent + '/' + key, shape=np.shape(value), data=value)
-
-        write_dict_hdf5(MainDict)
\ No newline at end of file
+    with HDF5Store(save_path) as store:
+        for key, value in MainDict.items():
+            store.append(key, value)